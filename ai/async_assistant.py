@@ -0,0 +1,206 @@
+"""asyncio variant of CodeAssistant with bounded concurrency and request coalescing."""
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional
+
+from ai.code_assistant import CodeAssistant
+from ai.response_cache import request_key
+from ai.scheduler import estimate_request_tokens
+
+# Queued by a stream's reader once the upstream response is complete
+_STREAM_END = object()
+
+
+class AsyncCodeAssistant(CodeAssistant):
+    """CodeAssistant whose public methods are coroutines running on the async OpenAI client.
+
+    At most ``max_concurrency`` requests are sent upstream at once; the rest
+    wait their turn without holding a thread. A stream gives its slot back
+    as soon as the upstream response is complete, however slowly the
+    caller consumes it. Identical requests (same model,
+    messages and parameters) that arrive while one is already in flight do
+    not go upstream at all: they wait for that call and share its result, or
+    its exception. Responses are cached exactly as in ``CodeAssistant``, with
+    the cache's SQLite reads and writes run in a worker thread.
+
+    ``base_url`` (default: ``$OPENAI_BASE_URL``, else the OpenAI API) points
+    the client at any OpenAI-compatible server. An instance must only be used
+    from one event loop.
+    """
+    def __init__(self, cache=None, scheduler=None, max_concurrency: int = 8, base_url: Optional[str] = None,
+                 api_key: Optional[str] = None):
+        super().__init__(cache=cache, scheduler=scheduler)
+        self.api_key = api_key or self.api_key
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def _create_client(self):
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    async def complete(self, messages, validate=None, priority="analysis", **params):
+        """Awaitable complete(); joins an identical in-flight request instead of repeating it"""
+        key = request_key(self.model, messages, params)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            # Shielded so that a cancelled waiter does not cancel the shared call
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved even if nobody else ended up waiting on it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            async with self._semaphore:
+                self.upstream_calls += 1
+                response = await self.scheduler.acall(
+                    priority,
+                    lambda: self.client.chat.completions.create(model=self.model, messages=messages, **params),
+                    estimate_request_tokens(messages, params)
+                )
+            content = response.choices[0].message.content
+            future.set_result(content)
+            await asyncio.to_thread(self._store, key, content, validate, params)
+            return content
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def stream(self, messages, validate=None, priority="analysis", **params):
+        """Async generator version of stream(); streams are not coalesced"""
+        key = request_key(self.model, messages, params)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+
+        deltas = asyncio.Queue()
+
+        async def read_upstream():
+            # Only this task holds the semaphore, so a slow consumer does not keep the slot
+            try:
+                async with self._semaphore:
+                    self.upstream_calls += 1
+                    chunks = await self.scheduler.acall(
+                        priority,
+                        lambda: self.client.chat.completions.create(model=self.model, messages=messages,
+                                                                    stream=True, **params),
+                        estimate_request_tokens(messages, params)
+                    )
+                    try:
+                        async for chunk in chunks:
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                deltas.put_nowait(chunk.choices[0].delta.content)
+                    finally:
+                        await chunks.close()
+            except Exception as e:
+                deltas.put_nowait(e)
+            else:
+                deltas.put_nowait(_STREAM_END)
+
+        reader = asyncio.create_task(read_upstream())
+        parts = []
+        try:
+            while True:
+                delta = await deltas.get()
+                if delta is _STREAM_END:
+                    break
+                if isinstance(delta, Exception):
+                    raise delta
+                parts.append(delta)
+                yield delta
+        finally:
+            # The caller stopped early: stop reading upstream too
+            reader.cancel()
+        await asyncio.to_thread(self._store, key, "".join(parts), validate, params)
+
+    async def get_suggestions(self, code_context, cursor_position):
+        if not self.client:
+            return ["AI assistance not available - API key not set"]
+        try:
+            return await self.suggest(code_context, cursor_position)
+        except Exception as e:
+            return [f"Error getting suggestions: {str(e)}"]
+
+    async def suggest(self, code_context, cursor_position, priority="completion"):
+        request = self.suggestion_request(code_context, cursor_position)
+        request["priority"] = priority
+        content = await self.complete(**request)
+        return json.loads(content).get("suggestions", ["No valid suggestions available"])
+
+    async def analyze_code(self, code):
+        if not self.client:
+            return "AI analysis not available - API key not set"
+        try:
+            return json.loads(await self.complete(**self.analysis_request(code)))
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def analyze_units(self, units):
+        if not self.client:
+            return "AI analysis not available - API key not set"
+        results, pending = self._cached_unit_analyses(units)
+        if pending:
+            analyses = await asyncio.gather(*(self.analyze_code(unit.source) for unit in pending))
+            self._record_unit_analyses(results, pending, analyses)
+        return self.merge_unit_analyses(units, results)
+
+    async def get_documentation(self, code_element):
+        if not self.client:
+            return "AI documentation not available - API key not set"
+        try:
+            return json.loads(await self.complete(**self.documentation_request(code_element)))
+        except json.JSONDecodeError:
+            return self.documentation_error("Documentation format error", "Could not parse documentation output",
+                                            "Error generating documentation")
+        except Exception as e:
+            return self.documentation_error(str(e), "Failed to generate documentation",
+                                            "Error in documentation generation")
+
+    async def get_batch_documentation(self, elements):
+        if not self.client:
+            return [self.documentation_error("AI documentation not available - API key not set",
+                                             "Failed to generate documentation",
+                                             "Error in documentation generation")] * len(elements)
+        try:
+            content = await self.complete(**self.batch_documentation_request(elements))
+        except Exception as e:
+            return [self.documentation_error(str(e), "Failed to generate documentation",
+                                             "Error in documentation generation")] * len(elements)
+        return self.split_batch_documentation(elements, content)
+
+    async def get_code_fixes(self, code, errors):
+        if not self.client:
+            return "AI fixes not available - API key not set"
+        try:
+            return json.loads(await self.complete(**self.fixes_request(code, errors)))
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def aclose(self) -> None:
+        """Close the HTTP client, if one was ever created"""
+        if self._client is not None:
+            await self._client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "max_concurrency": self.max_concurrency
+        }
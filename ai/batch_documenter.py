@@ -0,0 +1,136 @@
+"""Documents every function and class of a module or project in packed, concurrent batches."""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ai.response_cache import request_key
+from utils.code_units import CodeUnit, collect_elements
+from utils.document_model import DocumentModel
+
+# Rough size of one element's JSON documentation in the response
+DOC_TOKENS_PER_ELEMENT = 150
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def pack_batches(elements: List[CodeUnit], token_budget: int) -> List[List[CodeUnit]]:
+    """Greedily group elements, in order, so each batch's estimated prompt + response fits the budget.
+
+    An element larger than the budget on its own gets a batch to itself.
+    """
+    batches: List[List[CodeUnit]] = []
+    batch: List[CodeUnit] = []
+    used = 0
+    for element in elements:
+        cost = estimate_tokens(element.source) + DOC_TOKENS_PER_ELEMENT
+        if batch and used + cost > token_budget:
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(element)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class BatchDocumenter:
+    """Generates documentation for many code elements with few, parallel requests.
+
+    Elements are collected by AST, answered from the assistant's response
+    cache when an element with the same normalized-AST fingerprint has been
+    documented before, and otherwise packed into shared requests of at most
+    ``token_budget`` estimated tokens that run ``max_workers`` at a time.
+    """
+    def __init__(self, assistant, token_budget: int = 2000, max_workers: int = 16):
+        self.assistant = assistant
+        self.token_budget = token_budget
+        self.max_workers = max_workers
+        self.last_run: Dict[str, Any] = {}
+
+    def document_module(self, source: str, path: str = "",
+                        stats: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        return self.document([(path, source)], stats)
+
+    def document_files(self, files: Iterable[str],
+                       stats: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        def sources():
+            for path in files:
+                try:
+                    with open(path, 'r') as f:
+                        yield path, f.read()
+                except Exception as e:
+                    print(f"Error reading {path}: {str(e)}")
+        return self.document(sources(), stats)
+
+    def document(self, sources: Iterable[Tuple[str, str]],
+                 stats: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield ``{"path", "name", "line", "docs", "cached", "completed", "total"}`` per element.
+
+        Cached elements come first, the rest in batch completion order. Run
+        statistics go into ``stats`` if given, so concurrent runs each get
+        their own; ``last_run`` is the most recently started run's.
+        """
+        started = time.perf_counter()
+        stats = {} if stats is None else stats
+        stats.update(files=0, elements=0, cached=0, batches=0, failed=0, seconds=0.0)
+        self.last_run = stats
+
+        elements = []
+        for path, source in sources:
+            stats["files"] += 1
+            elements.extend(element._replace(path=path) for element in collect_elements(DocumentModel(source)))
+        stats["elements"] = len(elements)
+
+        completed = 0
+        pending: Dict[str, List[CodeUnit]] = {}
+        for element in elements:
+            docs = self._cached(element)
+            if docs is None:
+                pending.setdefault(element.fingerprint, []).append(element)
+                continue
+            stats["cached"] += 1
+            completed += 1
+            yield self._entry(element, docs, True, completed, len(elements))
+
+        # Identical elements are documented once and the result shared
+        batches = pack_batches([group[0] for group in pending.values()], self.token_budget)
+        stats["batches"] = len(batches)
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                futures = {pool.submit(self.assistant.get_batch_documentation, batch): batch for batch in batches}
+                for future in as_completed(futures):
+                    for element, docs in zip(futures[future], future.result()):
+                        if 'error' in docs:
+                            stats["failed"] += 1
+                        else:
+                            self._store(element, docs)
+                        for same in pending[element.fingerprint]:
+                            completed += 1
+                            yield self._entry(same, docs, False, completed, len(elements))
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+
+    def _key(self, element: CodeUnit) -> str:
+        return request_key(self.assistant.model, "documentation", {"fingerprint": element.fingerprint})
+
+    def _cached(self, element: CodeUnit):
+        cached = self.assistant.cache.get(self._key(element))
+        return json.loads(cached) if cached is not None else None
+
+    def _store(self, element: CodeUnit, docs: Dict[str, Any]) -> None:
+        self.assistant.cache.put(self._key(element), json.dumps(docs))
+
+    @staticmethod
+    def _entry(element: CodeUnit, docs, cached: bool, completed: int, total: int) -> Dict[str, Any]:
+        return {
+            "path": os.path.abspath(element.path) if element.path else None,
+            "name": element.name,
+            "line": element.start_line,
+            "docs": docs,
+            "cached": cached,
+            "completed": completed,
+            "total": total
+        }
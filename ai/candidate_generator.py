@@ -0,0 +1,190 @@
+"""Generation that races several candidates and keeps the first one that validates."""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from ai.response_cache import request_key
+from ai.scheduler import estimate_request_tokens
+
+# Each candidate is a paid upstream request
+MAX_CANDIDATES = 4
+
+# (temperature, top_p) of the candidates after the first, which uses the request's own
+# parameters; identical sampling would mostly fail (or succeed) together
+CANDIDATE_SAMPLING = [(0.5, 0.9), (0.8, 0.95), (1.0, 1.0)]
+
+
+class GenerationError(Exception):
+    """Raised when no candidate passed validation; ``content`` is the last one received."""
+    def __init__(self, message: str, content: str = ""):
+        super().__init__(message)
+        self.content = content
+
+
+def percentiles(samples: List[float], points=(50, 90, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles of ``samples`` in milliseconds."""
+    if not samples:
+        return {f"p{point}": 0.0 for point in points}
+    ordered = sorted(samples)
+    return {
+        f"p{point}": round(ordered[min(len(ordered) - 1, max(0, -(-point * len(ordered) // 100) - 1))] * 1000, 1)
+        for point in points
+    }
+
+
+class CandidateGenerator:
+    """Requests ``candidates`` completions of the same prompt concurrently.
+
+    Each candidate is streamed on its own worker and validated as soon as it
+    finishes; the first one that ``validate`` accepts is returned (and
+    cached like a plain ``complete()`` result), and the others are cancelled
+    by closing their streams at the next chunk. Candidates after the first
+    sample more freely and get a larger ``max_tokens`` budget, since the
+    usual reason for an invalid candidate is a reply cut off at the limit.
+    Validation failures by error type and latency percentiles are kept so
+    the candidate count can be tuned against the extra token spend.
+    """
+    def __init__(self, assistant, candidates: int = 3, max_workers: int = 16, max_samples: int = 500,
+                 timeout: float = 120.0):
+        self.assistant = assistant
+        self.candidates = candidates
+        # Seconds to wait for a valid candidate before giving up on the request
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="candidate")
+        self._lock = threading.Lock()
+        self.metrics = {"requests": 0, "succeeded": 0, "failed": 0, "cache_hits": 0,
+                        "started": 0, "valid": 0, "invalid": 0, "errors": 0, "cancelled": 0}
+        self.invalid_reasons: Dict[str, int] = {}
+        self.winner_index: Dict[int, int] = {}
+        # Time to the first valid candidate, and time for each candidate to finish
+        self._latencies = deque(maxlen=max_samples)
+        self._candidate_latencies = deque(maxlen=max_samples)
+
+    def generate(self, messages, validate: Callable[[str], Any], candidates: int = None,
+                 priority: str = "completion", **params) -> Any:
+        """The result of ``validate`` for the first candidate it accepts."""
+        assistant = self.assistant
+        if not assistant.client:
+            raise GenerationError("AI assistance not available - API key not set")
+        candidates = min(MAX_CANDIDATES, max(1, candidates or self.candidates))
+        with self._lock:
+            self.metrics["requests"] += 1
+
+        key = request_key(assistant.model, messages, params)
+        cached = assistant.cache.get(key)
+        if cached is not None:
+            with self._lock:
+                self.metrics["cache_hits"] += 1
+                self.metrics["succeeded"] += 1
+            return validate(cached)
+
+        started = time.monotonic()
+        done = threading.Event()
+        outcomes = queue.Queue()
+        for index in range(candidates):
+            self._executor.submit(self._candidate, index, messages, validate, priority,
+                                  self.candidate_params(params, index), done, outcomes)
+
+        deadline = started + self.timeout
+        last_content = ""
+        last_error = None
+        for _ in range(candidates):
+            try:
+                index, value, content, error = outcomes.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                done.set()
+                with self._lock:
+                    self.metrics["failed"] += 1
+                raise GenerationError(f"No valid candidate within {self.timeout:g}s", last_content)
+            if error is None:
+                done.set()
+                assistant._store(key, content, validate, params)
+                with self._lock:
+                    self.metrics["succeeded"] += 1
+                    self.winner_index[index] = self.winner_index.get(index, 0) + 1
+                    self._latencies.append(time.monotonic() - started)
+                return value
+            if content:
+                last_content = content
+            last_error = error
+
+        with self._lock:
+            self.metrics["failed"] += 1
+        raise GenerationError(f"Generated code is incomplete or contains errors: {str(last_error)}", last_content)
+
+    @staticmethod
+    def candidate_params(params: Dict[str, Any], index: int) -> Dict[str, Any]:
+        """Request parameters for candidate ``index``: the first as given, later ones varied."""
+        if index == 0:
+            return params
+        temperature, top_p = CANDIDATE_SAMPLING[(index - 1) % len(CANDIDATE_SAMPLING)]
+        varied = dict(params, temperature=temperature, top_p=top_p)
+        if "max_tokens" in params:
+            varied["max_tokens"] = params["max_tokens"] * (index + 1)
+        return varied
+
+    def _candidate(self, index, messages, validate, priority, params, done, outcomes) -> None:
+        if done.is_set():
+            self._count("cancelled")
+            return
+        self._count("started")
+        started = time.monotonic()
+        client = self.assistant.client
+        model = self.assistant.model
+        try:
+            chunks = self.assistant.scheduler.call(
+                priority,
+                lambda: client.chat.completions.create(model=model, messages=messages, stream=True, **params),
+                estimate_request_tokens(messages, params)
+            )
+            parts = []
+            try:
+                for chunk in chunks:
+                    if done.is_set():
+                        self._count("cancelled")
+                        return
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+            finally:
+                chunks.close()
+        except Exception as e:
+            self._count("errors")
+            outcomes.put((index, None, "", e))
+            return
+
+        content = "".join(parts).strip()
+        try:
+            value = validate(content)
+        except Exception as e:
+            with self._lock:
+                self.metrics["invalid"] += 1
+                reason = type(e).__name__
+                self.invalid_reasons[reason] = self.invalid_reasons.get(reason, 0) + 1
+                self._candidate_latencies.append(time.monotonic() - started)
+            outcomes.put((index, None, content, e))
+            return
+        with self._lock:
+            self.metrics["valid"] += 1
+            self._candidate_latencies.append(time.monotonic() - started)
+        outcomes.put((index, value, content, None))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.metrics[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.metrics)
+            validated = metrics["valid"] + metrics["invalid"]
+            return dict(
+                metrics,
+                candidates=self.candidates,
+                invalid_rate=metrics["invalid"] / validated if validated else 0.0,
+                invalid_reasons=dict(self.invalid_reasons),
+                winner_index=dict(self.winner_index),
+                latency_ms=percentiles(list(self._latencies)),
+                candidate_latency_ms=percentiles(list(self._candidate_latencies))
+            )
@@ -1,14 +1,100 @@
 import os
 import json
-from openai import OpenAI
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from ai.response_cache import ResponseCache, request_key
+from ai.scheduler import RequestScheduler, estimate_request_tokens
 
 class CodeAssistant:
-    def __init__(self):
+    def __init__(self, cache=None, scheduler=None, unit_workers=4, unit_cache_entries=512):
         # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
         # do not change this unless explicitly requested by the user
         self.model = "gpt-4o"
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key) if self.api_key else None
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler.from_env()
+        # Per-unit analyses keyed by normalized-AST fingerprint (see analyze_units)
+        self.unit_workers = unit_workers
+        self.unit_cache_entries = unit_cache_entries
+        # Shared by every session's requests
+        self._unit_analyses = OrderedDict()
+        self._unit_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The OpenAI client, or None without an API key
+
+        Created on first use: importing openai alone takes about a second,
+        which startup and sessions that never call the model should not pay.
+        """
+        if self._client is None and self.api_key:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def _create_client(self):
+        from openai import OpenAI
+        # Retries are left to the scheduler so they are paced and counted in one place
+        return OpenAI(api_key=self.api_key, max_retries=0)
+
+    def complete(self, messages, validate=None, priority="analysis", **params):
+        """Run a chat completion and return the first choice's text, served from cache when possible
+
+        Requests that miss the cache go through the scheduler under the given
+        priority class (see ai.scheduler.PRIORITIES). Only responses that ``validate`` accepts without raising (by default:
+        valid JSON when a JSON response was requested) are cached, so a retry
+        after a bad answer goes back to the model.
+        """
+        key = request_key(self.model, messages, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = self.scheduler.call(
+            priority,
+            lambda: self.client.chat.completions.create(model=self.model, messages=messages, **params),
+            estimate_request_tokens(messages, params)
+        )
+        content = response.choices[0].message.content
+        self._store(key, content, validate, params)
+        return content
+
+    def stream(self, messages, validate=None, priority="analysis", **params):
+        """Like complete(), but yield the response text in pieces as the model produces them"""
+        key = request_key(self.model, messages, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        chunks = self.scheduler.call(
+            priority,
+            lambda: self.client.chat.completions.create(model=self.model, messages=messages, stream=True, **params),
+            estimate_request_tokens(messages, params)
+        )
+        for chunk in chunks:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        self._store(key, "".join(parts), validate, params)
+
+    def _store(self, key, content, validate, params):
+        if validate is None and params.get("response_format", {}).get("type") == "json_object":
+            validate = json.loads
+        if validate is not None:
+            try:
+                validate(content)
+            except Exception:
+                return
+        self.cache.put(key, content)
 
     def get_suggestions(self, code_context, cursor_position):
         """Get code completion suggestions based on context"""
@@ -16,145 +102,295 @@ class CodeAssistant:
             return ["AI assistance not available - API key not set"]
 
         try:
-            line_num, col_num = cursor_position
-            lines = code_context.split('\n')
-            current_line = lines[line_num - 1] if line_num <= len(lines) else ""
-            context_before = current_line[:col_num]
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a Python code completion assistant. 
-                        Provide short, relevant code suggestions based on context.
-                        Focus on completing the current statement or expression.
-                        Return a JSON object with an array of suggestions."""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Complete this Python code:\nContext before cursor: {context_before}\nFull line: {current_line}"
-                    }
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=150,
-                temperature=0.7,
-                n=3
-            )
-
-            result = json.loads(response.choices[0].message.content)
-            return result.get("suggestions", ["No valid suggestions available"])
+            return self.suggest(code_context, cursor_position)
         except Exception as e:
             return [f"Error getting suggestions: {str(e)}"]
 
+    def suggest(self, code_context, cursor_position, priority="completion"):
+        """get_suggestions() that raises on failure instead of returning an error message"""
+        request = self.suggestion_request(code_context, cursor_position)
+        request["priority"] = priority
+        content = self.complete(**request)
+        return json.loads(content).get("suggestions", ["No valid suggestions available"])
+
+    def suggestion_request(self, code_context, cursor_position):
+        """Messages and parameters for a get_suggestions() request"""
+        line_num, col_num = cursor_position
+        lines = code_context.split('\n')
+        current_line = lines[line_num - 1] if line_num <= len(lines) else ""
+        context_before = current_line[:col_num]
+
+        return {
+            "priority": "completion",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """You are a Python code completion assistant. 
+                    Provide short, relevant code suggestions based on context.
+                    Focus on completing the current statement or expression.
+                    Return a JSON object with an array of suggestions."""
+                },
+                {
+                    "role": "user",
+                    "content": f"Complete this Python code:\nContext before cursor: {context_before}\nFull line: {current_line}"
+                }
+            ],
+            "response_format": {"type": "json_object"},
+            "max_tokens": 150,
+            "temperature": 0.7,
+            "n": 3
+        }
+
     def analyze_code(self, code):
         """Analyze code and provide improvement suggestions"""
         if not self.client:
             return "AI analysis not available - API key not set"
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Analyze this Python code and provide:
-                        1. Code quality assessment
-                        2. Potential bugs and issues
-                        3. Performance improvements
-                        4. Best practices recommendations
-                        Return in JSON format with 'analysis' and 'suggestions' keys."""
-                    },
-                    {
-                        "role": "user",
-                        "content": code
-                    }
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=500
-            )
-
-            return json.loads(response.choices[0].message.content)
+            content = self.complete(**self.analysis_request(code))
+            return json.loads(content)
         except Exception as e:
             return {"error": str(e)}
 
+    def analyze_units(self, units):
+        """Analyze top-level units (see utils.code_units) and merge the results into analyze_code()'s shape
+
+        Only units whose fingerprint has not been analyzed before go to the
+        model, in parallel; the rest reuse their earlier analysis.
+        """
+        if not self.client:
+            return "AI analysis not available - API key not set"
+
+        results, pending = self._cached_unit_analyses(units)
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.unit_workers) as pool:
+                self._record_unit_analyses(results, pending, pool.map(self.analyze_code, [u.source for u in pending]))
+        return self.merge_unit_analyses(units, results)
+
+    def _cached_unit_analyses(self, units):
+        """Known analyses by fingerprint, plus the units (one per fingerprint) still to analyze"""
+        results = {}
+        pending = []
+        with self._unit_lock:
+            for unit in units:
+                if unit.fingerprint in results:
+                    continue
+                results[unit.fingerprint] = self._unit_analyses.get(unit.fingerprint)
+                if results[unit.fingerprint] is None:
+                    pending.append(unit)
+                else:
+                    self._unit_analyses.move_to_end(unit.fingerprint)
+        return results, pending
+
+    def _record_unit_analyses(self, results, pending, analyses):
+        # Wait for every analysis before taking the lock
+        analyses = list(analyses)
+        with self._unit_lock:
+            for unit, analysis in zip(pending, analyses):
+                results[unit.fingerprint] = analysis
+                if isinstance(analysis, dict) and 'error' not in analysis:
+                    self._unit_analyses[unit.fingerprint] = analysis
+            while len(self._unit_analyses) > self.unit_cache_entries:
+                self._unit_analyses.popitem(last=False)
+
+    @staticmethod
+    def merge_unit_analyses(units, results):
+        """Combine per-unit results into one {'analysis', 'suggestions'} dict, labelled by unit name"""
+        analysis = []
+        suggestions = []
+        failed = []
+        for unit in units:
+            result = results[unit.fingerprint]
+            if not isinstance(result, dict) or 'error' in result:
+                failed.append((unit, result.get('error') if isinstance(result, dict) else result))
+                continue
+            if result.get('analysis'):
+                analysis.append(f"{unit.name}: {result['analysis']}")
+            unit_suggestions = result.get('suggestions') or []
+            if not isinstance(unit_suggestions, list):
+                unit_suggestions = [unit_suggestions]
+            suggestions.extend(f"{unit.name}: {s}" if isinstance(s, str) else s for s in unit_suggestions)
+
+        if failed and len(failed) == len(units):
+            return {"error": str(failed[0][1])}
+        analysis.extend(f"{unit.name}: analysis failed ({error})" for unit, error in failed)
+        return {"analysis": "\n".join(analysis), "suggestions": suggestions}
+
+    def analysis_request(self, code):
+        """Messages and parameters for an analyze_code() request"""
+        return {
+            "priority": "analysis",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """Analyze this Python code and provide:
+                    1. Code quality assessment
+                    2. Potential bugs and issues
+                    3. Performance improvements
+                    4. Best practices recommendations
+                    Return in JSON format with 'analysis' and 'suggestions' keys."""
+                },
+                {
+                    "role": "user",
+                    "content": code
+                }
+            ],
+            "response_format": {"type": "json_object"},
+            "max_tokens": 500
+        }
+
     def get_documentation(self, code_element):
         """Generate documentation for code elements"""
         if not self.client:
             return "AI documentation not available - API key not set"
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Generate ONLY a JSON object with these exact keys and nothing else:
-                        {
-                            "description": "Brief description of what the code does",
-                            "params": [{"name": "param_name", "type": "param_type", "description": "param description"}],
-                            "returns": {"type": "return_type", "description": "description of return value"},
-                            "examples": ["example1", "example2"]
-                        }
-                        """
-                    },
-                    {
-                        "role": "user",
-                        "content": code_element
-                    }
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=300,
-                temperature=0.2  # Even lower temperature for strict JSON output
-            )
-
-            print(f"Raw documentation response: {response.choices[0].message.content}")  # Debug log
-            return json.loads(response.choices[0].message.content)
+            content = self.complete(**self.documentation_request(code_element))
+            print(f"Raw documentation response: {content}")  # Debug log
+            return json.loads(content)
         except json.JSONDecodeError as e:
             print(f"JSON parsing error: {e}")
-            print(f"Failed content: {response.choices[0].message.content}")
-            return {
-                "error": "Documentation format error",
-                "description": "Could not parse documentation output",
-                "params": [],
-                "returns": {"type": "unknown", "description": "Error generating documentation"},
-                "examples": []
-            }
+            print(f"Failed content: {content}")
+            return self.documentation_error("Documentation format error", "Could not parse documentation output",
+                                            "Error generating documentation")
         except Exception as e:
             print(f"Documentation generation error: {e}")
-            return {
-                "error": str(e),
-                "description": "Failed to generate documentation",
-                "params": [],
-                "returns": {"type": "unknown", "description": "Error in documentation generation"},
-                "examples": []
-            }
+            return self.documentation_error(str(e), "Failed to generate documentation",
+                                            "Error in documentation generation")
 
-    def get_code_fixes(self, code, errors):
-        """Get suggestions for fixing code errors"""
+    def get_batch_documentation(self, elements):
+        """Document several code units (see utils.code_units) in one request
+
+        Returns a list with the get_documentation() structure for each
+        element, in order; elements the model skipped get an error entry.
+        """
         if not self.client:
-            return "AI fixes not available - API key not set"
+            return [self.documentation_error("AI documentation not available - API key not set",
+                                             "Failed to generate documentation",
+                                             "Error in documentation generation")] * len(elements)
+        try:
+            content = self.complete(**self.batch_documentation_request(elements))
+        except Exception as e:
+            return [self.documentation_error(str(e), "Failed to generate documentation",
+                                             "Error in documentation generation")] * len(elements)
+        return self.split_batch_documentation(elements, content)
 
+    def split_batch_documentation(self, elements, content):
+        """Per-element documentation from a batch_documentation_request() response"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            result = json.loads(content)
+        except json.JSONDecodeError:
+            result = None
+        if not isinstance(result, dict):
+            return [self.documentation_error("Documentation format error", "Could not parse documentation output",
+                                             "Error generating documentation")] * len(elements)
+
+        docs = []
+        for number, element in enumerate(elements, 1):
+            entry = result.get(str(number))
+            if isinstance(entry, dict):
+                docs.append(entry)
+            else:
+                docs.append(self.documentation_error("Missing from batch response", "No documentation returned",
+                                                     "Error generating documentation"))
+        return docs
+
+    @staticmethod
+    def documentation_error(error, description, returns):
+        """Documentation-shaped result for a failed get_documentation() call"""
+        return {
+            "error": error,
+            "description": description,
+            "params": [],
+            "returns": {"type": "unknown", "description": returns},
+            "examples": []
+        }
+
+    def documentation_request(self, code_element):
+        """Messages and parameters for a get_documentation() request"""
+        return {
+            "priority": "documentation",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """Generate ONLY a JSON object with these exact keys and nothing else:
                     {
-                        "role": "system",
-                        "content": """Provide suggestions to fix the code errors.
-                        Return a JSON object with:
-                        - fixes: array of suggested fixes
-                        - explanations: array of fix explanations"""
-                    },
+                        "description": "Brief description of what the code does",
+                        "params": [{"name": "param_name", "type": "param_type", "description": "param description"}],
+                        "returns": {"type": "return_type", "description": "description of return value"},
+                        "examples": ["example1", "example2"]
+                    }
+                    """
+                },
+                {
+                    "role": "user",
+                    "content": code_element
+                }
+            ],
+            "response_format": {"type": "json_object"},
+            "max_tokens": 300,
+            "temperature": 0.2  # Even lower temperature for strict JSON output
+        }
+
+    def batch_documentation_request(self, elements):
+        """Messages and parameters for a get_batch_documentation() request"""
+        listing = "\n\n".join(
+            f"### {number}: {element.name}\n{element.source}" for number, element in enumerate(elements, 1)
+        )
+        return {
+            "priority": "documentation",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """Document each numbered Python code element below.
+                    Generate ONLY a JSON object mapping every element number (as a string) to an object
+                    with these exact keys and nothing else:
                     {
-                        "role": "user",
-                        "content": f"Code:\n{code}\n\nErrors:\n{json.dumps(errors, indent=2)}"
+                        "description": "Brief description of what the code does",
+                        "params": [{"name": "param_name", "type": "param_type", "description": "param description"}],
+                        "returns": {"type": "return_type", "description": "description of return value"},
+                        "examples": ["example1", "example2"]
                     }
-                ],
-                response_format={"type": "json_object"},
-                max_tokens=400
-            )
+                    """
+                },
+                {
+                    "role": "user",
+                    "content": listing
+                }
+            ],
+            "response_format": {"type": "json_object"},
+            "max_tokens": min(300 * len(elements), 4096),
+            "temperature": 0.2
+        }
+
+    def get_code_fixes(self, code, errors):
+        """Get suggestions for fixing code errors"""
+        if not self.client:
+            return "AI fixes not available - API key not set"
 
-            return json.loads(response.choices[0].message.content)
+        try:
+            content = self.complete(**self.fixes_request(code, errors))
+            return json.loads(content)
         except Exception as e:
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+
+    def fixes_request(self, code, errors):
+        """Messages and parameters for a get_code_fixes() request"""
+        return {
+            "priority": "fixes",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """Provide suggestions to fix the code errors.
+                    Return a JSON object with:
+                    - fixes: array of suggested fixes
+                    - explanations: array of fix explanations"""
+                },
+                {
+                    "role": "user",
+                    "content": f"Code:\n{code}\n\nErrors:\n{json.dumps(errors, indent=2)}"
+                }
+            ],
+            "response_format": {"type": "json_object"},
+            "max_tokens": 400
+        }
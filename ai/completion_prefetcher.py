@@ -0,0 +1,168 @@
+"""Speculative completion requests fired when the cursor rests."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+Position = Tuple[int, int]
+
+
+class CompletionPrefetcher:
+    """Fetches completions in the background once the cursor has been idle for ``idle`` seconds.
+
+    Results are stored with the document version, cursor position and
+    character offset they were computed for. The editor reports each edit
+    that only inserts text (``inserted()``), so the prefetcher knows which
+    versions differ from an earlier one by a run of characters typed at one
+    spot. A later lookup is answered from a result for the same (version,
+    position), or from one that many characters back when they still match
+    the start of a suggestion; the suggestions are then advanced past what
+    was typed. No copy of the document is kept, and the text is only built,
+    from an O(1) buffer snapshot, by the worker thread when it fetches. The
+    worker thread starts on the first ``schedule()`` call.
+    """
+    def __init__(self, fetch: Callable[[str, Position], List[str]], idle: float = 0.3,
+                 max_entries: int = 32, max_typed: int = 40):
+        self.fetch = fetch
+        self.idle = idle
+        self.max_entries = max_entries
+        self.max_typed = max_typed
+        self._cond = threading.Condition()
+        self._pending: Optional[Tuple[int, Position, object, int]] = None
+        self._deadline = 0.0
+        # (version, position) -> (offset, suggestions)
+        self._entries: "OrderedDict[Tuple[int, Position], Tuple[int, List[str]]]" = OrderedDict()
+        # version -> (earlier version, offset, text typed at that offset since)
+        self._typed: "OrderedDict[int, Tuple[int, int, str]]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.prefetches = 0
+        self.hits = 0
+        self.advanced_hits = 0
+        self.misses = 0
+
+    def schedule(self, version: int, position: Position, source, offset: int) -> None:
+        """Note the cursor is at ``position`` (character ``offset``); prefetch if it stays there.
+
+        ``source`` is the text, or an object whose ``text()`` gives it, such
+        as a TextBuffer snapshot; it is only read if the fetch happens.
+        """
+        with self._cond:
+            if (version, position) in self._entries:
+                return
+            self._pending = (version, position, source, offset)
+            self._deadline = time.monotonic() + self.idle
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="completion-prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def inserted(self, version: int, new_version: int, offset: int, text: str) -> None:
+        """Record that ``new_version`` is ``version`` with ``text`` inserted at ``offset``."""
+        with self._cond:
+            base = self._typed.get(version)
+            if base is not None and offset == base[1] + len(base[2]):
+                base = (base[0], base[1], base[2] + text)
+            else:
+                base = (version, offset, text)
+            if '\n' in base[2] or len(base[2]) > self.max_typed:
+                return
+            self._typed[new_version] = base
+            while len(self._typed) > 4 * self.max_entries:
+                self._typed.popitem(last=False)
+
+    def cancel(self) -> None:
+        with self._cond:
+            self._pending = None
+            self._cond.notify_all()
+
+    def lookup(self, version: int, position: Position, offset: int) -> Optional[List[str]]:
+        """Prefetched suggestions valid for this cursor, or None."""
+        with self._cond:
+            entry = self._entries.get((version, position))
+            if entry is not None:
+                self._entries.move_to_end((version, position))
+                self.hits += 1
+                return entry[1]
+
+            typed = self._typed.get(version)
+            if typed is not None and offset == typed[1] + len(typed[2]):
+                # Newest first: the cursor most likely advanced from the latest prefetch
+                for (old_version, (line, _)), (old_offset, suggestions) in reversed(self._entries.items()):
+                    if line != position[0]:
+                        continue
+                    since = self._typed_since(old_version, old_offset, typed)
+                    if since is None:
+                        continue
+                    advanced = [s[len(since):] for s in suggestions if s.startswith(since) and len(s) > len(since)]
+                    if advanced:
+                        self.advanced_hits += 1
+                        return advanced
+            self.misses += 1
+            return None
+
+    def _typed_since(self, old_version: int, old_offset: int, typed: Tuple[int, int, str]) -> Optional[str]:
+        """Text typed at ``old_offset`` since ``old_version``, if that is the only difference."""
+        base_version, base_offset, text = typed
+        if old_version == base_version:
+            done = ""
+        else:
+            earlier = self._typed.get(old_version)
+            if earlier is None or earlier[:2] != (base_version, base_offset) or not text.startswith(earlier[2]):
+                return None
+            done = earlier[2]
+        if old_offset != base_offset + len(done):
+            return None
+        return text[len(done):]
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._pending = None
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _next_request(self) -> Optional[Tuple[int, Position, str, int]]:
+        with self._cond:
+            while not self._stopped:
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                request, self._pending = self._pending, None
+                return request
+            return None
+
+    def _run(self) -> None:
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            version, position, source, offset = request
+            try:
+                code = source if isinstance(source, str) else source.text()
+                suggestions = self.fetch(code, position)
+            except Exception as e:
+                print(f"Error prefetching completions: {str(e)}")
+                continue
+            self.prefetches += 1
+            with self._cond:
+                self._entries[(version, position)] = (offset, suggestions)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._cond:
+            lookups = self.hits + self.advanced_hits + self.misses
+            return {
+                "prefetches": self.prefetches,
+                "hits": self.hits,
+                "advanced_hits": self.advanced_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.advanced_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,147 @@
+"""Two-tier (memory + SQLite) cache for chat-completion responses."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def request_key(model: str, messages: Any, params: Dict[str, Any]) -> str:
+    """Digest of everything that determines a completion request."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Caches completion texts by request key.
+
+    Lookups try an in-memory LRU first, then a SQLite table on disk. Entries
+    expire after ``ttl`` seconds in both tiers; the disk tier is also trimmed
+    to ``max_bytes`` by evicting the least recently used rows.
+    """
+    def __init__(self, path: Optional[str] = None, ttl: float = 7 * 24 * 3600,
+                 memory_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path or os.path.expanduser("~/.pyide-ai-cache.sqlite3")
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = self._open_db()
+
+    def _open_db(self) -> Optional[sqlite3.Connection]:
+        try:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            db.commit()
+            return db
+        except Exception as e:
+            print(f"Warning: AI response cache disabled on disk: {e}")
+            return None
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        value, created = row
+                        if now - created <= self.ttl:
+                            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                            self._db.commit()
+                            self._remember(key, value, created)
+                            self.disk_hits += 1
+                            return value
+                        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._db.commit()
+                except sqlite3.Error as e:
+                    # A locked or damaged disk tier is a miss, not a failed request
+                    print(f"Error reading AI response cache: {e}")
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, now, now, len(value.encode("utf-8")))
+                )
+                self._evict(now)
+                self._db.commit()
+            except Exception as e:
+                print(f"Error writing AI response cache: {e}")
+
+    def _remember(self, key: str, value: str, created: float) -> None:
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            disk_entries = 0
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries
+            }
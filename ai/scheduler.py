@@ -0,0 +1,296 @@
+"""Client-side admission control for AI requests: priorities, rate limits, retries and a circuit breaker."""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Lower value runs first
+# "prefetch" is speculative completion work, so completions the user asked for go first
+PRIORITIES = {"completion": 0, "prefetch": 1, "documentation": 2, "analysis": 3, "fixes": 4}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+def estimate_request_tokens(messages, params: Dict[str, Any]) -> int:
+    """Rough prompt + completion token count of a chat request, for rate limiting."""
+    prompt = sum(len(str(message.get("content", ""))) for message in messages) // 4
+    return prompt + params.get("max_tokens", 500) * params.get("n", 1)
+
+
+class TokenBucket:
+    """Refills ``rate`` units per minute up to ``capacity`` (default: one minute's worth)."""
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate / 60.0
+        self.capacity = capacity if capacity is not None else rate
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive upstream failures.
+
+    While open every call fails fast; after ``reset_timeout`` seconds a single
+    trial call is let through (half-open) and its outcome closes or re-opens
+    the circuit. A trial that ends without an outcome, e.g. because it was
+    cancelled, hands the trial back with ``release_trial()``.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Back to open without a new timeout, so the next call becomes the trial."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+
+def _is_degraded(error: Exception) -> bool:
+    """Errors that say the service itself is unhealthy (and count toward the breaker)."""
+    # Not imported here: the client imports openai on first use, and its errors cannot exist before that
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return False
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _is_retryable(error: Exception) -> bool:
+    openai = sys.modules.get("openai")
+    return _is_degraded(error) or (openai is not None and isinstance(error, openai.RateLimitError))
+
+
+class RequestScheduler:
+    """Orders AI requests by priority class and paces them to the account's rate limits.
+
+    ``call(priority, fn, tokens)`` blocks until the request is at the head of
+    the priority queue and both the requests/min and tokens/min buckets have
+    room, then runs ``fn``. Rate-limit and server errors are retried with
+    exponential backoff (honouring ``Retry-After``); consecutive server
+    failures open the circuit breaker, after which calls fail fast with
+    ``CircuitOpenError`` until the upstream recovers.
+    """
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 30000,
+                 max_retries: int = 3, base_backoff: float = 0.5, max_backoff: float = 20.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._cond = threading.Condition()
+        self._waiting: list = []
+        self._sequence = itertools.count()
+        self.metrics = {
+            name: {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "retries": 0,
+                   "queue_time_total": 0.0, "queue_time_max": 0.0, "backoff_time_total": 0.0}
+            for name in PRIORITIES
+        }
+
+    @classmethod
+    def from_env(cls) -> "RequestScheduler":
+        """Scheduler sized by ``PYIDE_REQUESTS_PER_MINUTE`` / ``PYIDE_TOKENS_PER_MINUTE`` if set."""
+        return cls(
+            requests_per_minute=float(os.getenv("PYIDE_REQUESTS_PER_MINUTE", 500)),
+            tokens_per_minute=float(os.getenv("PYIDE_TOKENS_PER_MINUTE", 30000))
+        )
+
+    def acquire(self, priority: str, tokens: int = 0) -> float:
+        """Wait for this request's turn and rate budget; returns the time spent queued."""
+        queued_at = time.monotonic()
+        entry = (PRIORITIES[priority], next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    if self._waiting[0] == entry:
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                        if wait == 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                        # If a higher-priority request arrives meanwhile it becomes the
+                        # head and gets the budget first; this one then waits its turn
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - queued_at
+            metrics = self.metrics[priority]
+            metrics["queue_time_total"] += waited
+            metrics["queue_time_max"] = max(metrics["queue_time_max"], waited)
+        return waited
+
+    def call(self, priority: str, fn: Callable[[], Any], tokens: int = 0) -> Any:
+        metrics = self._admit(priority)
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                self.acquire(priority, tokens)
+                try:
+                    result = fn()
+                except Exception as e:
+                    delay = self._after_failure(priority, e, attempt)
+                    if delay is None:
+                        settled = True
+                        raise
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                settled = True
+                with self._cond:
+                    metrics["completed"] += 1
+                return result
+        finally:
+            if not settled:
+                self.breaker.release_trial()
+
+    async def acall(self, priority: str, fn: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        """``call()`` for coroutines: queueing happens off the event loop, backoff with asyncio.sleep."""
+        metrics = self._admit(priority)
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                await asyncio.to_thread(self.acquire, priority, tokens)
+                try:
+                    result = await fn()
+                except Exception as e:
+                    delay = self._after_failure(priority, e, attempt)
+                    if delay is None:
+                        settled = True
+                        raise
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                settled = True
+                with self._cond:
+                    metrics["completed"] += 1
+                return result
+        finally:
+            # Cancelled (e.g. a losing race candidate) or interrupted while queued
+            # or backing off: no outcome to record, but a trial must not stay held
+            if not settled:
+                self.breaker.release_trial()
+
+    def _admit(self, priority: str) -> Dict[str, Any]:
+        metrics = self.metrics[priority]
+        allowed = self.breaker.allow()
+        with self._cond:
+            metrics["submitted"] += 1
+            if not allowed:
+                metrics["rejected"] += 1
+        if not allowed:
+            raise CircuitOpenError("AI service temporarily unavailable (circuit open)")
+        return metrics
+
+    def _after_failure(self, priority: str, error: Exception, attempt: int) -> Optional[float]:
+        """Record a failed attempt; return the backoff before retrying, or None to give up."""
+        metrics = self.metrics[priority]
+        if _is_degraded(error):
+            self.breaker.record_failure()
+        else:
+            # The service answered (a bad request, a rate limit): it is up
+            self.breaker.record_success()
+        if not _is_retryable(error) or attempt >= self.max_retries or not self.breaker.allow():
+            with self._cond:
+                metrics["failed"] += 1
+            return None
+        delay = min(self.max_backoff, self.base_backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            delay = min(self.max_backoff, max(delay, retry_after))
+        with self._cond:
+            metrics["retries"] += 1
+            metrics["backoff_time_total"] += delay
+        return delay
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        try:
+            return float(response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = len(self._waiting)
+            requests_available = self.requests.level
+            tokens_available = self.tokens.level
+        classes = {}
+        for name, metrics in self.metrics.items():
+            finished = metrics["completed"] + metrics["failed"]
+            attempts = finished + metrics["retries"]
+            classes[name] = dict(
+                metrics,
+                queue_time_avg=metrics["queue_time_total"] / attempts if attempts else 0.0
+            )
+        return {
+            "queued": queued,
+            "requests_available": round(requests_available, 1),
+            "tokens_available": round(tokens_available),
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "classes": classes
+        }
@@ -0,0 +1,516 @@
+"""Production ASGI app: async AI and blockchain endpoints, every other route served by the Flask app.
+
+Run with ``python main.py --serve [--host H] [--port P] [--workers N]`` or
+``uvicorn asgi_app:app``. Each worker process builds its own IDE, so
+session workspaces (edits, debugger, prefetch) live in one worker; put a
+sticky-session proxy in front when running more than one.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import main
+from ai.async_assistant import AsyncCodeAssistant
+from ai.candidate_generator import GenerationError
+from editor.code_editor import CodeEditor, VersionMismatch
+from utils.code_units import split_units
+from utils.completion_engine import merge_suggestions
+
+# Compiling shells out to solc and linting fans out to its own process pool;
+# both block, so they run here instead of on the event loop
+BLOCKING_WORKERS = int(os.getenv("PYIDE_BLOCKING_WORKERS", "8"))
+# Upstream AI calls in flight per worker process; the rest wait without holding a thread
+AI_CONCURRENCY = int(os.getenv("PYIDE_AI_CONCURRENCY", "32"))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if main.ide is None:
+        main.ide = main.IDE(test_mode=True)
+        main.ide.preload_ai_client()
+    shared = main.ide.code_assistant
+    # Same response cache and rate-limit budget as the synchronous assistant
+    app.state.assistant = AsyncCodeAssistant(cache=shared.cache, scheduler=shared.scheduler,
+                                             max_concurrency=AI_CONCURRENCY)
+    app.state.blocking = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+    try:
+        yield
+    finally:
+        # uvicorn has stopped accepting connections and drained in-flight requests by now
+        app.state.blocking.shutdown(wait=True, cancel_futures=True)
+        await app.state.assistant.aclose()
+        main.ide.workspaces.close_all()
+
+
+# Plain Starlette rather than FastAPI: nothing here uses request models, and
+# importing FastAPI (its pydantic models) takes longer than the rest of startup
+routes = []
+
+
+def route(path, methods=("POST",)):
+    """Serve ``path`` natively; every path not registered here goes to the Flask app"""
+    def register(endpoint):
+        routes.append(Route(path, endpoint, methods=list(methods)))
+        return endpoint
+    return register
+
+
+def error_response(e, status=500):
+    if isinstance(e, VersionMismatch):
+        # The client's synced copy is stale: it has to send the full text again
+        return JSONResponse({"error": str(e), "version": e.version}, status_code=409)
+    return JSONResponse({"error": str(e)}, status_code=status)
+
+
+async def read_json(request: Request):
+    body = await request.body()
+    return json.loads(body) if body else {}
+
+
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(app.state.blocking, fn, *args)
+
+
+def session_of(request: Request):
+    """(session id, the id to set as a cookie if the session is new, else None)"""
+    session_id, new = main.resolve_session_id(request.headers, request.cookies)
+    return session_id, session_id if new else None
+
+
+async def in_workspace(session_id, fn, *args):
+    """``fn(editor, *args)`` on a worker thread, holding the session's workspace lock"""
+    def call():
+        workspace = main.ide.workspaces.get(session_id)
+        with workspace.lock:
+            return fn(workspace.editor, *args)
+    return await run_in_threadpool(call)
+
+
+def with_session(response, session_id):
+    if session_id:
+        response.set_cookie(main.SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+    return response
+
+
+def sse_response(events, session_id=None):
+    return with_session(StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    ), session_id)
+
+
+def _load(editor, body, position=None):
+    """Put the request's document (``code``, or an already synced ``version``) and cursor into the session editor"""
+    main.sync_editor(editor, body)
+    if position is not None:
+        editor.cursor_pos = tuple(position)
+    return editor
+
+
+def _analysis_snapshot(editor, body):
+    editor = _load(editor, body)
+    blocker = editor.analysis_blocker()
+    if blocker:
+        return blocker, None, None
+    return None, split_units(editor.document), editor.content
+
+
+@route("/api/analyze")
+async def analyze_code(request: Request):
+    try:
+        body = await read_json(request)
+        session_id, new_session = session_of(request)
+        blocker, units, content = await in_workspace(session_id, _analysis_snapshot, body)
+        if blocker:
+            return with_session(JSONResponse(blocker), new_session)
+        assistant = request.app.state.assistant
+        analysis = await (assistant.analyze_units(units) if units else assistant.analyze_code(content))
+        return with_session(JSONResponse(CodeEditor.format_analysis(analysis)), new_session)
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/analyze/stream")
+async def analyze_code_stream(request: Request):
+    try:
+        body = await read_json(request)
+        session_id, new_session = session_of(request)
+        blocker, _, code = await in_workspace(session_id, _analysis_snapshot, body)
+        if blocker:
+            return with_session(JSONResponse(blocker), new_session)
+        assistant = request.app.state.assistant
+        if not assistant.client:
+            return JSONResponse("AI analysis not available - API key not set")
+
+        async def events():
+            parts = []
+            try:
+                async for delta in assistant.stream(**assistant.analysis_request(code)):
+                    parts.append(delta)
+                    yield main.sse_event("token", {"text": delta})
+                analysis = json.loads("".join(parts))
+                yield main.sse_event("result", {
+                    "text": f"Analysis: {analysis.get('analysis')}\nSuggestions: {analysis.get('suggestions')}",
+                    "analysis": analysis.get("analysis"),
+                    "suggestions": analysis.get("suggestions")
+                })
+            except Exception as e:
+                yield main.sse_event("error", {"error": f"Error analyzing code: {str(e)}"})
+
+        return sse_response(events(), new_session)
+    except Exception as e:
+        return error_response(e)
+
+
+def _documentation_target(editor, body, position):
+    editor = _load(editor, body, position)
+    if not len(editor.buffer):
+        return "No code to document", None
+    element = editor.element_at_line(editor.cursor_pos[0])
+    if element is None:
+        return "No documentable element found at cursor", None
+    return None, element
+
+
+@route("/api/document")
+async def generate_documentation(request: Request):
+    try:
+        body = await read_json(request)
+        session_id, new_session = session_of(request)
+        message, element = await in_workspace(
+            session_id, _documentation_target, body, body.get("position", (1, 1))
+        )
+        if message:
+            return with_session(JSONResponse(message), new_session)
+        docs = await request.app.state.assistant.get_documentation(element)
+        return with_session(JSONResponse(CodeEditor.format_documentation(docs)), new_session)
+    except Exception as e:
+        return error_response(e)
+
+
+def _completion_snapshot(editor, body, position):
+    """Local completions plus, if the editor cannot answer from prefetch, what to ask the model"""
+    editor = _load(editor, body, position)
+    if not len(editor.buffer):
+        return [], [], None
+    local = editor.get_local_completions()
+    if not editor.code_assistant.client:
+        return local, [], None
+    prefetched = editor.prefetched_suggestions()
+    if prefetched is not None:
+        return local, prefetched, None
+    return local, None, editor.suggestion_context()
+
+
+async def _ai_suggestions(assistant, prefetched, context):
+    if prefetched is not None:
+        return prefetched
+    return await assistant.get_suggestions(*context)
+
+
+@route("/api/complete")
+async def get_completion(request: Request):
+    try:
+        body = await read_json(request)
+        session_id, new_session = session_of(request)
+        local, prefetched, context = await in_workspace(
+            session_id, _completion_snapshot, body, body.get("position", (1, 1))
+        )
+        ai = []
+        if body.get("ai", True):
+            ai = await _ai_suggestions(request.app.state.assistant, prefetched, context)
+        return with_session(JSONResponse({"suggestions": merge_suggestions(local, ai), "local": local}), new_session)
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/complete/stream")
+async def get_completion_stream(request: Request):
+    try:
+        body = await read_json(request)
+        session_id, new_session = session_of(request)
+        local, prefetched, context = await in_workspace(
+            session_id, _completion_snapshot, body, body.get("position", (1, 1))
+        )
+        assistant = request.app.state.assistant
+
+        async def events():
+            yield main.sse_event("local", {"suggestions": local})
+            try:
+                ai = await _ai_suggestions(assistant, prefetched, context)
+                yield main.sse_event("ai", {"suggestions": ai})
+            except Exception as e:
+                ai = []
+                yield main.sse_event("error", {"error": str(e)})
+            yield main.sse_event("result", {"suggestions": merge_suggestions(local, ai)})
+
+        return sse_response(events(), new_session)
+    except Exception as e:
+        return error_response(e)
+
+
+def _prefetch(editor, body, position):
+    if "code" in body or "version" in body:
+        main.sync_editor(editor, body)
+    editor.cursor_pos = tuple(position)
+    editor.prefetch_completions = True
+    editor.schedule_prefetch()
+    return editor.version
+
+
+@route("/api/complete/prefetch")
+async def prefetch_completion(request: Request):
+    try:
+        body = await read_json(request)
+        session_id, new_session = session_of(request)
+        version = await in_workspace(session_id, _prefetch, body, body.get("position", (1, 1)))
+        return with_session(JSONResponse({"version": version}), new_session)
+    except Exception as e:
+        return error_response(e)
+
+
+def _apply_edits(editor, body):
+    """(response body, status) for an edit batch"""
+    base_version = body.get("base_version")
+    if base_version is not None and base_version != editor.version:
+        return {"error": str(VersionMismatch(editor.version)), "version": editor.version}, 409
+    try:
+        version = editor.apply_edit_batches(body.get("batches") or [body.get("edits", [])], body.get("cursor"))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {"version": version, "cursor": list(editor.cursor_pos)}, 200
+
+
+# Sent on every keystroke batch, so it skips the WSGI bridge
+@route("/api/edits")
+async def apply_edits(request: Request):
+    try:
+        body = await read_json(request)
+        session_id, new_session = session_of(request)
+        result, status = await in_workspace(session_id, _apply_edits, body)
+        return with_session(JSONResponse(result, status_code=status), new_session)
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/generate")
+async def generate_code(request: Request):
+    try:
+        body = await read_json(request)
+        prompt = body.get("prompt", "")
+        if not prompt:
+            return error_response("No prompt provided", 400)
+
+        try:
+            candidates = main.candidate_count(body)
+        except ValueError as e:
+            return error_response(e, 400)
+        if candidates > 1:
+            # The candidate race runs on its own worker threads
+            try:
+                code = await run_in_threadpool(
+                    lambda: main.ide.code_generator.generate(
+                        validate=main.parse_generated_code,
+                        candidates=candidates,
+                        **main.generation_request(prompt)
+                    )
+                )
+                return JSONResponse({"code": code})
+            except GenerationError as e:
+                return JSONResponse({"error": str(e), "code": e.content}, status_code=500)
+
+        generated_code = (await request.app.state.assistant.complete(
+            validate=main.parse_generated_code,
+            **main.generation_request(prompt)
+        )).strip()
+        try:
+            return JSONResponse({"code": main.parse_generated_code(generated_code)})
+        except (SyntaxError, ValueError, json.JSONDecodeError) as e:
+            return JSONResponse({
+                "error": f"Generated code is incomplete or contains errors: {str(e)}",
+                "code": generated_code
+            }, status_code=500)
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/generate/stream")
+async def generate_code_stream(request: Request):
+    try:
+        body = await read_json(request)
+        prompt = body.get("prompt", "")
+        if not prompt:
+            return error_response("No prompt provided", 400)
+        assistant = request.app.state.assistant
+        if not assistant.client:
+            return error_response("AI assistance not available - API key not set", 503)
+
+        async def events():
+            parts = []
+            try:
+                async for delta in assistant.stream(validate=main.parse_generated_code,
+                                                    **main.generation_request(prompt)):
+                    parts.append(delta)
+                    yield main.sse_event("token", {"text": delta})
+                generated_code = "".join(parts).strip()
+                try:
+                    yield main.sse_event("result", {"code": main.parse_generated_code(generated_code)})
+                except (SyntaxError, ValueError, json.JSONDecodeError) as e:
+                    yield main.sse_event("error", {
+                        "error": f"Generated code is incomplete or contains errors: {str(e)}",
+                        "code": generated_code
+                    })
+            except Exception as e:
+                yield main.sse_event("error", {"error": str(e)})
+
+        return sse_response(events())
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/lint/project")
+async def lint_project(request: Request):
+    try:
+        body = await read_json(request)
+        files = await run_in_threadpool(main.ide.file_browser.resolve_python_files, body.get("files"))
+        linter = main.ide.project_linter
+
+        def generate():
+            stats = {}
+            for result in linter.lint(files, stats):
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"done": True, "stats": stats}) + "\n"
+
+        return StreamingResponse(iterate_in_threadpool(generate()), media_type="application/x-ndjson")
+    except ValueError as e:
+        return error_response(e, 400)
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/ai/stats", methods=("GET",))
+async def get_ai_stats(request: Request):
+    try:
+        session_id, new_session = session_of(request)
+        assistant = main.ide.code_assistant
+        # Read-only: a session without a workspace does not get one
+        workspace = None if new_session else main.ide.workspaces.get(session_id, create=False)
+        return JSONResponse({
+            "cache": assistant.cache.stats(),
+            "scheduler": assistant.scheduler.stats(),
+            "prefetch": workspace.editor.completion_prefetcher.stats() if workspace else None,
+            "generation": main.ide.code_generator.stats(),
+            "async": request.app.state.assistant.stats()
+        })
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/debug/events", methods=("GET",))
+async def stream_debug_events(request: Request):
+    """Native, so an open stream waits on the event loop instead of holding a thread"""
+    try:
+        session_id, new_session = session_of(request)
+        workspace = None if new_session else main.ide.workspaces.get(session_id, create=False)
+        if workspace is None:
+            return error_response("No debug session", 404)
+        debugger = workspace.debugger
+        since = main.debug_resume_point(request.headers, request.query_params)
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def notify():
+            # Called on the debugger thread
+            loop.call_soon_threadsafe(wake.set)
+
+        async def events():
+            debugger.events.add_listener(notify)
+            try:
+                pending, last = main.debug_events_after(debugger, since)
+                while True:
+                    if pending:
+                        for event in pending:
+                            yield event
+                    elif workspace.closed:
+                        return
+                    else:
+                        try:
+                            await asyncio.wait_for(wake.wait(), main.DEBUG_KEEPALIVE_SECONDS)
+                        except asyncio.TimeoutError:
+                            yield main.SSE_KEEPALIVE
+                    # Cleared before reading, so an event appended after the read still wakes us
+                    wake.clear()
+                    pending, last = main.debug_events_after(debugger, last)
+            finally:
+                debugger.events.remove_listener(notify)
+
+        return sse_response(events())
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/blockchain/compile")
+async def compile_contract(request: Request):
+    try:
+        body = await read_json(request)
+        code = body.get("code", "")
+        if not code:
+            return error_response("No contract code provided", 400)
+        result = await run_blocking(main.ide.contract_developer.compile_contract, code, body.get("name", "Contract"))
+        return JSONResponse({"result": result})
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/blockchain/verify")
+async def verify_contract(request: Request):
+    try:
+        body = await read_json(request)
+        code = body.get("code", "")
+        if not code:
+            return error_response("No contract code provided", 400)
+        return JSONResponse(await run_blocking(main.ide.contract_developer.verify_contract, code))
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/blockchain/estimate-gas")
+async def estimate_contract_gas(request: Request):
+    try:
+        body = await read_json(request)
+        compiled_contract = body.get("contract")
+        if not compiled_contract:
+            return error_response("No compiled contract provided", 400)
+        gas = await run_blocking(main.ide.contract_developer.estimate_gas, compiled_contract)
+        return JSONResponse({"estimated_gas": gas})
+    except Exception as e:
+        return error_response(e)
+
+
+@route("/api/blockchain/deploy")
+async def deploy_contract(request: Request):
+    try:
+        body = await read_json(request)
+        code = body.get("code", "")
+        contract_name = body.get("name", "Contract")
+        if not code:
+            return error_response("No contract code provided", 400)
+        developer = main.ide.contract_developer
+        compiled_contract = await run_blocking(developer.compile_contract, code, contract_name)
+        return JSONResponse(await run_blocking(developer.deploy_contract, compiled_contract, contract_name))
+    except Exception as e:
+        return error_response(e)
+
+
+# Everything else (editor, symbols, sessions, debugger, pages) is the Flask app, run on a thread pool
+app = Starlette(routes=routes + [Mount("/", app=WSGIMiddleware(main.app))], lifespan=lifespan)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Benchmark AsyncCodeAssistant against a local fake OpenAI-compatible server.
+
+Run from the repository root:
+    python benchmarks/bench_async_assistant.py
+
+Identical concurrent requests should reach the server once, and distinct
+requests should take about ceil(requests / max_concurrency) round trips,
+with never more than max_concurrency of them in flight upstream.
+"""
+import asyncio
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.async_assistant import AsyncCodeAssistant
+from ai.response_cache import ResponseCache
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+DELAY = 0.2
+REQUESTS = 40
+MAX_CONCURRENCY = 8
+
+
+async def run(server, cache_path, prompts):
+    assistant = AsyncCodeAssistant(
+        cache=ResponseCache(path=cache_path),
+        max_concurrency=MAX_CONCURRENCY,
+        base_url=server.base_url,
+        api_key="test"
+    )
+    start = time.perf_counter()
+    results = await asyncio.gather(*(assistant.analyze_code(prompt) for prompt in prompts))
+    elapsed = time.perf_counter() - start
+    await assistant.client.close()
+    assert all("analysis" in result for result in results), results[:3]
+    return elapsed, assistant.stats()
+
+
+def main():
+    scenarios = [
+        ("identical", ["x = 1"] * REQUESTS),
+        ("distinct", [f"x = {i}" for i in range(REQUESTS)]),
+    ]
+    print(f"{REQUESTS} requests, {DELAY:.2f}s upstream latency, max_concurrency={MAX_CONCURRENCY}")
+    print(f"{'scenario':>10} {'time':>8} {'expected':>9} {'upstream':>9} {'coalesced':>10} {'peak':>5}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, prompts in scenarios:
+            with FakeOpenAIServer(delay=DELAY) as server:
+                elapsed, stats = asyncio.run(run(server, os.path.join(tmp, f"{name}.sqlite3"), prompts))
+                expected = math.ceil(len(set(prompts)) / MAX_CONCURRENCY) * DELAY
+                print(f"{name:>10} {elapsed:>7.2f}s {expected:>8.2f}s {server.requests:>9} "
+                      f"{stats['coalesced']:>10} {server.peak_active:>5}")
+
+
+if __name__ == "__main__":
+    main()
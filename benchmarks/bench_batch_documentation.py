@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Benchmark BatchDocumenter on a synthetic 300-function package against the fake OpenAI server.
+
+Run from the repository root:
+    python benchmarks/bench_batch_documentation.py
+
+One request per element at DELAY seconds each would take minutes; the cold
+run should take a few round trips, and the warm run (every element cached
+by AST fingerprint) should not reach the server at all.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.batch_documenter import BatchDocumenter
+from ai.code_assistant import CodeAssistant
+from ai.response_cache import ResponseCache
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+DELAY = 0.5
+MODULES = 10
+FUNCTIONS_PER_MODULE = 30
+
+
+def make_module(index):
+    functions = []
+    for number in range(FUNCTIONS_PER_MODULE):
+        functions.append(
+            f"def transform_{index}_{number}(values, scale={number}):\n"
+            f"    \"\"\"Scale and filter values for step {number}.\"\"\"\n"
+            f"    result = []\n"
+            f"    for value in values:\n"
+            f"        if value % {number + 2}:\n"
+            f"            result.append(value * scale)\n"
+            f"    return result\n"
+        )
+    return "\n\n".join(functions)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(delay=DELAY) as server:
+        files = []
+        for index in range(MODULES):
+            path = os.path.join(tmp, f"module_{index}.py")
+            with open(path, "w") as f:
+                f.write(make_module(index))
+            files.append(path)
+
+        os.environ["OPENAI_API_KEY"] = "test"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        assistant = CodeAssistant(cache=ResponseCache(path=os.path.join(tmp, "cache.sqlite3")))
+        documenter = BatchDocumenter(assistant)
+
+        elements = MODULES * FUNCTIONS_PER_MODULE
+        print(f"{elements} functions, {DELAY:.2f}s upstream latency "
+              f"(one request each, sequentially: {elements * DELAY:.0f}s)")
+        print(f"{'run':>6} {'time':>8} {'requests':>9} {'batches':>8} {'cached':>7} {'failed':>7}")
+        for run in ("cold", "warm"):
+            before = server.requests
+            start = time.perf_counter()
+            results = list(documenter.document_files(files))
+            elapsed = time.perf_counter() - start
+            stats = documenter.last_run
+            assert len(results) == elements
+            print(f"{run:>6} {elapsed:>7.2f}s {server.requests - before:>9} {stats['batches']:>8} "
+                  f"{stats['cached']:>7} {stats['failed']:>7}")
+
+
+if __name__ == "__main__":
+    main()
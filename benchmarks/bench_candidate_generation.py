@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Benchmark multi-candidate code generation against a fake server that truncates some replies.
+
+Run from the repository root:
+    python benchmarks/bench_candidate_generation.py
+
+With one candidate, every truncated reply is a failed generation; with
+three raced concurrently, a request only fails when all of them are
+truncated, and the first valid one usually arrives before the slowest.
+Each candidate reserves its own share of the tokens/min budget, so the
+scheduler here gets a generous one to keep rate limiting out of the numbers.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.candidate_generator import CandidateGenerator, GenerationError
+from ai.code_assistant import CodeAssistant
+from ai.response_cache import ResponseCache
+from ai.scheduler import RequestScheduler
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from main import generation_request, parse_generated_code
+
+DELAY = 0.2
+JITTER = 0.3
+TRUNCATE_RATE = 0.3
+PROMPTS = 40
+
+
+def main():
+    print(f"{PROMPTS} prompts, {DELAY:.2f}s + up to {JITTER:.2f}s upstream latency, "
+          f"{TRUNCATE_RATE:.0%} of replies truncated")
+    print(f"{'candidates':>10} {'time':>8} {'failed':>7} {'requests':>9} {'invalid':>8} "
+          f"{'cancelled':>10} {'p50':>8} {'p90':>8} {'p99':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for candidates in (1, 2, 3, 4):
+            with FakeOpenAIServer(delay=DELAY, jitter=JITTER, truncate_rate=TRUNCATE_RATE,
+                                  chunk_delay=0.01, seed=candidates) as server:
+                os.environ["OPENAI_API_KEY"] = "test"
+                os.environ["OPENAI_BASE_URL"] = server.base_url
+                assistant = CodeAssistant(cache=ResponseCache(path=os.path.join(tmp, f"{candidates}.sqlite3")),
+                                          scheduler=RequestScheduler(tokens_per_minute=10 ** 6))
+                generator = CandidateGenerator(assistant, candidates=candidates)
+                failed = 0
+                start = time.perf_counter()
+                for number in range(PROMPTS):
+                    try:
+                        generator.generate(validate=parse_generated_code,
+                                           **generation_request(f"print the number {number}"))
+                    except GenerationError:
+                        failed += 1
+                elapsed = time.perf_counter() - start
+                stats = generator.stats()
+                latency = stats["latency_ms"]
+                print(f"{candidates:>10} {elapsed:>7.2f}s {failed:>7} {server.requests:>9} "
+                      f"{stats['invalid']:>8} {stats['cancelled']:>10} "
+                      f"{latency['p50']:>6.0f}ms {latency['p90']:>6.0f}ms {latency['p99']:>6.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
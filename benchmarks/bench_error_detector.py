@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Benchmark ErrorDetector token scanning on growing inputs.
+
+Run from the repository root:
+    python benchmarks/bench_error_detector.py
+
+The per-line cost should stay flat as the input grows from 1k to 100k lines;
+the previous implementation rescanned all earlier tokens for each Error token
+and grew quadratically on error-heavy input.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.error_detector import ErrorDetector
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def make_source(lines, with_errors):
+    # '$' and '?' are not valid Python and lex as Error tokens
+    body = "value_{0} = compute({0}) $ ?\n" if with_errors else "value_{0} = compute({0})\n"
+    return "".join(body.format(i) for i in range(lines))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    detector = ErrorDetector()
+    print(f"{'lines':>8} {'scan':>10} {'us/line':>9} {'errors':>8}   {'check_code':>10} {'us/line':>9}")
+    for lines in SIZES:
+        scan_time, errors = timed(detector.check_tokens, make_source(lines, with_errors=True))
+        check_time, _ = timed(detector.check_code, make_source(lines, with_errors=False))
+        print(f"{lines:>8} {scan_time:>9.3f}s {scan_time / lines * 1e6:>9.2f} {len(errors):>8}   "
+              f"{check_time:>9.3f}s {check_time / lines * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Benchmark ProjectIndex cold and warm builds on a synthetic project.
+
+Run from the repository root:
+    python benchmarks/bench_project_index.py [files]
+
+The warm build should only stat files; after touching a handful of files
+only those should be re-read, and only the ones whose content changed
+re-parsed.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.project_index import ProjectIndex
+
+FILES = 2000
+TOUCHED = 20
+
+
+def make_module(index):
+    lines = [f"import os\n\nLIMIT_{index} = {index}\n\n"]
+    for number in range(10):
+        lines.append(
+            f"class Handler{index}_{number}:\n"
+            f"    def __init__(self, value):\n"
+            f"        self.value = value\n\n"
+            f"    def run(self, items):\n"
+            f"        return [helper_{index}(item, self.value) for item in items if item < LIMIT_{index}]\n\n\n"
+        )
+    lines.append(f"def helper_{index}(item, value):\n    return os.path.join(str(item), str(value))\n")
+    return "".join(lines)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else FILES
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for index in range(count):
+            path = os.path.join(tmp, "pkg", f"module_{index}.py")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(make_module(index))
+            files.append(path)
+
+        db_path = os.path.join(tmp, "symbols.sqlite3")
+        print(f"{count} files")
+        print(f"{'run':>14} {'time':>8} {'indexed':>8} {'unchanged':>10}")
+
+        def run(label):
+            # A new ProjectIndex each time, as after an IDE restart
+            index = ProjectIndex(db_path=db_path)
+            stats = index.update(files)
+            print(f"{label:>14} {stats['seconds']:>7.2f}s {stats['indexed']:>8} {stats['unchanged']:>10}")
+            return index
+
+        run("cold")
+        run("warm")
+
+        # Bump mtimes on some files; half also get new content
+        later = time.time() + 10
+        for number, path in enumerate(files[:TOUCHED]):
+            if number % 2:
+                with open(path, "a") as f:
+                    f.write(f"\n\ndef extra_{number}():\n    pass\n")
+            os.utime(path, (later, later))
+        index = run(f"{TOUCHED} touched")
+
+        start = time.perf_counter()
+        results = index.search("Handler1_", limit=20)
+        definitions = index.find_definitions("helper_7")
+        references = index.find_references("helper_7")
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"queries: {len(results)} search hits, {len(definitions)} definitions, "
+              f"{len(references)} references in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
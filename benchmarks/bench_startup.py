@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Measure IDE cold start and fail if it exceeds a time budget.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py [--budget 1.0] [--runs 5]
+
+Each measurement is a fresh interpreter, so nothing is warm but the OS file
+cache. Reports:
+  - the heaviest imports of ``import main`` (from ``python -X importtime``)
+  - import + ``IDE(test_mode=True)``, the setup ``main.py --test`` does
+    before its first AI call
+  - time until ``main.py --serve`` answers its first HTTP request
+It also checks that web3, solcx, openai, weasyprint and rich's layout
+engine are not imported by startup. They are only loaded when a feature
+needs them. Exits non-zero if any check fails.
+"""
+import argparse
+import http.client
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFERRED_MODULES = ["web3", "solcx", "openai", "weasyprint", "rich.layout"]
+
+IDE_STARTUP = """
+import sys, time
+started = time.perf_counter()
+import main
+ide = main.IDE(test_mode=True)
+elapsed = time.perf_counter() - started
+loaded = [name for name in {modules!r} if name in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def heaviest_imports(env, count):
+    """(cumulative microseconds, module) of the top-level imports of main, heaviest first."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        depth = len(name) - len(name.lstrip()) - 1
+        if depth == 0:
+            # Modules are listed after their imports; those before another
+            # top-level module (site, encodings...) were its imports, not main's
+            if name.strip() == "main":
+                imports.append((int(cumulative), "main"))
+                break
+            imports = []
+        elif depth == 2:
+            imports.append((int(cumulative), name.strip()))
+    imports.sort(reverse=True)
+    return imports[:count]
+
+
+def ide_startup(env):
+    code = IDE_STARTUP.format(modules=DEFERRED_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    # The last line is "<seconds> <comma-separated deferred modules that were loaded>"
+    elapsed, _, loaded = result.stdout.splitlines()[-1].partition(" ")
+    return float(elapsed), [name for name in loaded.split(",") if name]
+
+
+def server_startup(env, port):
+    """Seconds from spawning ``main.py --serve`` to its first successful response."""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "main.py", "--serve", "--port", str(port)], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", "/api/sessions")
+                if connection.getresponse().status == 200:
+                    return time.perf_counter() - started
+            except OSError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"Server did not start on port {port}")
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed for each startup measurement")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=5002)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as home:
+        # No real key is needed: nothing here calls the model
+        env = dict(os.environ, HOME=home, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "test"))
+
+        print("Heaviest imports of main (cumulative):")
+        for microseconds, name in heaviest_imports(env, 10):
+            print(f"  {microseconds / 1000:>8.1f}ms  {name}")
+
+        runs = [ide_startup(env) for _ in range(args.runs)]
+        ide_seconds = statistics.median(elapsed for elapsed, _ in runs)
+        loaded = sorted({name for _, names in runs for name in names})
+        print(f"\nimport main + IDE(): median {ide_seconds * 1000:.0f}ms over {args.runs} runs")
+        if ide_seconds > args.budget:
+            failures.append(f"IDE startup {ide_seconds:.2f}s exceeds {args.budget:.2f}s")
+        if loaded:
+            failures.append(f"startup imported deferred modules: {', '.join(loaded)}")
+
+        serve_seconds = statistics.median(server_startup(env, args.port) for _ in range(args.runs))
+        print(f"main.py --serve to first response: median {serve_seconds * 1000:.0f}ms over {args.runs} runs")
+        if serve_seconds > args.budget:
+            failures.append(f"server startup {serve_seconds:.2f}s exceeds {args.budget:.2f}s")
+
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"\nWithin the {args.budget:.2f}s budget; none of {', '.join(DEFERRED_MODULES)} imported at startup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Minimal OpenAI-compatible chat completions server for exercising the AI client code offline.
+
+Answers ``POST /v1/chat/completions`` after a fixed delay with a JSON object
+that echoes the last user message, in both plain and ``stream=True`` form,
+and counts the requests it served. Statuses queued with ``fail_next()`` are
+answered first, to simulate rate limiting or an outage. ``truncate_rate``
+cuts that fraction of replies in half, like output stopped by
+``max_tokens``; ``jitter`` adds up to that many seconds of random delay and
+``chunk_delay`` paces streamed chunks. Run it standalone:
+
+    python benchmarks/fake_openai_server.py --port 8765 --delay 0.5
+    OPENAI_API_KEY=test OPENAI_BASE_URL=http://127.0.0.1:8765/v1 python main.py --web
+
+or embed it with ``with FakeOpenAIServer(delay=0.2) as server: ... server.base_url``.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_reply(messages):
+    """Content the fake model answers with: valid JSON for every prompt the IDE sends"""
+    prompt = messages[-1]["content"] if messages else ""
+    # Batched documentation requests list elements as "### <number>: <name>"
+    numbered = re.findall(r"^### (\d+): (\S+)$", prompt, re.MULTILINE)
+    if numbered:
+        return json.dumps({
+            number: {
+                "description": f"Fake documentation for {name}",
+                "params": [],
+                "returns": {"type": "None", "description": "Nothing"},
+                "examples": []
+            }
+            for number, name in numbered
+        })
+    return json.dumps({
+        "suggestions": [f"suggestion for {prompt[:40]!r}"],
+        "analysis": f"Looked at {len(prompt)} characters",
+        "code": "print('hello from the fake model')\n",
+        "description": "Fake documentation",
+        "params": [],
+        "returns": {"type": "None", "description": "Nothing"},
+        "examples": [],
+        "fixes": [],
+        "explanations": []
+    })
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeOpenAIServer"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.active += 1
+            self.server.peak_active = max(self.server.peak_active, self.server.active)
+            status = self.server.failures.pop(0) if self.server.failures else None
+        try:
+            if status is not None:
+                self._fail(status)
+                return
+            with self.server.lock:
+                extra = self.server.random.uniform(0, self.server.jitter)
+                truncate = self.server.random.random() < self.server.truncate_rate
+            time.sleep(self.server.delay + extra)
+            content = fake_reply(body.get("messages", []))
+            if truncate:
+                content = content[:len(content) // 2]
+            if body.get("stream"):
+                try:
+                    self._stream(body, content)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed the stream early
+                    with self.server.lock:
+                        self.server.disconnected += 1
+            else:
+                self._reply(body, content)
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def _fail(self, status):
+        payload = json.dumps({"error": {"message": f"Simulated {status}", "type": "fake_error"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _reply(self, body, content):
+        payload = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body, content):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for start in range(0, len(content), 16):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"content": content[start:start + 16]}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if self.server.chunk_delay:
+                self.wfile.flush()
+                time.sleep(self.server.chunk_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.2,
+                 jitter: float = 0.0, truncate_rate: float = 0.0, chunk_delay: float = 0.0, seed: int = None):
+        super().__init__((host, port), _Handler)
+        self.delay = delay
+        self.jitter = jitter
+        self.truncate_rate = truncate_rate
+        self.chunk_delay = chunk_delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.peak_active = 0
+        self.disconnected = 0
+        self.failures = []
+        self._thread = None
+
+    def fail_next(self, count: int, status: int = 500) -> None:
+        """Answer the next ``count`` requests with an error ``status``."""
+        with self.lock:
+            self.failures.extend([status] * count)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds to wait before answering")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, at random")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="fraction of replies cut in half")
+    args = parser.parse_args()
+    server = FakeOpenAIServer(args.host, args.port, args.delay, jitter=args.jitter, truncate_rate=args.truncate_rate)
+    print(f"Fake OpenAI server on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Load-test the Flask dev server against the production ASGI mode.
+
+Run from the repository root:
+    python benchmarks/load_test.py [--users 50] [--duration 20] [--workers 1]
+
+Both servers are started as subprocesses (``python main.py`` and
+``python main.py --serve``) against the fake OpenAI server, with a fresh
+AI cache and generous client-side rate limits. Each virtual user has its
+own session and keep-alive connection, on its own thread, and loops over
+completion, analysis and edit requests with distinct code, so every AI
+request misses the cache and goes upstream. Reports throughput and
+latency percentiles per server.
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openai_server import FakeOpenAIServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(command, port, env):
+    process = subprocess.Popen(
+        [sys.executable, "main.py"] + command, cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        # Own process group, so the dev server's reloader child is stopped too
+        start_new_session=True
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/api/sessions")
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"Server {' '.join(command) or '(dev)'} did not start on port {port}")
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def user(port, number, stop_at, latencies, errors):
+    # One keep-alive connection per user, as a browser tab would hold
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    headers = {"X-Session-ID": f"load-user-{number:04d}", "Content-Type": "application/json"}
+    iteration = 0
+    while time.monotonic() < stop_at:
+        iteration += 1
+        code = f"def handler_{number}_{iteration}(request):\n    value = request.get('v{iteration}')\n    return val"
+        requests = [
+            ("/api/complete", {"code": code, "position": [3, 15]}),
+            ("/api/analyze", {"code": code}),
+            ("/api/edits", {"edits": [{"start": [1, 1], "end": [1, 1], "text": "#"}]}),
+        ]
+        for path, body in requests:
+            started = time.perf_counter()
+            try:
+                connection.request("POST", path, json.dumps(body), headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(f"{path}: HTTP {response.status}")
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(f"{path}: {type(e).__name__}")
+                connection.close()
+            latencies.append(time.perf_counter() - started)
+    connection.close()
+
+
+def load(port, users, duration):
+    """Threads rather than one asyncio client: a single async client's connection
+    pool becomes the bottleneck with dozens of connections"""
+    latencies, errors = [], []
+    started = time.monotonic()
+    threads = [threading.Thread(target=user, args=(port, number, started + duration, latencies, errors))
+               for number in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.monotonic() - started
+
+
+def percentile(ordered, point):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))] * 1000 if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load per server")
+    parser.add_argument("--workers", type=int, default=1, help="ASGI worker processes")
+    parser.add_argument("--delay", type=float, default=0.3, help="fake upstream latency in seconds")
+    args = parser.parse_args()
+
+    servers = [
+        ("flask dev", [], 5000),
+        (f"asgi x{args.workers}", ["--serve", "--port", "5001", "--workers", str(args.workers)], 5001),
+    ]
+    print(f"{args.users} users for {args.duration:.0f}s per server, {args.delay:.2f}s upstream latency")
+    print(f"{'server':>10} {'requests':>9} {'errors':>7} {'req/s':>7} {'p50':>8} {'p90':>8} {'p99':>8}")
+    with FakeOpenAIServer(delay=args.delay) as fake:
+        for name, command, port in servers:
+            with tempfile.TemporaryDirectory() as home:
+                env = dict(os.environ, HOME=home, OPENAI_API_KEY="test", OPENAI_BASE_URL=fake.base_url,
+                           PYIDE_REQUESTS_PER_MINUTE="1000000", PYIDE_TOKENS_PER_MINUTE="1000000000")
+                process = start_server(command, port, env)
+                try:
+                    latencies, errors, elapsed = load(port, args.users, args.duration)
+                finally:
+                    stop_server(process)
+            ordered = sorted(latencies)
+            print(f"{name:>10} {len(latencies):>9} {len(errors):>7} {len(latencies) / elapsed:>7.1f} "
+                  f"{percentile(ordered, 50):>6.0f}ms {percentile(ordered, 90):>6.0f}ms "
+                  f"{percentile(ordered, 99):>6.0f}ms")
+            if errors:
+                print(f"{'':>10} first errors: {errors[:3]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,31 @@
 from pathlib import Path
 import json
 from typing import Dict, Any, Optional
-from solcx import compile_standard, install_solc
-from web3 import Web3
 
 class SmartContractDeveloper:
-    """Utility class for smart contract development."""
-    def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider('http://localhost:8545'))
-        self._ensure_solc_installed()
+    """Utility class for smart contract development.
+
+    web3 and solcx are imported, the provider is created and solc is
+    installed on first use rather than here, so constructing one is free.
+    """
+    def __init__(self, provider_url: str = 'http://localhost:8545'):
+        self.provider_url = provider_url
+        self._w3 = None
+        self._solc_checked = False
+
+    @property
+    def w3(self):
+        if self._w3 is None:
+            from web3 import Web3
+            self._w3 = Web3(Web3.HTTPProvider(self.provider_url))
+        return self._w3
 
     def _ensure_solc_installed(self, version: str = "0.8.0") -> None:
-        """Ensure the specified version of solc is installed."""
+        """Ensure the specified version of solc is installed (checked once per instance)."""
+        if self._solc_checked:
+            return
+        self._solc_checked = True
+        from solcx import install_solc
         try:
             install_solc(version)
         except Exception as e:
@@ -20,6 +34,8 @@ class SmartContractDeveloper:
 
     def compile_contract(self, source_code: str, contract_name: str) -> Dict[str, Any]:
         """Compile a Solidity smart contract."""
+        from solcx import compile_standard
+        self._ensure_solc_installed()
         compiled_sol = compile_standard({
             "language": "Solidity",
             "sources": {
@@ -1,32 +1,195 @@
-from rich.syntax import Syntax
 from rich.text import Text
 from rich.panel import Panel
 from pygments.lexers import PythonLexer
 from utils.error_detector import ErrorDetector
 from ai.code_assistant import CodeAssistant
+from ai.completion_prefetcher import CompletionPrefetcher
+from editor.text_buffer import TextBuffer
+from editor.large_file import MappedBuffer, atomic_write
+from editor.highlighter import LineHighlighter
+from utils.lint_worker import LintWorker
+from utils.document_model import DocumentModel
+from utils.node_index import node_span
+from utils.code_units import split_units
+from utils.completion_engine import CompletionEngine, merge_suggestions
 import json
+import os
+import threading
+
+class VersionMismatch(Exception):
+    """A client referred to a document version the editor is not at; it has to send the full text again"""
+    def __init__(self, version):
+        super().__init__("Document version mismatch")
+        self.version = version
+
+class _LineLengths:
+    """Line lengths of a buffer as pending edits would leave it, without touching the buffer"""
+    def __init__(self, buffer):
+        self.buffer = buffer
+        # In order: (first line, count) spans of the buffer, or lists of edited line lengths
+        self._pieces = [(1, buffer.line_count)]
+
+    @property
+    def line_count(self):
+        return sum(piece[1] if isinstance(piece, tuple) else len(piece) for piece in self._pieces)
+
+    def line_length(self, line):
+        for piece in self._pieces:
+            if isinstance(piece, tuple):
+                if line <= piece[1]:
+                    return self.buffer.line_length(piece[0] + line - 1)
+                line -= piece[1]
+            else:
+                if line <= len(piece):
+                    return piece[line - 1]
+                line -= len(piece)
+        raise IndexError(line)
+
+    def contains(self, position):
+        line, col = position
+        return 1 <= line <= self.line_count and 1 <= col <= self.line_length(line) + 1
+
+    def replace(self, start, end, text):
+        lengths = [len(part) for part in text.split('\n')]
+        lengths[0] += start[1] - 1
+        lengths[-1] += self.line_length(end[0]) - end[1] + 1
+        self._pieces = (self._lines(1, start[0] - 1) + [lengths]
+                        + self._lines(end[0] + 1, self.line_count))
+
+    def _lines(self, first, last):
+        """Pieces covering lines ``first``..``last``"""
+        pieces = []
+        line = 1
+        for piece in self._pieces:
+            count = piece[1] if isinstance(piece, tuple) else len(piece)
+            skip = max(0, first - line)
+            keep = min(count, last - line + 1) - skip
+            if keep > 0:
+                if isinstance(piece, tuple):
+                    pieces.append((piece[0] + skip, keep))
+                else:
+                    pieces.append(piece[skip:skip + keep])
+            line += count
+        return pieces
+
 
 class CodeEditor:
-    def __init__(self):
+    def __init__(self, lint_debounce=0.3, large_file_threshold=64 * 1024 * 1024,
+                 analysis_size_limit=2 * 1024 * 1024, prefetch_idle=0.3,
+                 code_assistant=None, error_detector=None, lexer=None):
+        # The assistant, detector and lexer hold no per-document state, so
+        # editors serving different sessions can share them
         self.current_file = None
-        self.content = ""
+        self.buffer = TextBuffer()
+        self.version = 0
+        self._document = None
         self.cursor_pos = (1, 1)  # (line, column)
-        self.error_detector = ErrorDetector()
-        self.code_assistant = CodeAssistant()
+        self.error_detector = error_detector or ErrorDetector()
+        self.code_assistant = code_assistant or CodeAssistant()
         self.scroll_offset = 0
         self.suggestions = []
-        self.lexer = PythonLexer()
+        self.lexer = lexer or PythonLexer()
+        self.highlighter = LineHighlighter(self.lexer)
         self.editing_mode = "insert"  # insert or command
+        self.fixes = None
+        self._fixed_errors = None
+        # AI fixes are fetched on their own thread, latest lint result only
+        self._fixes_lock = threading.Lock()
+        self._fixes_request = None
+        self._fixes_thread = None
+        # Files at least this many bytes are memory-mapped instead of read
+        self.large_file_threshold = large_file_threshold
+        # Above this many characters linting and whole-buffer AI features are skipped
+        self.analysis_size_limit = analysis_size_limit
+        self.lint_worker = LintWorker(self.error_detector.check_code, debounce=lint_debounce,
+                                      on_result=self._handle_lint_result)
+        # Symbol completions answered locally; project_files is set by the IDE
+        self.completion_engine = CompletionEngine()
+        # Opt-in: fetch completions in the background when the cursor rests
+        self.prefetch_completions = False
+        self.completion_prefetcher = CompletionPrefetcher(
+            lambda code, position: self.code_assistant.suggest(code, position, priority="prefetch"),
+            idle=prefetch_idle)
         print("CodeEditor initialized")
 
+    def close(self):
+        """Stop background workers and release the buffer"""
+        self.lint_worker.stop()
+        self.completion_prefetcher.stop()
+        if isinstance(self.buffer, MappedBuffer):
+            self.buffer.close()
+        self.buffer = TextBuffer()
+
+    @property
+    def content(self):
+        return self.buffer.text()
+
+    @content.setter
+    def content(self, value):
+        # Re-sending the same text (as the web endpoints do) keeps the version
+        if not self.large_file and value == self.buffer.text():
+            return
+        self._set_buffer(TextBuffer(value))
+
+    def sync(self, code=None, version=None):
+        """Bring the editor to the client's copy of the document
+
+        Either the full ``code``, or the ``version`` of the text the client
+        already sent (full text, then range edits), so it is not uploaded
+        again. Raises VersionMismatch if the client's copy is another version.
+        """
+        if code is None and version is not None:
+            if version != self.version:
+                raise VersionMismatch(self.version)
+            return
+        self.content = code or ''
+
+    def _set_buffer(self, buffer):
+        if isinstance(self.buffer, MappedBuffer):
+            self.buffer.close()
+        self.buffer = buffer
+        self.version += 1
+        self.highlighter.reset(self.buffer.line_count)
+
+    @property
+    def large_file(self):
+        return isinstance(self.buffer, MappedBuffer)
+
+    def within_analysis_limit(self):
+        return len(self.buffer) <= self.analysis_size_limit
+
+    @property
+    def document(self):
+        """Parsed view of the current version, shared by linting and lookups"""
+        if self._document is None or self._document.version != self.version:
+            self._document = DocumentModel(self._source(), self.version)
+        return self._document
+
+    def _source(self):
+        """The current text, as an O(1) rope snapshot when possible
+
+        Its text is built where it is first needed, usually on the lint or
+        prefetch thread rather than on the keystroke.
+        """
+        return self.buffer.snapshot() if isinstance(self.buffer, TextBuffer) else self.content
+
+    @property
+    def diagnostics(self):
+        """Latest completed lint results; may lag behind the buffer while typing"""
+        return self.lint_worker.latest()[1]
+
     def load_file(self, filepath):
         try:
-            with open(filepath, 'r') as f:
-                self.content = f.read()
+            if os.path.getsize(filepath) >= self.large_file_threshold:
+                self._set_buffer(MappedBuffer(filepath))
+                print(f"Large file mode: memory-mapped {self.buffer.line_count} lines")
+            else:
+                with open(filepath, 'r') as f:
+                    self.content = f.read()
             self.current_file = filepath
             self.cursor_pos = (1, 1)
             self.scroll_offset = 0
-            self.check_for_errors()
+            self.schedule_lint()
             print(f"Loaded file: {filepath}")
             return "File loaded successfully"
         except Exception as e:
@@ -38,8 +201,7 @@ class CodeEditor:
         if not self.current_file:
             return "No file is currently open"
         try:
-            with open(self.current_file, 'w') as f:
-                f.write(self.content)
+            atomic_write(self.current_file, self.buffer.write_to)
             print(f"Saved file: {self.current_file}")
             return "File saved successfully"
         except Exception as e:
@@ -49,17 +211,16 @@ class CodeEditor:
 
     def move_cursor(self, direction):
         old_pos = self.cursor_pos
-        lines = self.content.split('\n')
         current_line, current_col = self.cursor_pos
 
         if direction == 'up' and current_line > 1:
-            self.cursor_pos = (current_line - 1, min(current_col, len(lines[current_line - 2]) + 1))
-        elif direction == 'down' and current_line < len(lines):
-            self.cursor_pos = (current_line + 1, min(current_col, len(lines[current_line]) + 1))
+            self.cursor_pos = (current_line - 1, min(current_col, self.buffer.line_length(current_line - 1) + 1))
+        elif direction == 'down' and current_line < self.buffer.line_count:
+            self.cursor_pos = (current_line + 1, min(current_col, self.buffer.line_length(current_line + 1) + 1))
         elif direction == 'left' and current_col > 1:
             self.cursor_pos = (current_line, current_col - 1)
         elif direction == 'right':
-            if current_col <= len(lines[current_line - 1]):
+            if current_col <= self.buffer.line_length(current_line):
                 self.cursor_pos = (current_line, current_col + 1)
 
         # Adjust scroll if cursor moves out of view
@@ -69,79 +230,291 @@ class CodeEditor:
             self.scroll_offset = current_line - 18
 
         print(f"Cursor moved {direction}: {old_pos} -> {self.cursor_pos}")
+        self.schedule_prefetch()
 
     def insert_text(self, text):
-        lines = self.content.split('\n')
         line_num, col_num = self.cursor_pos
-
-        if not lines:
-            self.content = text
-            self.cursor_pos = (1, len(text) + 1)
-            print(f"Inserted text in empty file: '{text}'")
-            return
-
-        current_line = lines[line_num - 1]
-        new_line = current_line[:col_num - 1] + text + current_line[col_num - 1:]
-        lines[line_num - 1] = new_line
-        self.content = '\n'.join(lines)
-        self.cursor_pos = (line_num, col_num + len(text))
+        offset = self.buffer.offset_at(line_num, col_num) if self.prefetch_completions else None
+        self.cursor_pos = self.buffer.replace_range(self.cursor_pos, self.cursor_pos, text)
+        self.version += 1
+        if offset is not None:
+            self.completion_prefetcher.inserted(self.version - 1, self.version, offset, text)
+        self.highlighter.edit(line_num, 1, 1 + text.count('\n'))
         print(f"Inserted text at {self.cursor_pos}: '{text}'")
-        self.check_for_errors()
+        self.schedule_lint()
+        self.schedule_prefetch()
 
     def delete_text(self, backspace=True):
-        if not self.content:
+        if not len(self.buffer):
             return
 
-        lines = self.content.split('\n')
         line_num, col_num = self.cursor_pos
 
         if backspace and col_num > 1:
-            current_line = lines[line_num - 1]
-            new_line = current_line[:col_num - 2] + current_line[col_num - 1:]
-            lines[line_num - 1] = new_line
+            self.buffer.replace_range((line_num, col_num - 1), (line_num, col_num), "")
+            self.version += 1
+            self.highlighter.edit(line_num, 1, 1)
             self.cursor_pos = (line_num, col_num - 1)
             print(f"Backspace at {self.cursor_pos}")
-        elif not backspace and col_num <= len(lines[line_num - 1]):
-            current_line = lines[line_num - 1]
-            new_line = current_line[:col_num - 1] + current_line[col_num:]
-            lines[line_num - 1] = new_line
+        elif not backspace and col_num <= self.buffer.line_length(line_num):
+            self.buffer.replace_range((line_num, col_num), (line_num, col_num + 1), "")
+            self.version += 1
+            self.highlighter.edit(line_num, 1, 1)
             print(f"Delete at {self.cursor_pos}")
 
-        self.content = '\n'.join(lines)
-        self.check_for_errors()
+        self.schedule_lint()
+        self.schedule_prefetch()
+
+    def apply_edits(self, edits):
+        """Apply a batch of range replacements in one pass and lint once at the end
+
+        Each edit is {"start": [line, col], "end": [line, col], "text": str},
+        with positions referring to the buffer before any edit in the batch,
+        as in an LSP TextEdit list. Edits must not overlap.
+        """
+        return self.apply_edit_batches([edits])
+
+    def apply_edit_batches(self, batches, cursor=None):
+        """Apply several edit batches in order, each against the text the previous one produced
+
+        Every batch is validated before any is applied, so a bad one raises
+        ValueError with the buffer, cursor and version untouched. Each
+        non-empty batch is one version; linting runs once at the end.
+        """
+        if not isinstance(batches, list):
+            raise ValueError("Edit batches must be a list")
+        batches = [self._edit_ranges(edits) for edits in batches]
+        if cursor is not None:
+            cursor = self._position(cursor)
+        # Check every position against the text the batches before it produce
+        lines = _LineLengths(self.buffer)
+        for ranges in batches:
+            for start, end, _ in ranges:
+                for position in (start, end):
+                    if not lines.contains(position):
+                        raise ValueError(f"Edit position {list(position)} is outside the document")
+            for start, end, text in reversed(ranges):
+                lines.replace(start, end, text)
+        if cursor is not None:
+            self.cursor_pos = cursor
+        batches = [ranges for ranges in batches if ranges]
+        if not batches:
+            return self.version
+
+        for ranges in batches:
+            self._apply_ranges(ranges)
+
+        # Keep the cursor in view
+        if self.cursor_pos[0] - self.scroll_offset < 2:
+            self.scroll_offset = max(0, self.cursor_pos[0] - 2)
+        elif self.cursor_pos[0] - self.scroll_offset > 18:
+            self.scroll_offset = self.cursor_pos[0] - 18
+
+        print(f"Applied {sum(map(len, batches))} edits, cursor at {self.cursor_pos}")
+        self.schedule_lint()
+        self.schedule_prefetch()
+        return self.version
+
+    @staticmethod
+    def _position(value):
+        """A (line, col) tuple from a client-sent pair of ints; ValueError otherwise"""
+        if (not isinstance(value, (list, tuple)) or len(value) != 2
+                or not all(type(part) is int for part in value)):
+            raise ValueError(f"Malformed position: {value!r}")
+        return tuple(value)
+
+    @classmethod
+    def _edit_ranges(cls, edits):
+        """Sorted (start, end, text) of an edit batch; ValueError if it is malformed or overlaps"""
+        if not isinstance(edits, list):
+            raise ValueError(f"Malformed edit batch: {edits!r}")
+        ranges = []
+        for edit in edits:
+            if not isinstance(edit, dict) or 'start' not in edit:
+                raise ValueError(f"Malformed edit: {edit!r}")
+            text = edit.get('text', '')
+            if not isinstance(text, str):
+                raise ValueError(f"Malformed edit text: {text!r}")
+            ranges.append((cls._position(edit['start']), cls._position(edit.get('end', edit['start'])), text))
+        ranges.sort()
+        for (start, end, _), (next_start, _, _) in zip(ranges, ranges[1:]):
+            if end > next_start:
+                raise ValueError(f"Overlapping edits at {start} and {next_start}")
+        if any(end < start for start, end, _ in ranges):
+            raise ValueError("Edit end precedes its start")
+        return ranges
+
+    def _apply_ranges(self, ranges):
+        # A lone insertion lets prefetched completions be advanced past what was typed
+        offset = None
+        if self.prefetch_completions and len(ranges) == 1 and ranges[0][0] == ranges[0][1]:
+            offset = self.buffer.offset_at(*ranges[0][0])
+        # Apply back to front so earlier positions stay valid
+        cursor = self.cursor_pos
+        for start, end, text in reversed(ranges):
+            new_end = self.buffer.replace_range(start, end, text)
+            self.highlighter.edit(start[0], end[0] - start[0] + 1, text.count('\n') + 1)
+            if cursor >= end:
+                if cursor[0] == end[0]:
+                    cursor = (new_end[0], new_end[1] + cursor[1] - end[1])
+                else:
+                    cursor = (cursor[0] + new_end[0] - end[0], cursor[1])
+            elif cursor > start:
+                cursor = new_end
+        self.cursor_pos = cursor
+        self.version += 1
+        if offset is not None:
+            self.completion_prefetcher.inserted(self.version - 1, self.version, offset, ranges[0][2])
+
+    def schedule_lint(self):
+        """Queue a background lint of the current version without blocking input"""
+        if not self.within_analysis_limit():
+            self.lint_worker.cancel()
+            self.lint_worker.publish(self.version, [])
+            return
+        self.lint_worker.submit(self.version, self.document)
 
     def check_for_errors(self):
-        """Check for code errors and get AI suggestions for fixes"""
-        errors = self.error_detector.check_code(self.content)
-        if errors:
-            print(f"Found {len(errors)} errors in code")
-            for error in errors:
-                print(f"Error at line {error.get('line')}: {error.get('message')}")
-
-            # Get AI suggestions for fixing errors
-            fixes = self.code_assistant.get_code_fixes(self.content, errors)
-            if isinstance(fixes, dict) and 'fixes' in fixes:
-                print("AI suggestions for fixes:")
-                for i, (fix, explanation) in enumerate(zip(fixes['fixes'], fixes['explanations']), 1):
-                    print(f"{i}. {explanation}")
+        """Check for code errors now and get AI suggestions for fixes"""
+        if not self.within_analysis_limit():
+            print("File exceeds the analysis size limit; skipping error check")
+            return []
+        document = self.document
+        self.lint_worker.cancel()
+        errors = self.error_detector.check_code(document)
+        self.lint_worker.publish(document.version, errors)
+        self._handle_lint_result(document.version, document, errors)
         return errors
 
-    def get_completion_suggestions(self):
-        """Get AI-powered code completion suggestions"""
-        if not self.content:
+    def _handle_lint_result(self, version, document, errors):
+        # Keep the completion index current off the typing path
+        self.completion_engine.update(document)
+        if not errors:
+            self.fixes = None
+            self._fixed_errors = None
+            return
+
+        print(f"Found {len(errors)} errors in code")
+        for error in errors:
+            print(f"Error at line {error.get('line')}: {error.get('message')}")
+
+        # Only ask for AI fixes when the set of errors actually changed
+        if errors == self._fixed_errors:
+            return
+        self._fixed_errors = errors
+        self._request_fixes(document, errors)
+
+    def _request_fixes(self, document, errors):
+        """Fetch AI fixes on a helper thread, so neither the lint worker nor close() waits on the network"""
+        with self._fixes_lock:
+            self._fixes_request = (document, errors)
+            if self._fixes_thread is not None:
+                return
+            self._fixes_thread = threading.Thread(target=self._fetch_fixes, name="lint-fixes", daemon=True)
+            self._fixes_thread.start()
+
+    def _fetch_fixes(self):
+        while True:
+            with self._fixes_lock:
+                request, self._fixes_request = self._fixes_request, None
+                if request is None:
+                    self._fixes_thread = None
+                    return
+            document, errors = request
+            try:
+                fixes = self.code_assistant.get_code_fixes(document.text, errors)
+            except Exception as e:
+                print(f"Error getting fixes: {str(e)}")
+                continue
+            # Drop fixes for errors that have been superseded meanwhile
+            if not isinstance(fixes, dict) or 'fixes' not in fixes or errors != self._fixed_errors:
+                continue
+            self.fixes = fixes
+            print("AI suggestions for fixes:")
+            for i, (fix, explanation) in enumerate(zip(fixes['fixes'], fixes['explanations']), 1):
+                print(f"{i}. {explanation}")
+
+    def schedule_prefetch(self):
+        """Let the prefetcher fetch completions for the cursor if it stays put"""
+        if not self.prefetch_completions or not self.code_assistant.client or not len(self.buffer):
+            return
+        if not self.within_analysis_limit():
+            return
+        self.completion_prefetcher.schedule(self.version, self.cursor_pos, self._source(),
+                                            self.buffer.offset_at(*self.cursor_pos))
+
+    def get_completion_suggestions(self, use_ai=True):
+        """Local symbol completions, followed by AI-powered suggestions"""
+        if not len(self.buffer):
             return []
 
+        local = self.get_local_completions()
+        ai = self.get_ai_suggestions() if use_ai else []
+        return merge_suggestions(local, ai)
+
+    def get_local_completions(self, limit=20):
+        """Symbol completions for the cursor from the local index, without a network round trip"""
+        if not len(self.buffer):
+            return []
+        if self.within_analysis_limit():
+            self.completion_engine.update(self.document)
         line_num, col_num = self.cursor_pos
-        suggestions = self.code_assistant.get_suggestions(self.content, (line_num, col_num))
+        return self.completion_engine.complete(self.buffer.get_line(line_num)[:col_num - 1], limit)
+
+    def get_ai_suggestions(self):
+        """Get AI-powered code completion suggestions"""
+        if not len(self.buffer) or not self.code_assistant.client:
+            return []
+
+        suggestions = self.prefetched_suggestions()
+        if suggestions is not None:
+            print(f"Got {len(suggestions)} prefetched completion suggestions")
+            return suggestions
+
+        suggestions = self.code_assistant.get_suggestions(*self.suggestion_context())
         print(f"Got {len(suggestions)} completion suggestions")
         return suggestions
 
+    def prefetched_suggestions(self):
+        """Suggestions the prefetcher already has for the cursor, or None"""
+        if not self.prefetch_completions or not self.within_analysis_limit():
+            return None
+        return self.completion_prefetcher.lookup(self.version, self.cursor_pos,
+                                                 self.buffer.offset_at(*self.cursor_pos))
+
+    def suggestion_context(self):
+        """(code, cursor position) to send for AI completions"""
+        line_num, col_num = self.cursor_pos
+        if self.within_analysis_limit():
+            return self.content, (line_num, col_num)
+        # Completion only looks at the cursor line, so send just that
+        return self.buffer.get_line(line_num), (1, col_num)
+
     def analyze_current_code(self):
         """Get AI analysis of current code"""
-        if not self.content:
+        blocker = self.analysis_blocker()
+        if blocker:
+            return blocker
+
+        # Analyze per function/class so unchanged ones reuse their earlier results;
+        # code that does not parse is sent whole
+        units = split_units(self.document)
+        if units:
+            analysis = self.code_assistant.analyze_units(units)
+        else:
+            analysis = self.code_assistant.analyze_code(self.content)
+        return self.format_analysis(analysis)
+
+    def analysis_blocker(self):
+        """Message explaining why the buffer cannot be analyzed, or None"""
+        if not len(self.buffer):
             return "No code to analyze"
+        if not self.within_analysis_limit():
+            return f"File too large to analyze ({len(self.buffer)} characters, limit {self.analysis_size_limit})"
+        return None
 
-        analysis = self.code_assistant.analyze_code(self.content)
+    @staticmethod
+    def format_analysis(analysis):
         if isinstance(analysis, dict):
             if 'error' in analysis:
                 return f"Error analyzing code: {analysis['error']}"
@@ -150,63 +523,70 @@ class CodeEditor:
 
     def get_documentation_at_cursor(self):
         """Get AI-generated documentation for the code element at cursor"""
-        if not self.content:
+        if not len(self.buffer):
             return "No code to document"
 
-        # Extract current function or class definition
-        lines = self.content.split('\n')
-        current_line = self.cursor_pos[0] - 1
-
-        # Simple extraction of current code block
-        start_line = current_line
-        while start_line > 0 and not lines[start_line].startswith(('def ', 'class ')):
-            start_line -= 1
-
-        if start_line < 0:
+        code_element = self.element_at_line(self.cursor_pos[0])
+        if code_element is None:
             return "No documentable element found at cursor"
 
-        # Extract the code block
-        end_line = start_line
-        indent = len(lines[start_line]) - len(lines[start_line].lstrip())
-        while end_line < len(lines) and (not lines[end_line].strip() or 
-                                       len(lines[end_line]) - len(lines[end_line].lstrip()) >= indent):
-            end_line += 1
-
-        code_element = '\n'.join(lines[start_line:end_line])
-        docs = self.code_assistant.get_documentation(code_element)
+        return self.format_documentation(self.code_assistant.get_documentation(code_element))
 
+    @staticmethod
+    def format_documentation(docs):
         if isinstance(docs, dict):
             if 'error' in docs:
                 return f"Error generating documentation: {docs['error']}"
             return f"Documentation:\n{json.dumps(docs, indent=2)}"
         return "Invalid documentation result"
 
+    def element_at_line(self, line):
+        """Source of the innermost def/class around ``line``"""
+        document = self.document if self.within_analysis_limit() else None
+        if document is not None and document.node_index is not None:
+            node = document.node_index.scope_at(line)
+            if node is None:
+                return None
+            start, end = node_span(node)
+            return document.get_block(start, end)
+
+        # The buffer does not parse (or is too large to); fall back to scanning for a def/class
+        # header above the cursor and taking its indented block
+        start_line = min(line, self.buffer.line_count)
+        while start_line > 1 and not self.buffer.get_line(start_line).lstrip().startswith(('def ', 'class ')):
+            start_line -= 1
+        header = self.buffer.get_line(start_line)
+        if not header.lstrip().startswith(('def ', 'class ')):
+            return None
+
+        indent = len(header) - len(header.lstrip())
+        end_line = start_line + 1
+        while end_line <= self.buffer.line_count:
+            text = self.buffer.get_line(end_line)
+            if text.strip() and len(text) - len(text.lstrip()) <= indent:
+                break
+            end_line += 1
+        return '\n'.join(self.buffer.get_lines(start_line, end_line - 1))
+
 
     def render(self):
         try:
-            if not self.content:
+            if not len(self.buffer):
                 return Text("No file open", style="italic")
 
-            # Calculate visible portion based on scroll offset
-            lines = self.content.split('\n')
-            visible_lines = lines[self.scroll_offset:self.scroll_offset + 20]
-            visible_content = '\n'.join(visible_lines)
-
-            # Create syntax highlighted content
-            syntax = Syntax(
-                visible_content,
-                "python",
-                theme="monokai",
-                line_numbers=True,
-                start_line=self.scroll_offset + 1,
-                highlight_lines={self.cursor_pos[0] - self.scroll_offset}
+            # Only the visible lines are highlighted, and only changed ones re-lexed
+            first_line = self.scroll_offset + 1
+            last_line = min(self.scroll_offset + 20, self.buffer.line_count)
+            syntax = self.highlighter.render(
+                self.buffer.get_line,
+                first_line,
+                last_line,
+                cursor_line=self.cursor_pos[0]
             )
 
             # Add cursor indicator
-            cursor_line = self.cursor_pos[0] - self.scroll_offset
-            if 1 <= cursor_line <= len(visible_lines):
-                print(f"Cursor visible at line {cursor_line}")
-                return syntax
+            if first_line <= self.cursor_pos[0] <= last_line:
+                print(f"Cursor visible at line {self.cursor_pos[0] - self.scroll_offset}")
 
             return syntax
         except Exception as e:
@@ -50,6 +50,26 @@ class FileBrowser:
             print(f"Error scanning Python files: {str(e)}")
         return python_files
 
+    def resolve_python_files(self, paths=None):
+        """The given paths (relative to the workspace) as workspace Python files, or all of them.
+
+        Raises ValueError for any path that is not a Python file under the
+        workspace, so clients cannot have arbitrary files read.
+        """
+        python_files = self.get_python_files()
+        if not paths:
+            return python_files
+        if not isinstance(paths, list):
+            raise ValueError("files must be a list of paths")
+        known = {os.path.realpath(path) for path in python_files}
+        resolved = []
+        for path in paths:
+            real = os.path.realpath(os.path.join(self.current_dir, str(path)))
+            if real not in known:
+                raise ValueError(f"Not a Python file in the workspace: {path}")
+            resolved.append(real)
+        return resolved
+
     def change_directory(self, path):
         try:
             os.chdir(path)
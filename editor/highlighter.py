@@ -0,0 +1,167 @@
+"""Incremental, line-cached syntax highlighting for the TUI editor."""
+from typing import Callable, List, Optional, Tuple
+
+from pygments.lexers import PythonLexer
+from pygments.token import Error, Whitespace
+from rich.syntax import Syntax
+from rich.text import Text
+
+State = Tuple[str, ...]
+LineTokens = List[Tuple[object, str]]
+
+ROOT: State = ('root',)
+
+# pygments.token._TokenType, without importing a private name
+TokenType = type(Error)
+
+
+class LineHighlighter:
+    """Caches highlighted tokens per line together with the lexer state at each line start.
+
+    After an edit only the touched lines are marked dirty. Re-lexing starts at
+    the first dirty line and keeps going only while the state at the start of
+    the next line differs from the cached one, so a one-character edit usually
+    re-lexes a single line, while opening a triple-quoted string re-lexes
+    until the string is closed again. Scrolling reuses cached lines as-is.
+
+    Resuming from a line's start state relies on the compiled state table of
+    Pygments' RegexLexer (``lexer._tokens``). A lexer without one is lexed
+    whole after every edit instead.
+    """
+    def __init__(self, lexer: Optional[PythonLexer] = None, theme: str = "monokai", max_gap: int = 2000):
+        self.lexer = lexer or PythonLexer()
+        self.incremental = isinstance(getattr(self.lexer, "_tokens", None), dict)
+        # Windows further than this past the verified prefix are lexed from a
+        # guessed root state instead of lexing every line above them
+        self.max_gap = max_gap
+        self.theme = Syntax.get_theme(theme)
+        self._starts: List[Optional[State]] = []
+        self._ends: List[Optional[State]] = []
+        self._tokens: List[Optional[LineTokens]] = []
+        # Lines before this index are known to be up to date
+        self._checked = 0
+        self.lexed_lines = 0
+        self.reset(1)
+
+    def reset(self, line_count: int) -> None:
+        """Forget everything, e.g. after loading a new file."""
+        self._starts = [None] * line_count
+        self._ends = [None] * line_count
+        self._tokens = [None] * line_count
+        self._checked = 0
+
+    def edit(self, line: int, removed: int, added: int) -> None:
+        """Record that ``removed`` lines starting at 1-based ``line`` became ``added`` lines."""
+        index = line - 1
+        self._starts[index:index + removed] = [None] * added
+        self._ends[index:index + removed] = [None] * added
+        self._tokens[index:index + removed] = [None] * added
+        self._checked = min(self._checked, index)
+
+    def highlight(self, get_line: Callable[[int], str], first: int, last: int) -> List[LineTokens]:
+        """Return tokens for 1-based lines ``first``..``last``, lexing only what changed."""
+        last = min(last, len(self._tokens))
+        if not self.incremental:
+            if None in self._tokens:
+                self._lex_all(get_line)
+            return self._tokens[first - 1:last]
+        if first - 1 - self._checked > self.max_gap:
+            start = first - 1
+            self._lex_range(get_line, start, last, self._ends[start - 1] or ROOT)
+        else:
+            start = self._checked
+            self._lex_range(get_line, start, last, self._ends[start - 1] if start > 0 else ROOT)
+            self._checked = max(self._checked, last)
+        return self._tokens[first - 1:last]
+
+    def _lex_range(self, get_line: Callable[[int], str], index: int, last: int, state: State) -> None:
+        while index < last:
+            if self._tokens[index] is None or self._starts[index] != state:
+                tokens, end = self._lex_line(get_line(index + 1), state)
+                self._tokens[index] = tokens
+                self._starts[index] = state
+                self._ends[index] = end
+                self.lexed_lines += 1
+            state = self._ends[index]
+            index += 1
+
+    def _lex_all(self, get_line: Callable[[int], str]) -> None:
+        """Lex the whole document with the lexer's public API and split the tokens into lines."""
+        text = "\n".join(get_line(number) for number in range(1, len(self._tokens) + 1)) + "\n"
+        lines: List[LineTokens] = [[]]
+        # Not get_tokens(): it strips leading and trailing newlines, which would shift every line
+        for _, token_type, value in self.lexer.get_tokens_unprocessed(text):
+            for part in value.splitlines(keepends=True):
+                lines[-1].append((token_type, part))
+                if part.endswith("\n"):
+                    lines.append([])
+        self._tokens = (lines + [[]] * len(self._tokens))[:len(self._tokens)]
+        self.lexed_lines += len(self._tokens)
+
+    def render(self, get_line: Callable[[int], str], first: int, last: int,
+               cursor_line: Optional[int] = None) -> Text:
+        """Build a rich Text for the given lines, with line numbers like rich.syntax.Syntax."""
+        width = len(str(last))
+        text = Text(style=self.theme.get_background_style(), end="")
+        for number, tokens in enumerate(self.highlight(get_line, first, last), first):
+            if number == cursor_line:
+                text.append(f"❱ {number:>{width}} ", style="bold yellow")
+            else:
+                text.append(f"  {number:>{width}} ", style="dim")
+            for token_type, value in tokens:
+                text.append(value.rstrip("\n"), style=self.theme.get_style_for_token(token_type))
+            text.append("\n")
+        text.rstrip()
+        return text
+
+    def _lex_line(self, line: str, state: State) -> Tuple[LineTokens, State]:
+        """Run the RegexLexer state machine over one line, returning its tokens and end state.
+
+        This mirrors ``RegexLexer.get_tokens_unprocessed``, which does not
+        expose the state stack it finishes in.
+        """
+        text = line + "\n"
+        tokendefs = self.lexer._tokens
+        stack = list(state)
+        statetokens = tokendefs[stack[-1]]
+        tokens: LineTokens = []
+        pos = 0
+        while pos < len(text):
+            for rexmatch, action, new_state in statetokens:
+                m = rexmatch(text, pos)
+                if not m:
+                    continue
+                if action is not None:
+                    if type(action) is TokenType:
+                        tokens.append((action, m.group()))
+                    else:
+                        tokens.extend((token_type, value) for _, token_type, value in action(self.lexer, m))
+                pos = m.end()
+                if new_state is not None:
+                    if isinstance(new_state, tuple):
+                        for name in new_state:
+                            if name == '#pop':
+                                if len(stack) > 1:
+                                    stack.pop()
+                            elif name == '#push':
+                                stack.append(stack[-1])
+                            else:
+                                stack.append(name)
+                    elif isinstance(new_state, int):
+                        if abs(new_state) >= len(stack):
+                            del stack[1:]
+                        else:
+                            del stack[new_state:]
+                    elif new_state == '#push':
+                        stack.append(stack[-1])
+                    statetokens = tokendefs[stack[-1]]
+                break
+            else:
+                if text[pos] == "\n":
+                    stack = list(ROOT)
+                    statetokens = tokendefs['root']
+                    tokens.append((Whitespace, "\n"))
+                else:
+                    tokens.append((Error, text[pos]))
+                pos += 1
+        return tokens, tuple(stack)
@@ -0,0 +1,264 @@
+"""Memory-mapped buffer for very large files and atomic saving."""
+import mmap
+import os
+import tempfile
+from array import array
+from bisect import bisect_right
+from typing import BinaryIO, Callable, List, Tuple
+
+WRITE_CHUNK = 1024 * 1024
+# Lines decoded at once when counting characters of a non-ASCII file
+CHAR_INDEX_LINES = 4096
+
+
+def atomic_write(path: str, write: Callable[[BinaryIO], None]) -> None:
+    """Write a file through ``write`` into a temp file, then rename it into place.
+
+    A crash mid-save leaves the original file untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class MappedBuffer:
+    """Line-oriented piece table over a memory-mapped file.
+
+    The file is indexed once (line start offsets in a compact array) and only
+    the lines actually requested are decoded. Edits replace whole lines:
+    the document is a list of segments that are either a range of original
+    lines (``[start, end)`` into the mapping) or a list of edited strings.
+    Exposes the same line/column API as ``TextBuffer``, with offsets and
+    ``len()`` in characters. Character offsets of the original lines are
+    indexed on first use; for ASCII files they are the byte offsets.
+    """
+    def __init__(self, path: str, encoding: str = 'utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._starts = self._index_lines()
+        self._chars = None
+        self._segments: List[list] = [['m', 0, len(self._starts)]]
+        self._reindex()
+
+    def _index_lines(self) -> array:
+        starts = array('Q', [0])
+        find = self._mm.find
+        index = find(b'\n')
+        while index != -1:
+            starts.append(index + 1)
+            index = find(b'\n', index + 1)
+        return starts
+
+    def close(self) -> None:
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def _char_starts(self) -> array:
+        """Character offset of each original line start."""
+        if self._chars is not None:
+            return self._chars
+        if all(self._mm[offset:offset + WRITE_CHUNK].isascii() for offset in range(0, self.size, WRITE_CHUNK)):
+            self._chars = self._starts
+            return self._chars
+        chars = array('Q', [0])
+        base = 0
+        for block in range(0, len(self._starts), CHAR_INDEX_LINES):
+            end = min(block + CHAR_INDEX_LINES, len(self._starts))
+            # Whole lines, including the newline that ends the block
+            data_end = self._starts[end] if end < len(self._starts) else self.size
+            text = self._mm[self._starts[block]:data_end].decode(self.encoding, 'replace')
+            index = text.find('\n')
+            while index != -1 and len(chars) < len(self._starts):
+                chars.append(base + index + 1)
+                index = text.find('\n', index + 1)
+            base += len(text)
+        self._chars = chars
+        return chars
+
+    def _original_chars(self, start: int, end: int) -> int:
+        """Characters of original lines ``[start, end)``, without the final newline."""
+        chars = self._char_starts()
+        if end < len(chars):
+            return chars[end] - 1 - chars[start]
+        return self._total_original_chars() - chars[start]
+
+    def _total_original_chars(self) -> int:
+        chars = self._char_starts()
+        if chars is self._starts:
+            return self.size
+        last = len(chars) - 1
+        return chars[last] + len(self._original_bytes(last, last + 1).decode(self.encoding, 'replace'))
+
+    def _reindex(self) -> None:
+        self._firsts = []
+        total = 0
+        for segment in self._segments:
+            self._firsts.append(total)
+            total += self._segment_length(segment)
+        self._line_count = total
+        # Character offset of each segment, computed when first needed
+        self._segment_offsets = None
+
+    def _offsets(self) -> List[int]:
+        if self._segment_offsets is None:
+            offsets = []
+            total = 0
+            for segment in self._segments:
+                offsets.append(total)
+                total += self._segment_chars(segment) + 1
+            self._segment_offsets = offsets
+        return self._segment_offsets
+
+    def _segment_chars(self, segment) -> int:
+        if segment[0] == 'm':
+            return self._original_chars(segment[1], segment[2])
+        return sum(len(line) for line in segment[1]) + len(segment[1]) - 1
+
+    @staticmethod
+    def _segment_length(segment) -> int:
+        return segment[2] - segment[1] if segment[0] == 'm' else len(segment[1])
+
+    def _end_offset(self, end: int) -> int:
+        """Byte offset just past original line ``end - 1``, excluding its newline."""
+        return self._starts[end] - 1 if end < len(self._starts) else self.size
+
+    def _original_bytes(self, start: int, end: int) -> bytes:
+        """Bytes of original lines ``[start, end)``, without the final newline."""
+        return self._mm[self._starts[start]:self._end_offset(end)]
+
+    def __len__(self) -> int:
+        """Number of characters, like ``TextBuffer``."""
+        return self._offsets()[-1] + self._segment_chars(self._segments[-1])
+
+    @property
+    def line_count(self) -> int:
+        return self._line_count
+
+    def get_line(self, line: int) -> str:
+        if line < 1 or line > self._line_count:
+            return ""
+        index = bisect_right(self._firsts, line - 1) - 1
+        segment = self._segments[index]
+        local = line - 1 - self._firsts[index]
+        if segment[0] == 's':
+            return segment[1][local]
+        original = segment[1] + local
+        return self._original_bytes(original, original + 1).decode(self.encoding, 'replace')
+
+    def line_start(self, line: int) -> int:
+        """Offset of the first character of ``line``."""
+        if line <= 1:
+            return 0
+        if line > self._line_count:
+            return len(self)
+        index = bisect_right(self._firsts, line - 1) - 1
+        segment = self._segments[index]
+        local = line - 1 - self._firsts[index]
+        offset = self._offsets()[index]
+        if segment[0] == 's':
+            return offset + sum(len(text) + 1 for text in segment[1][:local])
+        chars = self._char_starts()
+        return offset + chars[segment[1] + local] - chars[segment[1]]
+
+    def offset_at(self, line: int, col: int) -> int:
+        """Convert a (line, column) position to an offset, clamped to the line."""
+        start = self.line_start(line)
+        if line > self._line_count:
+            return start
+        return start + max(0, min(col - 1, self.line_length(max(line, 1))))
+
+    def position_at(self, offset: int) -> Tuple[int, int]:
+        """Convert an offset to a (line, column) position."""
+        offset = max(0, min(offset, len(self)))
+        offsets = self._offsets()
+        index = bisect_right(offsets, offset) - 1
+        segment = self._segments[index]
+        remaining = offset - offsets[index]
+        line = self._firsts[index] + 1
+        if segment[0] == 's':
+            for text in segment[1][:-1]:
+                if remaining <= len(text):
+                    break
+                remaining -= len(text) + 1
+                line += 1
+            return line, remaining + 1
+        chars = self._char_starts()
+        base = chars[segment[1]]
+        original = bisect_right(chars, base + remaining, segment[1], segment[2]) - 1
+        return line + original - segment[1], base + remaining - chars[original] + 1
+
+    def get_lines(self, start_line: int, end_line: int) -> List[str]:
+        return [self.get_line(line) for line in range(max(1, start_line), min(self._line_count, end_line) + 1)]
+
+    def line_length(self, line: int) -> int:
+        return len(self.get_line(line))
+
+    def text(self) -> str:
+        return '\n'.join(self.get_lines(1, self._line_count))
+
+    def replace_range(self, start: Tuple[int, int], end: Tuple[int, int], text: str) -> Tuple[int, int]:
+        """Replace the text between two (line, col) positions; returns the position after it."""
+        (start_line, start_col), (end_line, end_col) = start, end
+        head = self.get_line(start_line)[:start_col - 1]
+        tail = self.get_line(end_line)[end_col - 1:]
+        self._set_lines(start_line, end_line - start_line + 1, (head + text + tail).split('\n'))
+        inserted = text.split('\n')
+        if len(inserted) == 1:
+            return start_line, start_col + len(text)
+        return start_line + len(inserted) - 1, len(inserted[-1]) + 1
+
+    def _set_lines(self, line: int, count: int, new_lines: List[str]) -> None:
+        """Replace ``count`` lines starting at 1-based ``line`` with ``new_lines``."""
+        first, last = line - 1, line - 1 + count
+        before, after = [], []
+        for segment, seg_first in zip(self._segments, self._firsts):
+            seg_last = seg_first + self._segment_length(segment)
+            if seg_last <= first:
+                before.append(segment)
+            elif seg_first >= last:
+                after.append(segment)
+            else:
+                # Keep the parts of this segment outside [first, last)
+                if seg_first < first:
+                    before.append(self._slice(segment, 0, first - seg_first))
+                if seg_last > last:
+                    after.append(self._slice(segment, last - seg_first, seg_last - seg_first))
+        if before and before[-1][0] == 's':
+            new_lines = before.pop()[1] + new_lines
+        if after and after[0][0] == 's':
+            new_lines = new_lines + after.pop(0)[1]
+        self._segments = before + [['s', new_lines]] + after
+        self._reindex()
+
+    @staticmethod
+    def _slice(segment, start: int, end: int) -> list:
+        if segment[0] == 'm':
+            return ['m', segment[1] + start, segment[1] + end]
+        return ['s', segment[1][start:end]]
+
+    def write_to(self, f: BinaryIO) -> None:
+        """Stream the document out, copying unmodified ranges straight from the mapping."""
+        for index, segment in enumerate(self._segments):
+            if index:
+                f.write(b'\n')
+            if segment[0] == 's':
+                f.write('\n'.join(segment[1]).encode(self.encoding))
+                continue
+            data_start, data_end = self._starts[segment[1]], self._end_offset(segment[2])
+            for offset in range(data_start, data_end, WRITE_CHUNK):
+                f.write(self._mm[offset:min(offset + WRITE_CHUNK, data_end)])
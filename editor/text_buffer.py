@@ -0,0 +1,276 @@
+"""Rope-backed text buffer used by the code editor."""
+import random
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+# Initial pieces are cut to this size; edits may split them further.
+CHUNK_SIZE = 2048
+# Rebuild the tree from the materialized text after this many edits so that
+# keystroke-sized pieces do not accumulate forever.
+COMPACT_AFTER = 4096
+
+
+class _Node:
+    """Treap node holding one piece of text plus subtree aggregates."""
+    __slots__ = ("text", "breaks", "priority", "left", "right", "size", "newlines")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.breaks = text.count("\n")
+        self.priority = random.random()
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+        self.size = len(text)
+        self.newlines = self.breaks
+
+
+def _size(node: Optional[_Node]) -> int:
+    return node.size if node else 0
+
+
+def _newlines(node: Optional[_Node]) -> int:
+    return node.newlines if node else 0
+
+
+def _copy(node: _Node) -> _Node:
+    """Shallow copy. Edits copy the nodes on their path instead of changing
+    them, so a snapshot can keep sharing the rest of the tree."""
+    clone = _Node.__new__(_Node)
+    clone.text = node.text
+    clone.breaks = node.breaks
+    clone.priority = node.priority
+    clone.left = node.left
+    clone.right = node.right
+    clone.size = node.size
+    clone.newlines = node.newlines
+    return clone
+
+
+def _update(node: _Node) -> None:
+    node.size = len(node.text) + _size(node.left) + _size(node.right)
+    node.newlines = node.breaks + _newlines(node.left) + _newlines(node.right)
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left = _copy(left)
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right = _copy(right)
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _split(node: Optional[_Node], offset: int) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split a subtree into the first ``offset`` characters and the rest."""
+    if node is None:
+        return None, None
+    node = _copy(node)
+    left_size = _size(node.left)
+    if offset <= left_size:
+        left, right = _split(node.left, offset)
+        node.left = right
+        _update(node)
+        return left, node
+    offset -= left_size
+    if offset >= len(node.text):
+        left, right = _split(node.right, offset - len(node.text))
+        node.right = left
+        _update(node)
+        return node, right
+
+    # The cut falls inside this node's piece
+    tail = _Node(node.text[offset:])
+    node.text = node.text[:offset]
+    node.breaks = node.text.count("\n")
+    right = _merge(tail, node.right)
+    node.right = None
+    _update(node)
+    return node, right
+
+
+def _build(text: str) -> Optional[_Node]:
+    root = None
+    for start in range(0, len(text), CHUNK_SIZE):
+        root = _merge(root, _Node(text[start:start + CHUNK_SIZE]))
+    return root
+
+
+def _pieces(node: Optional[_Node], start: int, end: int) -> Iterator[str]:
+    """Yield the pieces covering ``[start, end)`` of a subtree, in order."""
+    if node is None or start >= end:
+        return
+    left_size = _size(node.left)
+    if start < left_size:
+        yield from _pieces(node.left, start, min(end, left_size))
+    text_end = left_size + len(node.text)
+    if start < text_end and end > left_size:
+        yield node.text[max(start - left_size, 0):min(end, text_end) - left_size]
+    if end > text_end:
+        yield from _pieces(node.right, max(start - text_end, 0), end - text_end)
+
+
+class TextBuffer:
+    """Editable text with O(log n) edits and line/column lookups.
+
+    The text is stored as a treap of pieces, each node caching the length and
+    newline count of its subtree, which doubles as the line-start index.
+    Edits never change existing nodes, so ``snapshot()`` is O(1).
+    Offsets are 0-based; lines and columns are 1-based like ``cursor_pos``.
+    """
+
+    def __init__(self, text: str = ""):
+        self._root = _build(text)
+        self._text: Optional[str] = text
+        self._edits = 0
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def snapshot(self) -> "TextBuffer":
+        """A copy of the current contents that later edits to this buffer do not change."""
+        clone = TextBuffer.__new__(TextBuffer)
+        clone._root = self._root
+        clone._text = self._text
+        clone._edits = self._edits
+        return clone
+
+    @property
+    def line_count(self) -> int:
+        return _newlines(self._root) + 1
+
+    def text(self) -> str:
+        """Return the full contents, materializing them only when changed."""
+        if self._text is None:
+            self._text = "".join(_pieces(self._root, 0, len(self)))
+            if self._edits >= COMPACT_AFTER:
+                self._root = _build(self._text)
+                self._edits = 0
+        return self._text
+
+    def substring(self, start: int, end: int) -> str:
+        start = max(0, start)
+        end = min(len(self), end)
+        if self._text is not None:
+            return self._text[start:end]
+        return "".join(_pieces(self._root, start, end))
+
+    def insert(self, offset: int, text: str) -> None:
+        if not text:
+            return
+        offset = max(0, min(offset, len(self)))
+        left, right = _split(self._root, offset)
+        self._root = _merge(_merge(left, _build(text)), right)
+        self._changed()
+
+    def delete(self, offset: int, length: int) -> None:
+        offset = max(0, min(offset, len(self)))
+        length = min(length, len(self) - offset)
+        if length <= 0:
+            return
+        left, rest = _split(self._root, offset)
+        _, right = _split(rest, length)
+        self._root = _merge(left, right)
+        self._changed()
+
+    def replace(self, offset: int, length: int, text: str) -> None:
+        self.delete(offset, length)
+        self.insert(offset, text)
+
+    def replace_range(self, start: Tuple[int, int], end: Tuple[int, int], text: str) -> Tuple[int, int]:
+        """Replace the text between two (line, col) positions; returns the position after it."""
+        start_offset = self.offset_at(*start)
+        end_offset = max(start_offset, self.offset_at(*end))
+        self.replace(start_offset, end_offset - start_offset, text)
+        return self.position_at(start_offset + len(text))
+
+    def write_to(self, f: BinaryIO, encoding: str = "utf-8") -> None:
+        """Stream the contents piece by piece to a binary file."""
+        for piece in _pieces(self._root, 0, len(self)):
+            f.write(piece.encode(encoding))
+
+    def line_start(self, line: int) -> int:
+        """Offset of the first character of ``line``."""
+        if line <= 1:
+            return 0
+        if line > self.line_count:
+            return len(self)
+        return self._newline_offset(line - 1) + 1
+
+    def line_end(self, line: int) -> int:
+        """Offset just past the last character of ``line`` (before its newline)."""
+        if line >= self.line_count:
+            return len(self)
+        return self._newline_offset(max(line, 1))
+
+    def line_length(self, line: int) -> int:
+        return self.line_end(line) - self.line_start(line)
+
+    def get_line(self, line: int) -> str:
+        if line < 1 or line > self.line_count:
+            return ""
+        return self.substring(self.line_start(line), self.line_end(line))
+
+    def get_lines(self, start_line: int, end_line: int) -> List[str]:
+        """Return lines ``start_line`` through ``end_line`` inclusive."""
+        start_line = max(1, start_line)
+        end_line = min(self.line_count, end_line)
+        if start_line > end_line:
+            return []
+        return self.substring(self.line_start(start_line), self.line_end(end_line)).split("\n")
+
+    def offset_at(self, line: int, col: int) -> int:
+        """Convert a (line, column) position to an offset, clamped to the line."""
+        start = self.line_start(line)
+        return start + max(0, min(col - 1, self.line_end(line) - start))
+
+    def position_at(self, offset: int) -> Tuple[int, int]:
+        """Convert an offset to a (line, column) position."""
+        offset = max(0, min(offset, len(self)))
+        line = 1
+        node = self._root
+        remaining = offset
+        while node:
+            left_size = _size(node.left)
+            if remaining < left_size:
+                node = node.left
+                continue
+            line += _newlines(node.left)
+            remaining -= left_size
+            if remaining < len(node.text):
+                line += node.text.count("\n", 0, remaining)
+                break
+            line += node.breaks
+            remaining -= len(node.text)
+            node = node.right
+        return line, offset - self.line_start(line) + 1
+
+    def _newline_offset(self, k: int) -> int:
+        """Offset of the k-th (1-based) newline character."""
+        node = self._root
+        offset = 0
+        while node:
+            left_newlines = _newlines(node.left)
+            if k <= left_newlines:
+                node = node.left
+                continue
+            k -= left_newlines
+            offset += _size(node.left)
+            if k <= node.breaks:
+                index = -1
+                for _ in range(k):
+                    index = node.text.index("\n", index + 1)
+                return offset + index
+            k -= node.breaks
+            offset += len(node.text)
+            node = node.right
+        return len(self)
+
+    def _changed(self) -> None:
+        self._text = None
+        self._edits += 1
@@ -0,0 +1,160 @@
+"""Per-session editor and debugger state for the web API."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# Rough memory cost of a workspace, measured with tracemalloc: an idle editor
+# and debugger, plus the rope, document model and symbol index per character
+WORKSPACE_OVERHEAD = 16 * 1024
+BYTES_PER_CHAR = 100
+
+
+class Workspace:
+    """One client's editor and debugger.
+
+    ``lock`` serializes requests from the same session, so a handler can set
+    the content and cursor and read results back without another request
+    of that session changing them in between.
+    """
+    def __init__(self, session_id: str, editor, debugger):
+        self.session_id = session_id
+        self.editor = editor
+        self.debugger = debugger
+        self.lock = threading.RLock()
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.closed = False
+
+    def memory_estimate(self) -> int:
+        return WORKSPACE_OVERHEAD + BYTES_PER_CHAR * len(self.editor.buffer)
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.debugger.stop_debugging()
+            self.editor.close()
+
+
+class WorkspacePool:
+    """Workspaces keyed by session id, created on first use.
+
+    Workspaces idle for longer than ``idle_timeout`` seconds are closed, and
+    the least recently used ones are closed early when there are more than
+    ``max_sessions`` or their estimated memory exceeds ``max_bytes``. The
+    workspace being handed out is never evicted by its own request. A
+    session that comes back after eviction gets a fresh workspace. Evicted
+    workspaces are closed on a background thread, since closing waits for
+    their running request and joins their lint thread.
+    """
+    def __init__(self, factory: Callable[[str], Workspace], max_sessions: int = 200,
+                 idle_timeout: float = 30 * 60, max_bytes: int = 1024 * 1024 * 1024):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._workspaces: "OrderedDict[str, Workspace]" = OrderedDict()
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+        self.closed = 0
+
+    def get(self, session_id: str, create: bool = True) -> Optional[Workspace]:
+        """The session's workspace, most recently used last.
+
+        With ``create=False`` a session without a workspace gets None
+        instead of a new one.
+        """
+        with self._lock:
+            workspace = self._workspaces.get(session_id)
+            if workspace is None:
+                if not create:
+                    return None
+                workspace = self.factory(session_id)
+                self._workspaces[session_id] = workspace
+                self.created += 1
+            else:
+                self._workspaces.move_to_end(session_id)
+            workspace.last_used = time.monotonic()
+            evicted = self._evict(keep=session_id)
+        if evicted:
+            threading.Thread(target=self._close_all, args=(evicted,), name="workspace-close", daemon=True).start()
+        return workspace
+
+    def release(self, session_id: str) -> bool:
+        """Close a session's workspace now, e.g. when the client signs off."""
+        with self._lock:
+            workspace = self._workspaces.pop(session_id, None)
+            if workspace is not None:
+                self.closed += 1
+        if workspace is None:
+            return False
+        self._close(workspace)
+        return True
+
+    def _evict(self, keep: str) -> List[Workspace]:
+        evicted = []
+        now = time.monotonic()
+        # Least recently used first, so idle sessions sit at the front
+        while self._workspaces:
+            session_id, workspace = next(iter(self._workspaces.items()))
+            if session_id == keep or now - workspace.last_used < self.idle_timeout:
+                break
+            evicted.append(self._workspaces.pop(session_id))
+            self.evicted_idle += 1
+
+        total = sum(workspace.memory_estimate() for workspace in self._workspaces.values())
+        for session_id in list(self._workspaces):
+            if len(self._workspaces) <= self.max_sessions and total <= self.max_bytes:
+                break
+            if session_id == keep:
+                continue
+            workspace = self._workspaces.pop(session_id)
+            total -= workspace.memory_estimate()
+            evicted.append(workspace)
+            self.evicted_capacity += 1
+        return evicted
+
+    @classmethod
+    def _close_all(cls, workspaces: List[Workspace]) -> None:
+        for workspace in workspaces:
+            cls._close(workspace)
+
+    @staticmethod
+    def _close(workspace: Workspace) -> None:
+        try:
+            workspace.close()
+        except Exception as e:
+            print(f"Error closing workspace {workspace.session_id}: {str(e)}")
+
+    def close_all(self) -> None:
+        with self._lock:
+            workspaces = list(self._workspaces.values())
+            self._workspaces.clear()
+        self._close_all(workspaces)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            workspaces = list(self._workspaces.values())
+            return {
+                "sessions": len(workspaces),
+                "max_sessions": self.max_sessions,
+                "memory_estimate": sum(workspace.memory_estimate() for workspace in workspaces),
+                "max_bytes": self.max_bytes,
+                "idle_timeout": self.idle_timeout,
+                "oldest_idle": round(max((now - w.last_used for w in workspaces), default=0.0), 1),
+                "created": self.created,
+                "evicted_idle": self.evicted_idle,
+                "evicted_capacity": self.evicted_capacity,
+                "closed": self.closed
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._workspaces)
+
+    def __contains__(self, session_id: Optional[str]) -> bool:
+        with self._lock:
+            return session_id in self._workspaces
@@ -1,44 +1,123 @@
 #!/usr/bin/env python3
 import os
 import sys
-import ast
 import json
-from flask import Flask, render_template, jsonify, request, send_from_directory
-from rich.console import Console
-from rich.layout import Layout
-from rich.live import Live
-from rich.text import Text
-from rich.panel import Panel
-from editor.code_editor import CodeEditor
+import keyword
+import re
+import threading
+import uuid
+from flask import Flask, render_template, jsonify, request, send_from_directory, Response, stream_with_context, g
+from editor.code_editor import CodeEditor, VersionMismatch
 from editor.file_browser import FileBrowser
 from editor.project_manager import ProjectManager
+from editor.workspace_pool import Workspace, WorkspacePool
 from utils.snippet_manager import SnippetManager
-from blockchain.blockchain_core import Blockchain, Block
+from blockchain.blockchain_core import Blockchain
 from blockchain.smart_contracts import SmartContractDeveloper
 from utils.debugger import DebuggerController
+from utils.project_linter import ProjectLinter
+from ai.batch_documenter import BatchDocumenter
+from ai.candidate_generator import MAX_CANDIDATES, CandidateGenerator, GenerationError
+from utils.document_model import DocumentModel
+from utils.completion_engine import merge_suggestions
+from utils.project_index import ProjectIndex
 
 app = Flask(__name__)
 ide = None
 
+SESSION_COOKIE = 'pyide_session'
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+class subsystem:
+    """IDE attribute built by the decorated method on first access, and only once under concurrent requests"""
+    def __init__(self, build):
+        self.build = build
+        self.name = build.__name__
+        self.__doc__ = build.__doc__
+        # One lock per subsystem, so a slow build (solc) does not hold up the others
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        # Once built, the instance attribute shadows this descriptor
+        with self._lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.build(instance)
+        return instance.__dict__[self.name]
+
 class IDE:
     def __init__(self, test_mode=False):
         self.code_editor = CodeEditor()
+        # Shared by every session's editor
+        self.code_assistant = self.code_editor.code_assistant
         self.file_browser = FileBrowser()
         self.project_manager = ProjectManager()
-        self.snippet_manager = SnippetManager()
-        self.blockchain = Blockchain()
-        self.contract_developer = SmartContractDeveloper()
-        self.debugger = DebuggerController()
+        # Web sessions each get their own editor and debugger (see create_workspace)
+        self.workspaces = WorkspacePool(self.create_workspace)
+        self.code_editor.completion_engine.project_files = self.file_browser.get_python_files
         if not test_mode:
+            from rich.console import Console
+            from rich.layout import Layout
             self.console = Console()
             self.layout = Layout()
             self.setup_layout()
             self.active_panel = "editor"
             print("IDE initialized with default editor focus")
 
+    # Subsystems that many sessions never touch are built on first use; the
+    # contract developer in particular pulls in web3 and downloads solc
+    @subsystem
+    def snippet_manager(self):
+        return SnippetManager()
+
+    @subsystem
+    def blockchain(self):
+        return Blockchain()
+
+    @subsystem
+    def contract_developer(self):
+        return SmartContractDeveloper()
+
+    @subsystem
+    def debugger(self):
+        return DebuggerController()
+
+    @subsystem
+    def project_linter(self):
+        return ProjectLinter()
+
+    @subsystem
+    def batch_documenter(self):
+        return BatchDocumenter(self.code_assistant)
+
+    @subsystem
+    def project_index(self):
+        return ProjectIndex()
+
+    @subsystem
+    def code_generator(self):
+        return CandidateGenerator(self.code_assistant)
+
+    def preload_ai_client(self):
+        """Import the AI client library in the background, so the first AI request does not wait for it"""
+        if self.code_assistant.api_key:
+            threading.Thread(target=lambda: self.code_assistant.client, name="preload-ai", daemon=True).start()
+
+    def create_workspace(self, session_id):
+        """Editor and debugger for one web session, sharing the AI client, caches and lexer"""
+        editor = CodeEditor(
+            code_assistant=self.code_editor.code_assistant,
+            error_detector=self.code_editor.error_detector,
+            lexer=self.code_editor.lexer
+        )
+        editor.completion_engine.project_files = self.file_browser.get_python_files
+        return Workspace(session_id, editor, DebuggerController())
+
     def setup_layout(self):
         if not hasattr(self, 'layout'):
             return
+        from rich.layout import Layout
         self.layout.split(
             Layout(name="header", size=3),
             Layout(name="main")
@@ -54,6 +133,8 @@ class IDE:
         print("Layout setup completed")
 
     def update_layout(self):
+        from rich.panel import Panel
+        from rich.text import Text
         try:
             header_text = Text("AI-Assisted Python IDE", style="bold white")
             header_text.append(" | ", style="white")
@@ -64,6 +145,7 @@ class IDE:
             header_text.append("[tab] switch panel", style="yellow")
             header_text.append("[a]nalyze ", style="yellow")
             header_text.append("[d]ocument ", style="yellow")
+            header_text.append("[l]int project ", style="yellow")
             self.layout["header"].update(Panel(header_text, border_style="blue"))
 
             self.layout["file_browser"].update(Panel(
@@ -124,6 +206,9 @@ class IDE:
                     docs = self.code_editor.get_documentation_at_cursor()
                     self.console.print("\nDocumentation:", style="bold green") if hasattr(self, 'console') else print("\nDocumentation:")
                     self.console.print(docs) if hasattr(self, 'console') else print(docs)
+            elif key == 'l':
+                print("Linting project...")
+                self.handle_project_lint()
             elif self.active_panel == "editor":
                 print(f"Handling editor input: {key}")
                 self.handle_editor_input(key)
@@ -180,10 +265,27 @@ class IDE:
         self.console.print(f"\n{result}", style=style) if hasattr(self, 'console') else print(f"\n{result}")
         print(f"Save result: {result}")
 
+    def handle_project_lint(self):
+        files = self.file_browser.get_python_files()
+        total_errors = 0
+        for result in self.project_linter.lint(files):
+            if 'error' in result:
+                self.console.print(f"{result['file']}: {result['error']}", style="red") if hasattr(self, 'console') else print(f"{result['file']}: {result['error']}")
+                continue
+            for error in result['errors']:
+                total_errors += 1
+                message = f"{result['file']}:{error.get('line')}: {error.get('message')}"
+                self.console.print(message, style="yellow") if hasattr(self, 'console') else print(message)
+        stats = self.project_linter.last_run
+        summary = (f"\nLinted {stats.get('files', 0)} files "
+                   f"({stats.get('linted', 0)} re-linted, {stats.get('cached', 0)} cached): {total_errors} issues")
+        self.console.print(summary, style="green") if hasattr(self, 'console') else print(summary)
+
     def run(self):
         try:
             print("Starting IDE...")
             if hasattr(self, 'layout'):
+                from rich.live import Live
                 with Live(self.layout, screen=True, refresh_per_second=10) as live:
                     while True:
                         self.update_layout()
@@ -231,6 +333,37 @@ class IDE:
             print("No errors found in test file")
 
 
+def resolve_session_id(headers, cookies):
+    """(session id, whether it is new) from an ``X-Session-ID`` header or the session cookie"""
+    session_id = headers.get('X-Session-ID') or cookies.get(SESSION_COOKIE)
+    if not session_id or not _SESSION_ID.match(session_id):
+        return uuid.uuid4().hex, True
+    return session_id, False
+
+def current_workspace(create=True):
+    """The requesting session's workspace; new sessions get a cookie
+
+    Endpoints that only read or control existing state pass create=False
+    and get None for a session without a workspace, so requests without a
+    cookie cannot fill the pool and evict real sessions.
+    """
+    session_id, new = resolve_session_id(request.headers, request.cookies)
+    if not create:
+        return None if new else ide.workspaces.get(session_id, create=False)
+    if new:
+        g.new_session_id = session_id
+    return ide.workspaces.get(session_id)
+
+def no_debug_session():
+    return jsonify({"error": "No debug session"}), 404
+
+@app.after_request
+def set_session_cookie(response):
+    session_id = g.get('new_session_id')
+    if session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite='Lax')
+    return response
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -239,40 +372,366 @@ def index():
 def ide_route():
     return render_template('index.html')
 
+def version_mismatch(e):
+    """409 telling a sync-protocol client to send the full text again (see /api/sync/open)"""
+    return jsonify({"error": str(e), "version": e.version}), 409
+
+def sync_editor(editor, body):
+    """Load the request's document: ``code``, or ``version`` for text already synced to this session"""
+    editor.sync(body.get('code'), body.get('version'))
+
+@app.route('/api/sync/open', methods=['POST'])
+def open_document():
+    """Full sync: the client's whole text, after which /api/edits sends only changes against the returned version"""
+    try:
+        body = request.json or {}
+        workspace = current_workspace()
+        with workspace.lock:
+            workspace.editor.content = body.get('code', '')
+            if 'cursor' in body:
+                workspace.editor.cursor_pos = tuple(body['cursor'])
+            version = workspace.editor.version
+        return jsonify({"version": version})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_code():
     try:
-        code = request.json.get('code', '')
-        ide.code_editor.content = code
-        analysis = ide.code_editor.analyze_current_code()
+        workspace = current_workspace()
+        with workspace.lock:
+            sync_editor(workspace.editor, request.json)
+            analysis = workspace.editor.analyze_current_code()
         return jsonify(analysis)
+    except VersionMismatch as e:
+        return version_mismatch(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_code_stream():
+    try:
+        workspace = current_workspace()
+        with workspace.lock:
+            sync_editor(workspace.editor, request.json)
+            if workspace.editor.analysis_blocker():
+                return jsonify(workspace.editor.analyze_current_code())
+            code = workspace.editor.content
+        assistant = ide.code_assistant
+        if not assistant.client:
+            return jsonify("AI analysis not available - API key not set")
+
+        def events():
+            parts = []
+            try:
+                for delta in assistant.stream(**assistant.analysis_request(code)):
+                    parts.append(delta)
+                    yield sse_event("token", {"text": delta})
+                analysis = json.loads("".join(parts))
+                yield sse_event("result", {
+                    "text": f"Analysis: {analysis.get('analysis')}\nSuggestions: {analysis.get('suggestions')}",
+                    "analysis": analysis.get('analysis'),
+                    "suggestions": analysis.get('suggestions')
+                })
+            except Exception as e:
+                yield sse_event("error", {"error": f"Error analyzing code: {str(e)}"})
+
+        return sse_response(events())
+    except VersionMismatch as e:
+        return version_mismatch(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/document', methods=['POST'])
 def generate_documentation():
     try:
-        code = request.json.get('code', '')
         position = request.json.get('position', (1, 1))
-        ide.code_editor.content = code
-        ide.code_editor.cursor_pos = tuple(position)
-        docs = ide.code_editor.get_documentation_at_cursor()
+        workspace = current_workspace()
+        with workspace.lock:
+            sync_editor(workspace.editor, request.json)
+            workspace.editor.cursor_pos = tuple(position)
+            docs = workspace.editor.get_documentation_at_cursor()
         return jsonify(docs)
+    except VersionMismatch as e:
+        return version_mismatch(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/document/module', methods=['POST'])
+@app.route('/api/document/project', methods=['POST'])
+def generate_batch_documentation():
+    try:
+        body = request.json or {}
+        stats = {}
+        if request.path.endswith('/module'):
+            code = body.get('code')
+            if code is None and 'version' in body:
+                workspace = current_workspace()
+                with workspace.lock:
+                    sync_editor(workspace.editor, body)
+                    code = workspace.editor.content
+            results = ide.batch_documenter.document_module(code or '', body.get('path', ''), stats)
+        else:
+            files = ide.file_browser.resolve_python_files(body.get('files'))
+            results = ide.batch_documenter.document_files(files, stats)
+
+        def generate():
+            for result in results:
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"done": True, "stats": stats}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except VersionMismatch as e:
+        return version_mismatch(e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/complete', methods=['POST'])
 def get_completion():
     try:
-        code = request.json.get('code', '')
         position = request.json.get('position', (1, 1))
-        ide.code_editor.content = code
-        ide.code_editor.cursor_pos = tuple(position)
-        suggestions = ide.code_editor.get_completion_suggestions()
-        return jsonify({"suggestions": suggestions})
+        workspace = current_workspace()
+        with workspace.lock:
+            sync_editor(workspace.editor, request.json)
+            workspace.editor.cursor_pos = tuple(position)
+            local = workspace.editor.get_local_completions()
+            ai = workspace.editor.get_ai_suggestions() if request.json.get('ai', True) else []
+        return jsonify({"suggestions": merge_suggestions(local, ai), "local": local})
+    except VersionMismatch as e:
+        return version_mismatch(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/complete/stream', methods=['POST'])
+def get_completion_stream():
+    """Local completions as soon as they are computed, then the merged list once AI suggestions arrive"""
+    try:
+        position = tuple(request.json.get('position', (1, 1)))
+        workspace = current_workspace()
+        with workspace.lock:
+            editor = workspace.editor
+            sync_editor(editor, request.json)
+            editor.cursor_pos = position
+            local = editor.get_local_completions()
+            # What to ask the model, taken now: other requests of this session may move the editor on meanwhile
+            prefetched, context = [], None
+            if len(editor.buffer) and editor.code_assistant.client:
+                prefetched = editor.prefetched_suggestions()
+                if prefetched is None:
+                    context = editor.suggestion_context()
+
+        def events():
+            yield sse_event("local", {"suggestions": local})
+            try:
+                ai = prefetched if context is None else editor.code_assistant.get_suggestions(*context)
+                yield sse_event("ai", {"suggestions": ai})
+            except Exception as e:
+                ai = []
+                yield sse_event("error", {"error": str(e)})
+            yield sse_event("result", {"suggestions": merge_suggestions(local, ai)})
+
+        return sse_response(events())
+    except VersionMismatch as e:
+        return version_mismatch(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/complete/prefetch', methods=['POST'])
+def prefetch_completion():
+    """Cursor hint from the client; enables prefetching and schedules it for this position"""
+    try:
+        position = request.json.get('position', (1, 1))
+        workspace = current_workspace()
+        with workspace.lock:
+            # Without code or version, the cursor moved within the text already here
+            if 'code' in request.json or 'version' in request.json:
+                sync_editor(workspace.editor, request.json)
+            workspace.editor.cursor_pos = tuple(position)
+            workspace.editor.prefetch_completions = True
+            workspace.editor.schedule_prefetch()
+            version = workspace.editor.version
+        return jsonify({"version": version})
+    except VersionMismatch as e:
+        return version_mismatch(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/edits', methods=['POST'])
+def apply_edits():
+    try:
+        # Several change events' edits at once, each against the text the previous one produced
+        batches = request.json.get('batches') or [request.json.get('edits', [])]
+        base_version = request.json.get('base_version')
+        workspace = current_workspace()
+        with workspace.lock:
+            editor = workspace.editor
+            if base_version is not None and base_version != editor.version:
+                return version_mismatch(VersionMismatch(editor.version))
+
+            version = editor.apply_edit_batches(batches, request.json.get('cursor'))
+            cursor = list(editor.cursor_pos)
+        return jsonify({
+            "version": version,
+            "cursor": cursor
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/lint/project', methods=['POST'])
+def lint_project():
+    try:
+        files = ide.file_browser.resolve_python_files((request.json or {}).get('files'))
+
+        def generate():
+            stats = {}
+            for result in ide.project_linter.lint(files, stats):
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"done": True, "stats": stats}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def symbol_at(code, position):
+    """Identifier under (or just before) the cursor, or None"""
+    document = DocumentModel(code)
+    offset = document.offset_at(*position)
+    for candidate in (offset, offset - 1):
+        token = document.token_at(candidate) if candidate >= 0 else None
+        if token and token[2].isidentifier() and not keyword.iskeyword(token[2]):
+            return token[2]
+    return None
+
+def ensure_project_index():
+    if not ide.project_index.built:
+        ide.project_index.update(ide.file_browser.get_python_files())
+    return ide.project_index
+
+@app.route('/api/symbols/index', methods=['POST'])
+def index_symbols():
+    try:
+        requested = (request.json or {}).get('files')
+        files = ide.file_browser.resolve_python_files(requested)
+        # A list of files refreshes just those; only a full rescan drops deleted files
+        return jsonify(ide.project_index.update(files, prune=not requested))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/symbols/search')
+def search_symbols():
+    try:
+        query = request.args.get('q', '')
+        limit = int(request.args.get('limit', 50))
+        return jsonify({"symbols": ensure_project_index().search(query, limit) if query else []})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/symbols/definition', methods=['POST'])
+@app.route('/api/symbols/references', methods=['POST'])
+def lookup_symbol():
+    """Definitions or references of ``name``, or of the identifier at ``position`` in ``code``"""
+    try:
+        body = request.json or {}
+        name = body.get('name') or symbol_at(body.get('code', ''), tuple(body.get('position', (1, 1))))
+        if not name:
+            return jsonify({"error": "No symbol at cursor"}), 400
+        index = ensure_project_index()
+        if request.path.endswith('/definition'):
+            return jsonify({"name": name, "definitions": index.find_definitions(name, body.get('path'))})
+        return jsonify({"name": name, "references": index.find_references(name)})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def generation_request(prompt):
+    """Messages and parameters for turning a natural-language prompt into code"""
+    return {
+        "priority": "completion",
+        "messages": [
+            {
+                "role": "system",
+                "content": """Generate focused Python code solutions. Follow these guidelines:
+                1. Create concise, efficient implementations
+                2. Use standard library when possible
+                3. Include brief comments for clarity
+                4. Return JSON with 'code' key containing the generated code"""
+            },
+            {
+                "role": "user",
+                "content": f"Create a Python script that does the following: {prompt}"
+            }
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.2,  # Lower temperature for more focused output
+        "max_tokens": 500,   # Reduced max tokens
+        "top_p": 0.8,        # Slightly reduced top_p
+        "presence_penalty": 0.0  # Removed presence penalty
+    }
+
+def sse_event(event, data, event_id=None):
+    """Format one server-sent event; with ``event_id``, a reconnecting EventSource sends it back as Last-Event-ID"""
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Comment line sent on idle event streams, so proxies keep them open and dead clients are noticed
+SSE_KEEPALIVE = ": keepalive\n\n"
+DEBUG_KEEPALIVE_SECONDS = 15
+
+def debug_resume_point(headers, args):
+    """Sequence number of the last debugger event the client has, or None for a fresh client"""
+    value = headers.get('Last-Event-ID') or args.get('since')
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+def debug_events_after(debugger, since, timeout=None):
+    """(formatted events, sequence number to continue after) for a client that has seen events up to ``since``
+
+    A new client (``since`` None), or one whose events have been dropped from
+    the log, gets a ``snapshot`` of the current state instead of the history.
+    With a ``timeout``, waits up to that long for an event; no events means
+    none came.
+    """
+    if since is not None:
+        events, missed = debugger.events.since(since, timeout)
+        if not missed:
+            return [sse_event(e["type"], e, e["seq"]) for e in events], events[-1]["seq"] if events else since
+    snapshot = debugger.snapshot()
+    return [sse_event("snapshot", snapshot, snapshot["seq"])], snapshot["seq"]
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def parse_generated_code(content):
+    """Extract the 'code' field from a generation response, raising if it is missing or invalid"""
+    result = json.loads(content)
+    if "code" not in result:
+        raise ValueError("Response does not contain 'code' key")
+    code = result["code"]
+    syntax_error = DocumentModel(code).syntax_error
+    if syntax_error:
+        raise syntax_error
+    return code
+
+def candidate_count(body):
+    """The request's ``candidates``; ValueError unless it is a whole number from 1 to MAX_CANDIDATES"""
+    candidates = body.get('candidates', 1)
+    if isinstance(candidates, bool) or not isinstance(candidates, int) or not 1 <= candidates <= MAX_CANDIDATES:
+        raise ValueError(f"candidates must be a whole number from 1 to {MAX_CANDIDATES}")
+    return candidates
+
 @app.route('/api/generate', methods=['POST'])
 def generate_code():
     try:
@@ -280,37 +739,29 @@ def generate_code():
         if not prompt:
             return jsonify({"error": "No prompt provided"}), 400
 
-        response = ide.code_editor.code_assistant.client.chat.completions.create(
-            model=ide.code_editor.code_assistant.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """Generate focused Python code solutions. Follow these guidelines:
-                    1. Create concise, efficient implementations
-                    2. Use standard library when possible
-                    3. Include brief comments for clarity
-                    4. Return JSON with 'code' key containing the generated code"""
-                },
-                {
-                    "role": "user",
-                    "content": f"Create a Python script that does the following: {prompt}"
-                }
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.2,  # Lower temperature for more focused output
-            max_tokens=500,   # Reduced max tokens
-            top_p=0.8,        # Slightly reduced top_p
-            presence_penalty=0.0  # Removed presence penalty
-        )
-
-        generated_code = response.choices[0].message.content.strip()
+        try:
+            candidates = candidate_count(request.json)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if candidates > 1:
+            # Race several candidates and answer with the first that parses
+            try:
+                code = ide.code_generator.generate(
+                    validate=parse_generated_code,
+                    candidates=candidates,
+                    **generation_request(prompt)
+                )
+                return jsonify({"code": code})
+            except GenerationError as e:
+                return jsonify({"error": str(e), "code": e.content}), 500
+
+        generated_code = ide.code_assistant.complete(
+            validate=parse_generated_code,
+            **generation_request(prompt)
+        ).strip()
 
         try:
-            result = json.loads(generated_code)
-            if "code" not in result:
-                raise ValueError("Response does not contain 'code' key")
-            code = result["code"]
-            ast.parse(code)  # Validate syntax
+            code = parse_generated_code(generated_code)
             return jsonify({"code": code})
         except (SyntaxError, ValueError, json.JSONDecodeError) as e:
             return jsonify({
@@ -321,6 +772,68 @@ def generate_code():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/generate/stream', methods=['POST'])
+def generate_code_stream():
+    try:
+        prompt = request.json.get('prompt', '')
+        if not prompt:
+            return jsonify({"error": "No prompt provided"}), 400
+        assistant = ide.code_assistant
+        if not assistant.client:
+            return jsonify({"error": "AI assistance not available - API key not set"}), 503
+
+        def events():
+            parts = []
+            try:
+                for delta in assistant.stream(validate=parse_generated_code, **generation_request(prompt)):
+                    parts.append(delta)
+                    yield sse_event("token", {"text": delta})
+                generated_code = "".join(parts).strip()
+                try:
+                    yield sse_event("result", {"code": parse_generated_code(generated_code)})
+                except (SyntaxError, ValueError, json.JSONDecodeError) as e:
+                    yield sse_event("error", {
+                        "error": f"Generated code is incomplete or contains errors: {str(e)}",
+                        "code": generated_code
+                    })
+            except Exception as e:
+                yield sse_event("error", {"error": str(e)})
+
+        return sse_response(events())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/ai/stats')
+def get_ai_stats():
+    try:
+        assistant = ide.code_assistant
+        workspace = current_workspace(create=False)
+        return jsonify({
+            "cache": assistant.cache.stats(),
+            "scheduler": assistant.scheduler.stats(),
+            "prefetch": workspace.editor.completion_prefetcher.stats() if workspace else None,
+            "generation": ide.code_generator.stats()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/sessions')
+def get_session_stats():
+    try:
+        return jsonify(ide.workspaces.stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/session/close', methods=['POST'])
+def close_session():
+    """Release this session's workspace now instead of waiting for idle eviction"""
+    try:
+        session_id = request.headers.get('X-Session-ID') or request.cookies.get(SESSION_COOKIE)
+        closed = ide.workspaces.release(session_id) if session_id else False
+        return jsonify({"closed": closed})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/blockchain/compile', methods=['POST'])
 def compile_contract():
     try:
@@ -367,15 +880,20 @@ def start_debugging():
         if not code:
             return jsonify({"error": "No code provided"}), 400
 
-        ide.debugger.start_debugging(code)
-        return jsonify({"status": "debugging_started"})
+        debugger = current_workspace().debugger
+        # Streaming events after this point includes the run's start, even if it is over by the time the client listens
+        seq = debugger.events.last_seq
+        debugger.start_debugging(code)
+        return jsonify({"status": "debugging_started", "seq": seq})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/debug/stop', methods=['POST'])
 def stop_debugging():
     try:
-        ide.debugger.stop_debugging()
+        workspace = current_workspace(create=False)
+        if workspace is not None:
+            workspace.debugger.stop_debugging()
         return jsonify({"status": "debugging_stopped"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -384,12 +902,15 @@ def stop_debugging():
 def debug_step():
     try:
         step_type = request.json.get('type', 'over')
+        workspace = current_workspace(create=False)
+        if workspace is None:
+            return no_debug_session()
         if step_type == 'into':
-            ide.debugger.step_into()
+            workspace.debugger.step_into()
         elif step_type == 'over':
-            ide.debugger.step_over()
+            workspace.debugger.step_over()
         elif step_type == 'continue':
-            ide.debugger.continue_execution()
+            workspace.debugger.continue_execution()
 
         return jsonify({"status": "step_executed"})
     except Exception as e:
@@ -404,16 +925,47 @@ def toggle_breakpoint():
         if not filename or not line:
             return jsonify({"error": "Invalid breakpoint data"}), 400
 
-        result = ide.debugger.toggle_breakpoint(filename, line)
+        result = current_workspace().debugger.toggle_breakpoint(filename, line)
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/debug/events')
+def stream_debug_events():
+    """Push every debugger event as a server-sent event, numbered so a reconnecting client resumes where it left off"""
+    try:
+        workspace = current_workspace(create=False)
+        if workspace is None:
+            return no_debug_session()
+        debugger = workspace.debugger
+        since = debug_resume_point(request.headers, request.args)
+
+        def events():
+            pending, last = debug_events_after(debugger, since)
+            while True:
+                if pending:
+                    yield from pending
+                elif workspace.closed:
+                    # Evicted: the client reconnects and starts over in a new workspace
+                    return
+                else:
+                    yield SSE_KEEPALIVE
+                # Blocks this request's thread, but not the workspace lock, so commands still get through
+                pending, last = debug_events_after(debugger, last, timeout=DEBUG_KEEPALIVE_SECONDS)
+
+        return sse_response(events())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/debug/state')
 def get_debug_state():
     try:
-        state = ide.debugger.get_debugger_state()
-        output = ide.debugger.get_output()
+        workspace = current_workspace(create=False)
+        if workspace is None:
+            return no_debug_session()
+        debugger = workspace.debugger
+        state = debugger.get_debugger_state()
+        output = debugger.get_output()
 
         response = {
             "state": state,
@@ -449,12 +1001,46 @@ def serve_documentation(filename):
     except Exception as e:
         return jsonify({"error": str(e)}), 404
 
+def serve(argv):
+    """Production mode: asgi_app under uvicorn, with worker processes and graceful shutdown"""
+    import argparse
+    import uvicorn
+    parser = argparse.ArgumentParser(prog="main.py --serve")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes; sessions are per process, so use sticky routing for more than one")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds to let in-flight requests finish on shutdown")
+    args = parser.parse_args(argv)
+    print(f"Starting IDE in production mode on {args.host}:{args.port} with {args.workers} worker(s)...")
+    uvicorn.run("asgi_app:app", host=args.host, port=args.port, workers=args.workers,
+                timeout_graceful_shutdown=args.graceful_timeout, log_level="warning")
+
 def main():
     global ide
 
+    if len(sys.argv) > 1 and sys.argv[1] == "--lint":
+        print("Linting project...")
+        linter = ProjectLinter()
+        files = sys.argv[2:] or FileBrowser().get_python_files()
+        for result in linter.lint(files):
+            if 'error' in result:
+                print(f"{result['file']}: {result['error']}")
+            for error in result.get('errors', []):
+                print(f"{result['file']}:{error.get('line')}: {error.get('message')}")
+        print(f"Lint summary: {linter.last_run}")
+        return
+
+    serving = len(sys.argv) > 1 and sys.argv[1] == "--serve"
     if not os.getenv("OPENAI_API_KEY"):
         print("Warning: OPENAI_API_KEY environment variable not set")
         print("AI-assisted features will be disabled")
+        if not serving:
+            return
+
+    if serving:
+        serve(sys.argv[2:])
         return
 
     if len(sys.argv) > 1 and sys.argv[1] == "--test":
@@ -465,6 +1051,7 @@ def main():
 
     try:
         ide = IDE(test_mode=False)
+        ide.preload_ai_client()
         print("Starting IDE in web mode...")
         app.run(host='0.0.0.0', port=5000, debug=True)
     except Exception as e:
@@ -0,0 +1,124 @@
+import asyncio
+import os
+
+import pytest
+
+from ai.async_assistant import AsyncCodeAssistant
+from ai.response_cache import ResponseCache, request_key
+from ai.scheduler import RequestScheduler
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from utils.code_units import split_units
+from utils.document_model import DocumentModel
+
+MESSAGES = [{"role": "user", "content": "Say something"}]
+
+
+@pytest.fixture
+def server():
+    with FakeOpenAIServer(delay=0.2) as fake:
+        yield fake
+
+
+def make_assistant(tmp_path, server, **kwargs):
+    return AsyncCodeAssistant(cache=ResponseCache(path=os.path.join(tmp_path, "cache.sqlite3")),
+                              scheduler=RequestScheduler(), base_url=server.base_url, api_key="test", **kwargs)
+
+
+def run(coroutine_function):
+    """Run ``coroutine_function(assistant)`` and close the assistant's client afterwards."""
+    async def main(assistant):
+        try:
+            return await coroutine_function(assistant)
+        finally:
+            await assistant.aclose()
+    return main
+
+
+def test_identical_requests_are_coalesced(tmp_path, server):
+    assistant = make_assistant(tmp_path, server)
+
+    async def scenario(assistant):
+        return await asyncio.gather(*(assistant.complete(MESSAGES) for _ in range(5)))
+
+    results = asyncio.run(run(scenario)(assistant))
+    assert len(set(results)) == 1
+    assert server.requests == 1
+    assert assistant.stats()["coalesced"] == 4
+    assert assistant.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call(tmp_path, server):
+    assistant = make_assistant(tmp_path, server)
+
+    async def scenario(assistant):
+        owner = asyncio.create_task(assistant.complete(MESSAGES))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(assistant.complete(MESSAGES))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await owner
+
+    assert asyncio.run(run(scenario)(assistant))
+    assert server.requests == 1
+
+
+def test_cancelled_call_frees_its_slot(tmp_path, server):
+    assistant = make_assistant(tmp_path, server, max_concurrency=1)
+
+    async def scenario(assistant):
+        task = asyncio.create_task(assistant.complete(MESSAGES))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert assistant.stats()["in_flight"] == 0
+        # The only slot is free again
+        return await asyncio.wait_for(assistant.complete([{"role": "user", "content": "Another"}]), 5)
+
+    assert asyncio.run(run(scenario)(assistant))
+
+
+def test_stream_releases_slot_when_upstream_completes(tmp_path, server):
+    assistant = make_assistant(tmp_path, server, max_concurrency=1)
+
+    async def scenario(assistant):
+        stream = assistant.stream(MESSAGES)
+        first = await stream.__anext__()
+        # The caller is still holding the stream open, but the upstream reply is complete
+        other = await asyncio.wait_for(assistant.complete([{"role": "user", "content": "Another"}]), 5)
+        rest = [delta async for delta in stream]
+        return first + "".join(rest), other
+
+    content, other = asyncio.run(run(scenario)(assistant))
+    assert content and other
+    # The streamed reply was cached whole
+    assert assistant.cache.get(request_key(assistant.model, MESSAGES, {})) == content
+
+
+def test_abandoned_stream_frees_its_slot(tmp_path):
+    with FakeOpenAIServer(delay=0.1, chunk_delay=0.05) as server:
+        assistant = make_assistant(tmp_path, server, max_concurrency=1)
+
+        async def scenario(assistant):
+            stream = assistant.stream(MESSAGES)
+            await stream.__anext__()
+            await stream.aclose()
+            return await asyncio.wait_for(assistant.complete([{"role": "user", "content": "Another"}]), 5)
+
+        assert asyncio.run(run(scenario)(assistant))
+
+
+def test_inherited_request_helpers_are_coroutines(tmp_path, server):
+    assistant = make_assistant(tmp_path, server)
+
+    async def scenario(assistant):
+        elements = split_units(DocumentModel("def first():\n    pass\n\n\ndef second():\n    pass\n"))
+        return (await assistant.suggest("x = pri", (1, 8), priority="prefetch"),
+                await assistant.get_batch_documentation(elements))
+
+    suggestions, docs = asyncio.run(run(scenario)(assistant))
+    assert suggestions and all(isinstance(suggestion, str) for suggestion in suggestions)
+    assert [doc["description"] for doc in docs] == ["Fake documentation for first",
+                                                    "Fake documentation for second"]
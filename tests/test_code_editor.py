@@ -0,0 +1,107 @@
+import os
+import random
+
+import pytest
+
+from ai.code_assistant import CodeAssistant
+from ai.response_cache import ResponseCache
+from editor.code_editor import CodeEditor, VersionMismatch
+
+
+@pytest.fixture
+def editor(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assistant = CodeAssistant(cache=ResponseCache(path=os.path.join(tmp_path, "cache.sqlite3")))
+    editor = CodeEditor(lint_debounce=60, code_assistant=assistant)
+    editor.content = "def f(x):\n    return x\n\nprint(f(1))\n"
+    yield editor
+    editor.close()
+
+
+def offset(text, position):
+    line, col = position
+    lines = text.split("\n")
+    return sum(len(each) + 1 for each in lines[:line - 1]) + col - 1
+
+
+def apply_to_string(text, edits):
+    """The reference model: apply one batch, back to front, to a plain string"""
+    for edit in sorted(edits, key=lambda edit: (edit["start"], edit["end"]), reverse=True):
+        start, end = offset(text, edit["start"]), offset(text, edit["end"])
+        text = text[:start] + edit["text"] + text[end:]
+    return text
+
+
+def random_position(rng, text):
+    lines = text.split("\n")
+    line = rng.randint(1, len(lines))
+    return [line, rng.randint(1, len(lines[line - 1]) + 1)]
+
+
+def random_batch(rng, text):
+    """Up to three edits against ``text`` that neither overlap nor touch"""
+    positions = sorted({tuple(random_position(rng, text)) for _ in range(rng.randint(1, 3) * 2)})
+    positions = [list(position) for position in positions]
+    return [{"start": start, "end": end, "text": rng.choice(["", "a", "xy\n", "\n\nz", "é"])}
+            for start, end in zip(positions[::2], positions[1::2])]
+
+
+def test_random_batches_match_a_string_model(editor):
+    rng = random.Random(7)
+    expected = editor.content
+    for _ in range(200):
+        batches = []
+        for _ in range(rng.randint(1, 3)):
+            batch = random_batch(rng, expected)
+            expected = apply_to_string(expected, batch)
+            batches.append(batch)
+        editor.apply_edit_batches(batches)
+        assert editor.content == expected
+
+
+def test_each_non_empty_batch_is_one_version(editor):
+    version = editor.version
+    edit = {"start": [1, 1], "end": [1, 1], "text": "#"}
+    assert editor.apply_edit_batches([[edit], [], [edit]]) == version + 2
+
+
+@pytest.mark.parametrize("bad_edit", [
+    {"start": [1], "end": [1, 1], "text": ""},
+    {"start": ["a", "b"], "end": [1, 1], "text": ""},
+    {"start": [1, 1, 5], "end": [1, 1], "text": ""},
+    {"start": [True, 1], "end": [1, 1], "text": ""},
+    {"start": [1, 1], "end": [1, 3], "text": None},
+    {"start": [1, 1], "end": [1, 3], "text": 5},
+    {"end": [1, 1], "text": ""},
+    "not an edit",
+    {"start": [1, 1], "end": [1, 99], "text": ""},
+    {"start": [99, 1], "end": [99, 1], "text": ""},
+    {"start": [0, 1], "end": [1, 1], "text": ""},
+])
+def test_bad_batch_leaves_the_editor_untouched(editor, bad_edit):
+    before = editor.content, editor.version, editor.cursor_pos
+    good = [{"start": [1, 1], "end": [1, 4], "text": "async def"}]
+    with pytest.raises(ValueError):
+        editor.apply_edit_batches([good, [bad_edit]], cursor=[2, 1])
+    assert (editor.content, editor.version, editor.cursor_pos) == before
+
+
+def test_positions_are_checked_against_earlier_batches(editor):
+    # Line 6 only exists once the first batch has added two lines
+    grow = [{"start": [4, 12], "end": [4, 12], "text": "\nx = 1\ny = 2"}]
+    editor.apply_edit_batches([grow, [{"start": [6, 6], "end": [6, 6], "text": "0"}]])
+    assert editor.content.endswith("x = 1\ny = 20\n")
+
+    shrink = [{"start": [1, 1], "end": [3, 1], "text": ""}]
+    before = editor.content
+    with pytest.raises(ValueError):
+        editor.apply_edit_batches([shrink, [{"start": [6, 1], "end": [6, 1], "text": ""}]])
+    assert editor.content == before
+
+
+def test_sync_by_version(editor):
+    editor.apply_edits([{"start": [1, 1], "end": [1, 1], "text": "#"}])
+    editor.sync(version=editor.version)
+    with pytest.raises(VersionMismatch) as raised:
+        editor.sync(version=editor.version - 1)
+    assert raised.value.version == editor.version
@@ -0,0 +1,70 @@
+import time
+
+from utils.completion_engine import CompletionEngine, PrefixTrie, merge_suggestions
+from utils.document_model import DocumentModel
+
+
+def labels(completions):
+    return [item["label"] for item in completions]
+
+
+def test_merge_keeps_local_first_and_drops_duplicates():
+    local = [{"label": "print", "kind": "builtin"}]
+    assert merge_suggestions(local, ["print", "println"]) == ["print", "println"]
+
+
+def test_merge_normalizes_ai_suggestions():
+    ai = [{"label": "foo()"}, {"text": "bar"}, "baz", 3, None, {"other": "x"}]
+    assert merge_suggestions([], ai) == ["foo()", "bar", "baz"]
+    # A bare string is one suggestion, not one per character
+    assert merge_suggestions([], "foo()") == ["foo()"]
+    assert merge_suggestions([], None) == []
+
+
+def test_trie_reference_counts():
+    trie = PrefixTrie()
+    trie.add("value", "local")
+    trie.add("value", "local")
+    trie.remove("value", "local")
+    assert trie.complete("va") == [("value", "local")]
+    trie.remove("value", "local")
+    assert trie.complete("va") == []
+    assert trie.size == 0
+
+
+def test_document_symbols_follow_edits():
+    engine = CompletionEngine()
+    engine.update(DocumentModel("def compute_total(items):\n    return items\n", 1))
+    assert "compute_total" in labels(engine.complete("compute_"))
+
+    engine.update(DocumentModel("def compute_sum(items):\n    return items\n", 2))
+    assert labels(engine.complete("compute_")) == ["compute_sum"]
+
+    # A document that does not parse keeps its last good index
+    engine.update(DocumentModel("def compute_sum(items:\n", 3))
+    assert labels(engine.complete("compute_")) == ["compute_sum"]
+
+
+def test_members_of_imported_stdlib_module():
+    engine = CompletionEngine()
+    engine.update(DocumentModel("import os.path as p\n", 1))
+    assert "join" in labels(engine.complete("p.jo"))
+
+
+def test_project_modules_are_listed_off_the_request_path(tmp_path):
+    (tmp_path / "helpers.py").write_text("def shared_helper():\n    pass\n")
+    listed = []
+
+    def project_files():
+        listed.append(True)
+        return [str(tmp_path / "helpers.py")]
+
+    engine = CompletionEngine(project_files=project_files, project_root=str(tmp_path))
+    engine.update(DocumentModel("import helpers\n", 1))
+    # The first lookup starts the walk instead of waiting for it
+    assert engine.complete("helpers.sha") == []
+    deadline = time.monotonic() + 5
+    while engine.complete("helpers.sha") == [] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert labels(engine.complete("helpers.sha")) == ["shared_helper"]
+    assert len(listed) == 1
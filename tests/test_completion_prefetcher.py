@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from ai.completion_prefetcher import CompletionPrefetcher
+from editor.text_buffer import TextBuffer
+
+
+@pytest.fixture
+def prefetcher():
+    fetched = []
+
+    def fetch(code, position):
+        fetched.append(code)
+        return ["o(bar)", "od"]
+
+    prefetcher = CompletionPrefetcher(fetch, idle=0)
+    prefetcher.fetched = fetched
+    yield prefetcher
+    prefetcher.stop()
+
+
+def wait_for_prefetch(prefetcher, count=1):
+    deadline = time.monotonic() + 5
+    while prefetcher.stats()["prefetches"] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert prefetcher.stats()["prefetches"] == count
+
+
+def test_text_is_built_from_the_snapshot_by_the_worker(prefetcher):
+    buffer = TextBuffer("x = f")
+    prefetcher.schedule(1, (1, 6), buffer.snapshot(), 5)
+    buffer.insert(5, "oo")
+    wait_for_prefetch(prefetcher)
+    assert prefetcher.fetched == ["x = f"]
+    assert prefetcher.lookup(1, (1, 6), 5) == ["o(bar)", "od"]
+
+
+def test_suggestions_advance_past_typed_characters(prefetcher):
+    prefetcher.schedule(1, (1, 6), "x = f", 5)
+    wait_for_prefetch(prefetcher)
+    prefetcher.inserted(1, 2, 5, "o")
+    assert prefetcher.lookup(2, (1, 7), 6) == ["(bar)", "d"]
+    prefetcher.inserted(2, 3, 6, "(")
+    assert prefetcher.lookup(3, (1, 8), 7) == ["bar)"]
+    assert prefetcher.stats()["advanced_hits"] == 2
+
+
+def test_other_edits_are_misses(prefetcher):
+    prefetcher.schedule(1, (1, 6), "x = f", 5)
+    wait_for_prefetch(prefetcher)
+    # Typed somewhere else
+    prefetcher.inserted(1, 2, 0, "o")
+    assert prefetcher.lookup(2, (1, 7), 6) is None
+    # A new line
+    prefetcher.inserted(1, 3, 5, "o\n")
+    assert prefetcher.lookup(3, (2, 1), 7) is None
+    # Not reported as an insertion at all
+    assert prefetcher.lookup(4, (1, 7), 6) is None
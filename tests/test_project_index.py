@@ -0,0 +1,69 @@
+import os
+import threading
+
+import pytest
+
+from utils.project_index import ProjectIndex
+
+
+@pytest.fixture
+def project(tmp_path):
+    files = {
+        "a.py": "class CodeEditor:\n    def insert(self):\n        pass\n",
+        "b.py": "from a import CodeEditor\n\neditor = CodeEditor()\n",
+    }
+    for name, source in files.items():
+        (tmp_path / name).write_text(source)
+    return tmp_path
+
+
+def make_index(tmp_path):
+    return ProjectIndex(db_path=os.path.join(tmp_path, "index.sqlite3"), max_workers=2)
+
+
+def python_files(project):
+    return sorted(str(path) for path in project.glob("*.py"))
+
+
+def test_update_only_reindexes_changed_files(project, tmp_path):
+    index = make_index(tmp_path)
+    assert index.update(python_files(project))["indexed"] == 2
+    assert index.update(python_files(project))["unchanged"] == 2
+
+    (project / "a.py").write_text("class CodeEditor:\n    def delete(self):\n        pass\n")
+    os.utime(project / "a.py", (1, 1))
+    stats = index.update(python_files(project))
+    assert (stats["indexed"], stats["unchanged"]) == (1, 1)
+    assert [symbol["qualname"] for symbol in index.search("delete")] == ["CodeEditor.delete"]
+    assert index.search("insert") == []
+
+
+def test_full_update_drops_missing_files_and_partial_update_keeps_them(project, tmp_path):
+    index = make_index(tmp_path)
+    index.update(python_files(project))
+
+    index.update([str(project / "b.py")], prune=False)
+    assert len(index.find_definitions("CodeEditor")) == 1
+
+    index.update([str(project / "b.py")])
+    assert index.find_definitions("CodeEditor") == []
+    assert index.stats()["files"] == 1
+
+
+def test_concurrent_updates_do_not_duplicate_symbols(project, tmp_path):
+    index = make_index(tmp_path)
+    threads = [threading.Thread(target=index.update, args=(python_files(project),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(index.find_definitions("CodeEditor")) == 1
+    assert len(index.find_references("CodeEditor")) == 1
+
+
+def test_definition_lookup_uses_an_index(tmp_path):
+    index = make_index(tmp_path)
+    plan = index._db.execute(
+        "EXPLAIN QUERY PLAN SELECT path FROM symbols WHERE name = ?", ("CodeEditor",)
+    ).fetchall()
+    assert "USING INDEX" in " ".join(str(row) for row in plan)
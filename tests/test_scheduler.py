@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from ai.scheduler import CircuitBreaker, CircuitOpenError, RequestScheduler
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "http://upstream.invalid/v1/chat/completions"))
+
+
+def fail(error):
+    def fn():
+        raise error
+    return fn
+
+
+def tripped_scheduler():
+    """A scheduler whose breaker is open with its reset timeout already elapsed."""
+    scheduler = RequestScheduler(max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    with pytest.raises(openai.APIConnectionError):
+        scheduler.call("completion", fail(connection_error()))
+    assert scheduler.breaker.state == "open"
+    return scheduler
+
+
+def test_degraded_trial_reopens():
+    scheduler = tripped_scheduler()
+    with pytest.raises(openai.APIConnectionError):
+        scheduler.call("completion", fail(connection_error()))
+    assert scheduler.breaker.state == "open"
+
+
+def test_successful_trial_closes():
+    scheduler = tripped_scheduler()
+    assert scheduler.call("completion", lambda: "ok") == "ok"
+    assert scheduler.breaker.state == "closed"
+
+
+def test_non_degraded_trial_error_closes():
+    scheduler = tripped_scheduler()
+    with pytest.raises(ValueError):
+        scheduler.call("completion", fail(ValueError("bad request")))
+    assert scheduler.breaker.state == "closed"
+    assert scheduler.call("completion", lambda: "ok") == "ok"
+
+
+def test_cancelled_trial_is_handed_back():
+    scheduler = tripped_scheduler()
+    scheduler.breaker.reset_timeout = 60
+
+    async def race():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(60)
+
+        scheduler.breaker.opened_at -= 60
+        task = asyncio.create_task(scheduler.acall("completion", slow))
+        await started.wait()
+        assert scheduler.breaker.state == "half_open"
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(race())
+    assert scheduler.breaker.state == "open"
+    # The timeout already ran out, so the next call is the new trial
+    assert scheduler.call("completion", lambda: "ok") == "ok"
+    assert scheduler.breaker.state == "closed"
+
+
+def test_open_breaker_rejects():
+    scheduler = tripped_scheduler()
+    scheduler.breaker.reset_timeout = 60
+    with pytest.raises(CircuitOpenError):
+        scheduler.call("completion", lambda: "ok")
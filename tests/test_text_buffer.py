@@ -0,0 +1,85 @@
+import io
+import random
+
+from editor import text_buffer
+from editor.text_buffer import TextBuffer
+
+SAMPLES = ["", "a", "xyz", "\n", "line\n", "\n\nab\n", "é€", "def f():\n    pass\n"]
+
+
+def check_against(buffer, expected):
+    """Every read of ``buffer`` agrees with the plain string ``expected``"""
+    assert len(buffer) == len(expected)
+    assert buffer.text() == expected
+    lines = expected.split("\n")
+    assert buffer.line_count == len(lines)
+    for number, line in enumerate(lines, 1):
+        assert buffer.get_line(number) == line
+        assert buffer.line_length(number) == len(line)
+        start = buffer.line_start(number)
+        assert buffer.offset_at(number, 1) == start
+        assert buffer.position_at(start) == (number, 1)
+        assert buffer.position_at(start + len(line)) == (number, len(line) + 1)
+
+
+def test_random_edits_match_a_string_model():
+    rng = random.Random(1)
+    buffer = TextBuffer("hello\nworld\n")
+    expected = "hello\nworld\n"
+    for step in range(2000):
+        offset = rng.randint(0, len(expected))
+        length = rng.randint(0, 5)
+        text = rng.choice(SAMPLES)
+        operation = rng.choice(["insert", "delete", "replace"])
+        if operation == "insert":
+            buffer.insert(offset, text)
+            expected = expected[:offset] + text + expected[offset:]
+        elif operation == "delete":
+            buffer.delete(offset, length)
+            expected = expected[:offset] + expected[offset + length:]
+        else:
+            buffer.replace(offset, length, text)
+            expected = expected[:offset] + text + expected[offset + length:]
+        if step % 50 == 0:
+            check_against(buffer, expected)
+        start, end = sorted(rng.randint(0, len(expected)) for _ in range(2))
+        assert buffer.substring(start, end) == expected[start:end]
+    check_against(buffer, expected)
+
+
+def test_replace_range_returns_the_position_after_the_new_text():
+    buffer = TextBuffer("one\ntwo\nthree")
+    assert buffer.replace_range((1, 2), (3, 3), "X\nY") == (2, 2)
+    assert buffer.text() == "oX\nYree"
+
+
+def test_snapshot_is_unchanged_by_later_edits():
+    buffer = TextBuffer("abc\ndef\n")
+    buffer.insert(1, "1")
+    snapshot = buffer.snapshot()
+    buffer.insert(0, "zz\n")
+    buffer.delete(5, 3)
+    assert snapshot.text() == "a1bc\ndef\n"
+    assert snapshot.get_line(2) == "def"
+    # Nor does editing the snapshot change the buffer
+    snapshot.insert(0, "!")
+    assert buffer.text() == "zz\na1def\n"
+    assert snapshot.text() == "!a1bc\ndef\n"
+
+
+def test_compaction_keeps_contents(monkeypatch):
+    monkeypatch.setattr(text_buffer, "COMPACT_AFTER", 3)
+    buffer = TextBuffer("abc")
+    for char in "defgh":
+        buffer.insert(len(buffer), char)
+        assert buffer.text().endswith(char)
+    assert buffer.text() == "abcdefgh"
+    assert buffer.line_count == 1
+
+
+def test_write_to_streams_the_contents():
+    buffer = TextBuffer("é\n")
+    buffer.insert(0, "x")
+    out = io.BytesIO()
+    buffer.write_to(out)
+    assert out.getvalue() == "xé\n".encode("utf-8")
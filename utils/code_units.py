@@ -0,0 +1,120 @@
+"""Split a module into code units fingerprinted by their normalized AST."""
+import ast
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple
+
+from utils.node_index import SCOPE_TYPES, node_span
+
+MODULE_UNIT = "<module>"
+
+# Fingerprints by unit source, so re-splitting a document after an edit only
+# hashes the units whose text changed
+_FINGERPRINT_CACHE_SIZE = 4096
+_fingerprints: "OrderedDict[str, str]" = OrderedDict()
+_fingerprints_lock = threading.Lock()
+
+
+class CodeUnit(NamedTuple):
+    name: str
+    start_line: int
+    end_line: int
+    source: str
+    fingerprint: str
+    # File the unit came from, when working across a project
+    path: str = ""
+
+
+def fingerprint(nodes: List[ast.AST]) -> str:
+    """Hash of the nodes' structure, ignoring positions, formatting and comments."""
+    digest = hashlib.sha256()
+    for node in nodes:
+        digest.update(ast.dump(node, include_attributes=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def source_fingerprint(source: str, nodes: List[ast.AST]) -> str:
+    """fingerprint(nodes) for the nodes parsed from ``source``, cached by that source."""
+    with _fingerprints_lock:
+        value = _fingerprints.get(source)
+        if value is not None:
+            _fingerprints.move_to_end(source)
+            return value
+    value = fingerprint(nodes)
+    with _fingerprints_lock:
+        _fingerprints[source] = value
+        if len(_fingerprints) > _FINGERPRINT_CACHE_SIZE:
+            _fingerprints.popitem(last=False)
+    return value
+
+
+def split_units(document) -> List[CodeUnit]:
+    """Top-level functions and classes of a parsed DocumentModel, in source order.
+
+    All remaining module-level statements (imports, constants, script code)
+    are gathered into a single ``<module>`` unit placed first. Returns an
+    empty list if the document does not parse.
+    """
+    tree = document.tree
+    if tree is None:
+        return []
+
+    units = []
+    module_nodes = []
+    for node in tree.body:
+        if not isinstance(node, SCOPE_TYPES):
+            module_nodes.append(node)
+            continue
+        start, end = node_span(node)
+        source = document.get_block(start, end)
+        units.append(CodeUnit(node.name, start, end, source, source_fingerprint(source, [node])))
+
+    if module_nodes:
+        spans = [node_span(node) for node in module_nodes]
+        source = "\n".join(document.get_block(start, end) for start, end in spans)
+        units.insert(0, CodeUnit(MODULE_UNIT, spans[0][0], spans[-1][1], source,
+                                 source_fingerprint(source, module_nodes)))
+    return units
+
+
+def collect_elements(document) -> List[CodeUnit]:
+    """Every function, method and class in a parsed DocumentModel, with dotted qualified names.
+
+    A class is represented by its outline: its own statements with method
+    bodies reduced to their docstring and ``...``, so documenting a class does
+    not resend every method (each method is an element of its own).
+    """
+    tree = document.tree
+    if tree is None:
+        return []
+
+    elements = []
+
+    def visit(body, prefix):
+        for node in body:
+            if not isinstance(node, SCOPE_TYPES):
+                continue
+            name = f"{prefix}{node.name}"
+            start, end = node_span(node)
+            if isinstance(node, ast.ClassDef):
+                outline = _class_outline(node)
+                elements.append(CodeUnit(name, start, end, ast.unparse(outline), fingerprint([outline])))
+            else:
+                elements.append(CodeUnit(name, start, end, document.get_block(start, end), fingerprint([node])))
+            visit(node.body, f"{name}.")
+
+    visit(tree.body, "")
+    elements.sort(key=lambda element: element.start_line)
+    return elements
+
+
+def _class_outline(node: ast.ClassDef) -> ast.ClassDef:
+    outline = copy.deepcopy(node)
+    for child in ast.walk(outline):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            docstring = ast.get_docstring(child, clean=False)
+            child.body = [ast.Expr(ast.Constant(docstring))] if docstring else []
+            child.body.append(ast.Expr(ast.Constant(...)))
+    return outline
@@ -0,0 +1,345 @@
+"""Local, prefix-trie based code completion from document, project, builtin and stdlib symbols."""
+import ast
+import builtins
+import keyword
+import os
+import re
+import sys
+import sysconfig
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.code_units import split_units
+
+# Lower sorts first when ranking candidates
+KIND_RANK = {"local": 0, "attribute": 1, "member": 2, "module": 3, "builtin": 4, "keyword": 5}
+
+# Module path components never introspected: running these is their purpose
+_NO_INTROSPECTION = {"antigravity", "this", "__main__"}
+
+_STDLIB_PATH = sysconfig.get_paths()["stdlib"]
+
+_TRAILING_EXPRESSION = re.compile(r"((?:[A-Za-z_]\w*\s*\.\s*)*)([A-Za-z_]\w*)?$")
+
+
+class _TrieNode:
+    __slots__ = ("children", "words")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # word ending here -> {kind: reference count}
+        self.words: Dict[str, Dict[str, int]] = {}
+
+
+class PrefixTrie:
+    """Character trie of words with reference-counted kinds, so sources can be added and removed."""
+    def __init__(self):
+        self._root = _TrieNode()
+        self.size = 0
+
+    def add(self, word: str, kind: str) -> None:
+        node = self._root
+        for char in word:
+            node = node.children.setdefault(char, _TrieNode())
+        kinds = node.words.setdefault(word, {})
+        if not kinds:
+            self.size += 1
+        kinds[kind] = kinds.get(kind, 0) + 1
+
+    def remove(self, word: str, kind: str) -> None:
+        path = [self._root]
+        for char in word:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        kinds = path[-1].words.get(word)
+        if not kinds or kind not in kinds:
+            return
+        kinds[kind] -= 1
+        if kinds[kind] == 0:
+            del kinds[kind]
+        if kinds:
+            return
+        del path[-1].words[word]
+        self.size -= 1
+        # Prune branches that no longer lead to any word
+        for depth in range(len(word), 0, -1):
+            node = path[depth]
+            if node.children or node.words:
+                break
+            del path[depth - 1].children[word[depth - 1]]
+
+    def complete(self, prefix: str, limit: int = 20, max_visited: int = 5000) -> List[Tuple[str, str]]:
+        """``(word, best kind)`` pairs starting with ``prefix``, best ranked first."""
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        found = []
+        stack = [node]
+        while stack and len(found) < max_visited:
+            node = stack.pop()
+            for word, kinds in node.words.items():
+                found.append((word, min(kinds, key=KIND_RANK.get)))
+            stack.extend(node.children.values())
+        found.sort(key=_rank)
+        return found[:limit]
+
+
+def _rank(item: Tuple[str, str]):
+    word, kind = item
+    return KIND_RANK[kind], word.startswith("_"), len(word), word
+
+
+def _stdlib_source(module: str) -> Optional[str]:
+    """Source file of a pure-Python standard library module, found without importing anything."""
+    base = os.path.join(_STDLIB_PATH, *module.split("."))
+    for path in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+# Builtins and keywords never change, so every engine shares one trie of them
+_BUILTINS = PrefixTrie()
+for _name in dir(builtins):
+    _BUILTINS.add(_name, "builtin")
+for _name in keyword.kwlist:
+    _BUILTINS.add(_name, "keyword")
+
+
+def _unit_symbols(tree: ast.AST) -> Tuple[Set[str], Set[str], Dict[str, str]]:
+    """Names defined, attribute names assigned, and import aliases (name -> module) in a subtree."""
+    names: Set[str] = set()
+    attributes: Set[str] = set()
+    imports: Dict[str, str] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+            if isinstance(node, ast.ClassDef):
+                # Methods complete after ``self.`` like assigned attributes
+                attributes.update(child.name for child in node.body
+                                  if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)))
+            else:
+                args = node.args
+                for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+                    if arg is not None:
+                        names.add(arg.arg)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store):
+            attributes.add(node.attr)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imports[alias.asname] = alias.name
+                else:
+                    top = alias.name.split(".")[0]
+                    imports[top] = top
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                if alias.name != "*":
+                    imports[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+    names.update(imports)
+    return names, attributes, imports
+
+
+class CompletionEngine:
+    """Answers completions locally from a prefix trie, without a model round trip.
+
+    The trie holds the project's module names and the symbols of the
+    current document; builtins and keywords come from a trie shared by all
+    engines. Document symbols are indexed per
+    top-level unit (see utils.code_units), so ``update()`` only re-walks the
+    functions and classes whose fingerprint changed, and a document that
+    does not currently parse keeps its last good index. After ``mod.``,
+    members of imported stdlib modules (by introspection) and project
+    modules (by parsing, never importing) are offered instead. The project
+    file list is walked on a background thread the first time it is
+    needed, so project modules are offered once that finishes.
+    """
+    def __init__(self, project_files: Optional[Callable[[], Iterable[str]]] = None,
+                 project_root: Optional[str] = None):
+        self.project_files = project_files
+        self.project_root = project_root or os.getcwd()
+        self._lock = threading.RLock()
+        self._trie = PrefixTrie()
+        self._attributes = PrefixTrie()
+        # fingerprint -> (names, attributes, imports) of indexed document units
+        self._units: Dict[str, Tuple[Set[str], Set[str], Dict[str, str]]] = {}
+        self._imports: Dict[str, str] = {}
+        self._version: Optional[int] = None
+        self._member_tries: Dict[str, Optional[PrefixTrie]] = {}
+        self._project_modules: Optional[Dict[str, str]] = None
+        # Bumped by invalidate_project() so a walk that started earlier is discarded
+        self._project_generation = 0
+        self._project_indexing = False
+
+    def update(self, document) -> None:
+        """Bring the document symbols in line with ``document``, re-indexing only changed units."""
+        with self._lock:
+            if document.version == self._version:
+                return
+            units = split_units(document)
+            if not units and document.tree is None:
+                return
+            self._version = document.version
+            current = {unit.fingerprint: unit for unit in units}
+            for fingerprint in set(self._units) - set(current):
+                self._index_unit(self._units.pop(fingerprint), -1)
+            for fingerprint, unit in current.items():
+                if fingerprint not in self._units:
+                    symbols = _unit_symbols(ast.parse(unit.source))
+                    self._units[fingerprint] = symbols
+                    self._index_unit(symbols, 1)
+            self._imports = {}
+            for _, _, imports in self._units.values():
+                self._imports.update(imports)
+
+    def _index_unit(self, symbols, direction: int) -> None:
+        names, attributes, _ = symbols
+        for trie, words, kind in ((self._trie, names, "local"), (self._attributes, attributes, "attribute")):
+            for word in words:
+                if direction > 0:
+                    trie.add(word, kind)
+                else:
+                    trie.remove(word, kind)
+
+    def complete(self, line_prefix: str, limit: int = 20) -> List[Dict[str, str]]:
+        """Candidates for the text before the cursor on its line, as ``{"label", "kind"}`` dicts."""
+        match = _TRAILING_EXPRESSION.search(line_prefix)
+        chain = re.sub(r"\s+", "", match.group(1)) if match else ""
+        prefix = (match.group(2) or "") if match else ""
+        with self._lock:
+            if chain:
+                results = self._member_trie(chain.rstrip(".")).complete(prefix, limit + 1)
+            else:
+                self._project_module_paths()
+                best = dict(_BUILTINS.complete(prefix, limit + 1))
+                for word, kind in self._trie.complete(prefix, limit + 1):
+                    if word not in best or KIND_RANK[kind] < KIND_RANK[best[word]]:
+                        best[word] = kind
+                results = sorted(best.items(), key=_rank)
+        return [{"label": word, "kind": kind} for word, kind in results if word != prefix][:limit]
+
+    def _member_trie(self, expression: str) -> PrefixTrie:
+        """Members of a module alias or dotted module path; other objects get known attribute names."""
+        head, _, rest = expression.partition(".")
+        module = self._imports.get(head)
+        if module is not None:
+            expression = f"{module}.{rest}" if rest else module
+        members = self._module_members(expression)
+        return members if members is not None else self._attributes
+
+    def _module_members(self, module: str) -> Optional[PrefixTrie]:
+        if module in self._member_tries:
+            return self._member_tries[module]
+        names = None
+        project_path = self._project_module_paths().get(module)
+        if project_path is not None:
+            names = self._parse_module_names(project_path)
+        elif (module.split(".")[0] in sys.stdlib_module_names
+              and not _NO_INTROSPECTION.intersection(module.split("."))
+              and module.split(".")[0] in {name.split(".")[0] for name in self._imports.values()}):
+            # Modules named by the document are never imported here: only
+            # ones the server has already loaded are inspected, the rest parsed
+            loaded = sys.modules.get(module)
+            if loaded is not None:
+                names = dir(loaded)
+            else:
+                source = _stdlib_source(module)
+                names = self._parse_module_names(source) if source else None
+        if names is None:
+            self._member_tries[module] = None
+            return None
+        trie = PrefixTrie()
+        for name in names:
+            trie.add(name, "member")
+        self._member_tries[module] = trie
+        return trie
+
+    @staticmethod
+    def _parse_module_names(path: str) -> Optional[List[str]]:
+        try:
+            with open(path, "r") as f:
+                tree = ast.parse(f.read())
+        except Exception:
+            return None
+        names = []
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                names.append(node.name)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                names.extend(target.id for target in targets if isinstance(target, ast.Name))
+        return names
+
+    def _project_module_paths(self) -> Dict[str, str]:
+        """Dotted module name -> file for every project file; empty until the background walk is done."""
+        if self._project_modules is None and not self._project_indexing:
+            self._project_indexing = True
+            threading.Thread(target=self._index_project, args=(self._project_generation,),
+                             name="completion-project-index", daemon=True).start()
+        return self._project_modules or {}
+
+    def _index_project(self, generation: int) -> None:
+        modules = {}
+        try:
+            for path in (self.project_files() if self.project_files else []):
+                relative = os.path.relpath(os.path.abspath(path), self.project_root)
+                if relative.startswith(".."):
+                    continue
+                parts = relative[:-len(".py")].split(os.sep)
+                if parts[-1] == "__init__":
+                    parts.pop()
+                if parts and all(part.isidentifier() for part in parts):
+                    modules[".".join(parts)] = path
+        except Exception as e:
+            print(f"Error listing project modules: {str(e)}")
+        with self._lock:
+            if generation != self._project_generation:
+                return
+            for module in modules:
+                self._trie.add(module.split(".")[0], "module")
+            self._project_modules = modules
+            # Lookups made during the walk may have cached a miss for a project module
+            self._member_tries.clear()
+
+    def invalidate_project(self) -> None:
+        """Forget project module data, e.g. after files were added or changed on disk."""
+        with self._lock:
+            if self._project_modules is not None:
+                for module in self._project_modules:
+                    self._trie.remove(module.split(".")[0], "module")
+            self._project_modules = None
+            self._project_generation += 1
+            self._project_indexing = False
+            self._member_tries.clear()
+
+
+def _suggestion_labels(ai: Any) -> List[str]:
+    """AI suggestions as strings: a bare string is one suggestion, dicts give their label or text."""
+    if isinstance(ai, str):
+        ai = [ai]
+    elif not isinstance(ai, list):
+        return []
+    labels = []
+    for suggestion in ai:
+        if isinstance(suggestion, dict):
+            suggestion = suggestion.get("label", suggestion.get("text"))
+        if isinstance(suggestion, str):
+            labels.append(suggestion)
+    return labels
+
+
+def merge_suggestions(local: List[Dict[str, str]], ai: Any, limit: int = 30) -> List[str]:
+    """Local completion labels first, then AI suggestions not already offered."""
+    merged = []
+    seen = set()
+    for suggestion in [item["label"] for item in local] + _suggestion_labels(ai):
+        if suggestion not in seen:
+            seen.add(suggestion)
+            merged.append(suggestion)
+    return merged[:limit]
@@ -2,9 +2,61 @@
 import sys
 import bdb
 import threading
-from typing import Dict, List, Any, Optional
+from collections import deque
+from itertools import islice
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from queue import Queue
 
+class EventLog:
+    """Debugger events numbered from 1, keeping the latest ``capacity`` for clients that reconnect.
+
+    Readers ask for everything after the last sequence number they saw, so
+    no event is lost between polls or across a dropped connection, as long
+    as it has not been pushed out of the log. Listeners are called (from
+    the debugger thread) after each append, to wake readers that do not
+    block on the log itself.
+    """
+    def __init__(self, capacity: int = 1000):
+        self._events = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._listeners: List[Callable[[], None]] = []
+        self.last_seq = 0
+
+    def append(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        with self._cond:
+            self.last_seq += 1
+            event = dict(event, seq=self.last_seq)
+            self._events.append(event)
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+        return event
+
+    def since(self, seq: int, timeout: Optional[float] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """(events after ``seq``, whether some of them were already dropped).
+
+        With a ``timeout``, waits up to that long for a new event when there
+        is none yet. A ``seq`` ahead of the log (from an earlier debugger)
+        counts as dropped events too.
+        """
+        with self._cond:
+            if timeout and seq == self.last_seq:
+                self._cond.wait_for(lambda: self.last_seq != seq, timeout)
+            first = self._events[0]["seq"] if self._events else self.last_seq + 1
+            if seq > self.last_seq or seq + 1 < first:
+                return list(self._events), True
+            return list(islice(self._events, seq + 1 - first, None)), False
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        with self._cond:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[], None]) -> None:
+        with self._cond:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
 class InoxxDebugger(bdb.Bdb):
     """Custom debugger implementation for Inoxx IDE."""
     def __init__(self):
@@ -14,23 +66,26 @@ class InoxxDebugger(bdb.Bdb):
         self.is_running = False
         self.step_command = None
         self.command_queue = Queue()
-        self.output_queue = Queue()
+        # Every event of every run, for the push channel and the state poll
+        self.events = EventLog()
         self.variables: Dict[str, Any] = {}
         self.call_stack: List[Dict[str, Any]] = []
 
     def start(self, code: str) -> None:
         """Start debugging session."""
         self.is_running = True
+        self.events.append({"type": "started"})
         try:
             # Execute code in debug mode
             self.run(code)
         except Exception as e:
-            self.output_queue.put({
+            self.events.append({
                 "type": "error",
                 "message": str(e)
             })
         finally:
             self.is_running = False
+            self.events.append({"type": "finished"})
 
     def set_break(self, filename: str, lineno: int, temporary: bool = False, 
                   cond: str = None, funcname: str = None) -> None:
@@ -57,7 +112,7 @@ class InoxxDebugger(bdb.Bdb):
         self._update_state()
 
         # Send immediate state update
-        self.output_queue.put({
+        self.events.append({
             "type": "state_update",
             "position": {
                 "file": frame.f_code.co_filename,
@@ -131,9 +186,11 @@ class InoxxDebugger(bdb.Bdb):
 
     def get_current_state(self) -> Dict[str, Any]:
         """Get current debugger state."""
+        frame = self.current_frame
         return {
             "is_running": self.is_running,
             "breakpoints": self.breakpoints,
+            "position": {"file": frame.f_code.co_filename, "line": frame.f_lineno} if frame else None,
             "variables": self.variables,
             "call_stack": self.call_stack
         }
@@ -143,6 +200,7 @@ class DebuggerController:
     def __init__(self):
         self.debugger = InoxxDebugger()
         self.debug_thread: Optional[threading.Thread] = None
+        self._output_seq = 0
 
     def start_debugging(self, code: str) -> None:
         """Start a new debugging session."""
@@ -186,9 +244,19 @@ class DebuggerController:
         """Get current debugger state."""
         return self.debugger.get_current_state()
 
+    @property
+    def events(self) -> EventLog:
+        return self.debugger.events
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state and the sequence number it is current as of, for a client (re)joining the event stream."""
+        seq = self.events.last_seq
+        return dict(self.get_debugger_state(), seq=seq)
+
     def get_output(self) -> Optional[Dict[str, Any]]:
-        """Get next output message from debugger."""
-        try:
-            return self.debugger.output_queue.get_nowait()
-        except:
-            return None
\ No newline at end of file
+        """Get next output message from debugger (for polling clients; one per call)."""
+        events, _ = self.events.since(self._output_seq)
+        if not events:
+            return None
+        self._output_seq = events[0]["seq"]
+        return events[0]
\ No newline at end of file
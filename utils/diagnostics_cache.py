@@ -0,0 +1,78 @@
+"""Content-addressed LRU cache for lint diagnostics."""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+Diagnostics = List[Dict[str, Any]]
+
+
+def content_hash(source: str) -> str:
+    """Stable digest used to key cached results by source text."""
+    return hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _estimate_size(key: str, diagnostics: Diagnostics) -> int:
+    # Rough accounting: key plus the printable size of every field
+    return len(key) + 64 + sum(
+        64 + sum(len(str(k)) + len(str(v)) for k, v in entry.items())
+        for entry in diagnostics
+    )
+
+
+class DiagnosticsCache:
+    """LRU mapping of source hash -> diagnostics, bounded by an approximate byte budget.
+
+    Entries are namespaced (``"module"``, ``"unit"``, ...) so whole files and
+    individual functions can share one budget without colliding.
+    """
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source: str, namespace: str = "module") -> Optional[Diagnostics]:
+        key = f"{namespace}:{content_hash(source)}"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(item) for item in entry[0]]
+
+    def put(self, source: str, diagnostics: Diagnostics, namespace: str = "module") -> None:
+        key = f"{namespace}:{content_hash(source)}"
+        size = _estimate_size(key, diagnostics)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = ([dict(item) for item in diagnostics], size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,154 @@
+"""Versioned, lazily parsed view of a source document."""
+import ast
+import threading
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from pygments.lexers import PythonLexer
+from utils.node_index import NodeIndex
+
+_lexer = None
+
+
+def _python_lexer() -> PythonLexer:
+    """Shared lexer, built on first tokenization (compiling its rules takes ~40 ms)."""
+    global _lexer
+    if _lexer is None:
+        _lexer = PythonLexer()
+    return _lexer
+
+
+class DocumentModel:
+    """Holds the AST, token stream and line table for one version of a document.
+
+    Each artifact is computed on first access and at most once, so the error
+    detector, syntax helper and editor features can share the parsing work
+    for a given edit. Instances are immutable snapshots; a new version gets a
+    new model. ``text`` may also be a frozen buffer (anything with a
+    ``text()`` method, e.g. ``TextBuffer.snapshot()``), which is only turned
+    into a string on first use, so the editor can hand a version to the
+    lint thread without copying it on every keystroke.
+    """
+    def __init__(self, text, version: int = 0):
+        self._text: Optional[str] = text if isinstance(text, str) else None
+        self._source = None if isinstance(text, str) else text
+        self.version = version
+        self._lock = threading.RLock()
+        self._parsed = False
+        self._tree: Optional[ast.Module] = None
+        self._syntax_error: Optional[SyntaxError] = None
+        self._tokens: Optional[List[Tuple[int, object, str]]] = None
+        self._token_offsets: Optional[List[int]] = None
+        self._line_starts: Optional[List[int]] = None
+        self._node_index: Optional[NodeIndex] = None
+
+    @classmethod
+    def of(cls, source) -> "DocumentModel":
+        """Accept either a DocumentModel or plain source text."""
+        return source if isinstance(source, cls) else cls(source)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            with self._lock:
+                if self._text is None:
+                    self._text = self._source.text()
+                    self._source = None
+        return self._text
+
+    def _parse(self) -> None:
+        with self._lock:
+            if self._parsed:
+                return
+            try:
+                self._tree = ast.parse(self.text)
+            except SyntaxError as e:
+                self._syntax_error = e
+            self._parsed = True
+
+    @property
+    def tree(self) -> Optional[ast.Module]:
+        """The module AST, or None if the text does not parse."""
+        self._parse()
+        return self._tree
+
+    @property
+    def syntax_error(self) -> Optional[SyntaxError]:
+        self._parse()
+        return self._syntax_error
+
+    @property
+    def node_index(self) -> Optional[NodeIndex]:
+        """Line -> enclosing node index, or None if the text does not parse."""
+        if self._node_index is None and self.tree is not None:
+            with self._lock:
+                if self._node_index is None:
+                    self._node_index = NodeIndex(self.tree)
+        return self._node_index
+
+    @property
+    def has_tokens(self) -> bool:
+        return self._tokens is not None
+
+    @property
+    def tokens(self) -> List[Tuple[int, object, str]]:
+        """``(offset, token_type, value)`` triples from the Pygments lexer."""
+        if self._tokens is None:
+            with self._lock:
+                if self._tokens is None:
+                    tokens = list(_python_lexer().get_tokens_unprocessed(self.text))
+                    self._token_offsets = [offset for offset, _, _ in tokens]
+                    self._tokens = tokens
+        return self._tokens
+
+    @property
+    def line_starts(self) -> List[int]:
+        """Offset of the first character of every line."""
+        if self._line_starts is None:
+            with self._lock:
+                if self._line_starts is None:
+                    starts = [0]
+                    index = self.text.find('\n')
+                    while index != -1:
+                        starts.append(index + 1)
+                        index = self.text.find('\n', index + 1)
+                    self._line_starts = starts
+        return self._line_starts
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    def get_line(self, line: int) -> str:
+        starts = self.line_starts
+        if line < 1 or line > len(starts):
+            return ""
+        end = starts[line] - 1 if line < len(starts) else len(self.text)
+        return self.text[starts[line - 1]:end]
+
+    def get_block(self, start_line: int, end_line: int) -> str:
+        """Text of lines ``start_line`` through ``end_line`` inclusive."""
+        starts = self.line_starts
+        start_line = max(1, start_line)
+        end = starts[end_line] - 1 if end_line < len(starts) else len(self.text)
+        return self.text[starts[min(start_line, len(starts)) - 1]:end]
+
+    def offset_at(self, line: int, col: int) -> int:
+        starts = self.line_starts
+        line = max(1, min(line, len(starts)))
+        return min(starts[line - 1] + max(col - 1, 0), len(self.text))
+
+    def position_at(self, offset: int) -> Tuple[int, int]:
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def token_at(self, offset: int) -> Optional[Tuple[int, object, str]]:
+        """The token covering ``offset``, found by binary search."""
+        tokens = self.tokens
+        index = bisect_right(self._token_offsets, offset) - 1
+        if index < 0:
+            return None
+        start, token_type, value = tokens[index]
+        if start <= offset < start + len(value):
+            return tokens[index]
+        return None
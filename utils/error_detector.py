@@ -1,20 +1,32 @@
-import ast
-import pyflakes.api as pyflakes
 import io
+from pyflakes import checker
 from pygments.lexers import PythonLexer
-from pygments.token import Token, Error
+from pygments.token import Token
+from utils.diagnostics_cache import DiagnosticsCache
+from utils.document_model import DocumentModel
 
 class ErrorDetector:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.lexer = PythonLexer()
+        self.cache = cache or DiagnosticsCache()
 
     def check_code(self, code):
+        """Lint source text or a DocumentModel, reusing its AST and tokens"""
+        document = DocumentModel.of(code)
+        cached = self.cache.get(document.text)
+        if cached is not None:
+            return cached
+        errors = self._check_code(document)
+        self.cache.put(document.text, errors)
+        return errors
+
+    def _check_code(self, document):
         errors = []
 
         # Syntax errors
-        try:
-            ast.parse(code)
-        except SyntaxError as e:
+        tree = document.tree
+        if tree is None:
+            e = document.syntax_error
             errors.append({
                 'type': 'syntax',
                 'line': e.lineno,
@@ -23,37 +35,72 @@ class ErrorDetector:
             })
             return errors
 
-        # Pyflakes errors
+        # Pyflakes errors, run on the shared AST instead of re-parsing
         reporter = ErrorCollector()
-        pyflakes.check(code, 'code', reporter)
+        flakes = checker.Checker(tree, filename='code')
+        for message in sorted(flakes.messages, key=lambda m: m.lineno):
+            reporter.flake(message)
         errors.extend(reporter.get_errors())
 
-        # Token-level errors
+        # Token-level errors. If the document has already been lexed (for
+        # highlighting or lookups) scan that; otherwise check per top-level
+        # unit so unchanged functions and classes are served from the cache
+        if document.has_tokens:
+            errors.extend(self._scan_tokens(document.tokens, document.line_starts))
+            return errors
+
+        code = document.text
+        line_starts = document.line_starts
+        unit_lines = sorted({1} | {self._unit_start(node) for node in tree.body})
+        for start, end in zip(unit_lines, unit_lines[1:] + [len(line_starts) + 1]):
+            source = code[line_starts[start - 1]:line_starts[end - 1] if end <= len(line_starts) else len(code)]
+            errors.extend(self.check_unit(source, first_line=start))
+
+        return errors
+
+    def check_unit(self, source, first_line=1):
+        """Token-check a single function, class or statement, cached by its content"""
+        errors = self.cache.get(source, namespace="unit")
+        if errors is None:
+            errors = self.check_tokens(source)
+            self.cache.put(source, errors, namespace="unit")
+        for error in errors:
+            if error['line']:
+                error['line'] += first_line - 1
+        return errors
+
+    def _unit_start(self, node):
+        decorators = getattr(node, 'decorator_list', None)
+        return min([node.lineno] + [d.lineno for d in decorators or []])
+
+    def check_tokens(self, code):
+        """Report lexer Error tokens in a single pass over the token stream"""
         try:
-            tokens = list(self.lexer.get_tokens(code))
-            for i, (token_type, value) in enumerate(tokens):
-                if token_type in Token.Error:
-                    line = self._get_line_number(tokens, i)
-                    errors.append({
-                        'type': 'token',
-                        'line': line,
-                        'message': f'Invalid token: {value}'
-                    })
+            tokens = self.lexer.get_tokens_unprocessed(code)
+            return self._scan_tokens(tokens, DocumentModel(code).line_starts)
         except Exception as e:
-            errors.append({
+            return [{
                 'type': 'tokenizer',
                 'line': 0,
                 'message': str(e)
-            })
-
-        return errors
+            }]
 
-    def _get_line_number(self, tokens, index):
+    def _scan_tokens(self, tokens, line_starts):
+        errors = []
         line = 1
-        for i in range(index):
-            if tokens[i][1] == '\n':
+        for offset, token_type, value in tokens:
+            if token_type not in Token.Error:
+                continue
+            # Offsets only grow, so the line pointer never moves backwards
+            while line < len(line_starts) and line_starts[line] <= offset:
                 line += 1
-        return line
+            errors.append({
+                'type': 'token',
+                'line': line,
+                'offset': offset - line_starts[line - 1] + 1,
+                'message': f'Invalid token: {value}'
+            })
+        return errors
 
 class ErrorCollector:
     def __init__(self):
@@ -0,0 +1,111 @@
+"""Debounced background linting for the code editor."""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class LintWorker:
+    """Runs a lint callable on a background thread, coalescing rapid edits.
+
+    Each submission carries a document version. A run only starts once no new
+    submission has arrived for ``debounce`` seconds, and a run whose version was
+    superseded while it was executing is dropped instead of published. The
+    worker thread starts on the first ``submit()``.
+    """
+    def __init__(self, lint: Callable[[Any], List[Dict[str, Any]]], debounce: float = 0.3,
+                 on_result: Optional[Callable[[int, Any, List[Dict[str, Any]]], None]] = None):
+        self.lint = lint
+        self.debounce = debounce
+        self.on_result = on_result
+        self._cond = threading.Condition()
+        self._pending: Optional[Tuple[int, Any]] = None
+        self._deadline = 0.0
+        self._latest_version = -1
+        self._latest_errors: List[Dict[str, Any]] = []
+        self._stopped = False
+        self.runs = 0
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, version: int, source: Any) -> None:
+        """Queue ``source`` for linting, replacing any not-yet-started request."""
+        with self._cond:
+            self._pending = (version, source)
+            self._deadline = time.monotonic() + self.debounce
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="lint-worker", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def cancel(self) -> None:
+        """Discard the queued request, if it has not started yet."""
+        with self._cond:
+            self._pending = None
+            self._cond.notify_all()
+
+    def publish(self, version: int, errors: List[Dict[str, Any]]) -> None:
+        """Record diagnostics computed outside the worker (e.g. a synchronous check)."""
+        with self._cond:
+            if version >= self._latest_version:
+                self._latest_version = version
+                self._latest_errors = errors
+            self._cond.notify_all()
+
+    def latest(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return the (version, errors) of the most recent completed run."""
+        with self._cond:
+            return self._latest_version, self._latest_errors
+
+    def wait_for(self, version: int, timeout: Optional[float] = None) -> bool:
+        """Block until diagnostics for ``version`` or newer are available."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._latest_version >= version, timeout)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._pending = None
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _next_request(self) -> Optional[Tuple[int, Any]]:
+        with self._cond:
+            while not self._stopped:
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                request, self._pending = self._pending, None
+                return request
+            return None
+
+    def _run(self) -> None:
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            version, source = request
+            try:
+                errors = self.lint(source)
+            except Exception as e:
+                errors = [{'type': 'linter', 'line': 0, 'message': str(e)}]
+            self.runs += 1
+
+            with self._cond:
+                superseded = self._pending is not None and self._pending[0] > version
+                if superseded or version < self._latest_version:
+                    self.dropped += 1
+                    continue
+                self._latest_version = version
+                self._latest_errors = errors
+                self._cond.notify_all()
+
+            if self.on_result:
+                try:
+                    self.on_result(version, source, errors)
+                except Exception as e:
+                    print(f"Error handling lint result: {str(e)}")
@@ -0,0 +1,71 @@
+"""Line-to-node interval index over a parsed module."""
+import ast
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+SCOPE_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def node_span(node: ast.AST) -> Tuple[int, int]:
+    """First and last line of a node, counting decorators as part of it."""
+    start = node.lineno
+    for decorator in getattr(node, 'decorator_list', None) or []:
+        start = min(start, decorator.lineno)
+    return start, node.end_lineno or node.lineno
+
+
+class _Intervals:
+    """Nested line intervals sorted by start, each with a pointer to its parent."""
+    def __init__(self, nodes: List[ast.AST]):
+        spans = sorted(
+            ((*node_span(node), position, node) for position, node in enumerate(nodes)),
+            key=lambda item: (item[0], -item[1], item[2])
+        )
+        self.starts = [start for start, _, _, _ in spans]
+        self.ends = [end for _, end, _, _ in spans]
+        self.nodes = [node for _, _, _, node in spans]
+        self.parents = []
+        stack: List[int] = []
+        for index, start in enumerate(self.starts):
+            while stack and self.ends[stack[-1]] < start:
+                stack.pop()
+            self.parents.append(stack[-1] if stack else -1)
+            stack.append(index)
+
+    def innermost(self, line: int) -> Optional[ast.AST]:
+        index = bisect_right(self.starts, line) - 1
+        # Anything containing ``line`` but starting earlier is an ancestor
+        while index >= 0 and self.ends[index] < line:
+            index = self.parents[index]
+        return self.nodes[index] if index >= 0 else None
+
+
+class NodeIndex:
+    """Answers "which def/class/statement encloses line N" in O(log n).
+
+    Built once per document version from the node spans
+    (``lineno``..``end_lineno``) instead of walking the AST on every query.
+    """
+    def __init__(self, tree: ast.Module):
+        scopes = []
+        statements = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.stmt):
+                statements.append(node)
+                if isinstance(node, SCOPE_TYPES):
+                    scopes.append(node)
+        self._scopes = _Intervals(scopes)
+        self._statements = _Intervals(statements)
+
+    def scope_at(self, line: int) -> Optional[ast.AST]:
+        """Innermost function or class containing ``line``."""
+        return self._scopes.innermost(line)
+
+    def statement_at(self, line: int) -> Optional[ast.stmt]:
+        """Innermost statement containing ``line``."""
+        return self._statements.innermost(line)
+
+    @property
+    def scopes(self) -> List[ast.AST]:
+        """All functions and classes in source order."""
+        return list(self._scopes.nodes)
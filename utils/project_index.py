@@ -0,0 +1,311 @@
+"""Persistent, incrementally updated index of symbols and references across the project."""
+import ast
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.diagnostics_cache import content_hash
+
+# Files handed to a worker process per task, to keep IPC overhead low
+BATCH_SIZE = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    end_line INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS symbols_name_exact ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_path ON symbols (path);
+CREATE INDEX IF NOT EXISTS refs_name ON refs (name);
+CREATE INDEX IF NOT EXISTS refs_path ON refs (path);
+"""
+
+
+def extract_symbols(source: str) -> Tuple[List[tuple], List[tuple]]:
+    """Definitions ``(name, qualname, kind, line, col, end_line)`` and references ``(name, line, col)``."""
+    tree = ast.parse(source)
+    symbols = []
+    refs = []
+
+    def visit(node, scope, in_class):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                qualname = f"{scope}.{child.name}" if scope else child.name
+                if isinstance(child, ast.ClassDef):
+                    kind = "class"
+                else:
+                    kind = "method" if in_class else "function"
+                symbols.append((child.name, qualname, kind, child.lineno, child.col_offset + 1,
+                                child.end_lineno or child.lineno))
+                visit(child, qualname, isinstance(child, ast.ClassDef))
+                continue
+            if not scope and isinstance(child, (ast.Assign, ast.AnnAssign)):
+                targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        symbols.append((target.id, target.id, "variable", target.lineno, target.col_offset + 1,
+                                        target.lineno))
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+                refs.append((child.id, child.lineno, child.col_offset + 1))
+            elif isinstance(child, ast.Attribute) and isinstance(child.ctx, ast.Load):
+                # Point at the attribute name itself, after the dot
+                refs.append((child.attr, child.end_lineno, child.end_col_offset - len(child.attr) + 1))
+            visit(child, scope, in_class)
+
+    visit(tree, "", False)
+    return symbols, refs
+
+
+def _index_files(batch: List[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+    """Worker entry point: read and index each ``(path, previous hash)``, skipping unchanged content."""
+    results = []
+    for path, previous in batch:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                source = f.read()
+            digest = content_hash(source)
+            if digest == previous:
+                results.append({"path": path, "hash": digest, "unchanged": True})
+                continue
+            try:
+                symbols, refs = extract_symbols(source)
+            except SyntaxError as e:
+                # Keep the file (so it is not re-read every time) but with no symbols
+                results.append({"path": path, "hash": digest, "symbols": [], "refs": [],
+                                "error": f"Syntax error at line {e.lineno}: {e.msg}"})
+                continue
+            results.append({"path": path, "hash": digest, "symbols": symbols, "refs": refs})
+        except Exception as e:
+            results.append({"path": path, "error": str(e), "failed": True})
+    return results
+
+
+class ProjectIndex:
+    """Symbol definitions and references for every project file, kept in SQLite.
+
+    ``update(files)`` stats every file and only reads those whose mtime or
+    size changed since the last run; of those, only files whose content hash
+    also changed are parsed, in worker processes. On a full rescan, rows for
+    files that are no longer in the list are dropped, so a warm restart costs
+    one ``stat`` per file plus the work for files that actually changed;
+    ``update(files, prune=False)`` refreshes just the given files. Updates
+    run one at a time; lookups are answered meanwhile.
+
+    If the database file cannot be opened the index lives in memory, and
+    database errors are reported and treated as an empty result, like the
+    AI response cache does.
+    """
+    def __init__(self, db_path: Optional[str] = None, max_workers: Optional[int] = None):
+        self.db_path = db_path or os.path.expanduser("~/.pyide-symbols.sqlite3")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        # Held for a whole update(), so concurrent ones do not index the same files twice
+        self._update_lock = threading.Lock()
+        self._db = self._open_db()
+        self.last_run: Dict[str, Any] = {}
+
+    def _open_db(self) -> sqlite3.Connection:
+        try:
+            db = sqlite3.connect(self.db_path, check_same_thread=False)
+            # The index can always be rebuilt, so trade durability for write speed
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            print(f"Warning: symbol index kept in memory only: {e}")
+            db = sqlite3.connect(":memory:", check_same_thread=False)
+            db.executescript(_SCHEMA)
+            return db
+
+    def _query(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        """Rows of a read query, or none if the database fails; call with ``_lock`` held."""
+        try:
+            return self._db.execute(sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading symbol index: {e}")
+            return []
+
+    def _write(self, action) -> bool:
+        """Run ``action()`` and commit, rolling back on a database error; call with ``_lock`` held."""
+        try:
+            action()
+            self._db.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error writing symbol index: {e}")
+            try:
+                self._db.rollback()
+            except sqlite3.Error:
+                pass
+            return False
+
+    @property
+    def built(self) -> bool:
+        with self._lock:
+            return bool(self._query("SELECT 1 FROM files LIMIT 1"))
+
+    def update(self, files: Iterable[str], prune: bool = True) -> Dict[str, Any]:
+        """Bring the index in line with ``files``; returns this run's stats."""
+        with self._update_lock:
+            stats = self._update(files, prune)
+            self.last_run = stats
+        return dict(stats)
+
+    def _update(self, files: Iterable[str], prune: bool) -> Dict[str, Any]:
+        started = time.perf_counter()
+        stats = {"files": 0, "unchanged": 0, "indexed": 0, "removed": 0, "failed": 0, "seconds": 0.0}
+
+        with self._lock:
+            known = {path: (mtime, size, digest) for path, mtime, size, digest
+                     in self._query("SELECT path, mtime, size, hash FROM files")}
+
+        stale = []
+        seen = set()
+        stat_of = {}
+        for path in files:
+            path = os.path.abspath(path)
+            if path in seen:
+                continue
+            seen.add(path)
+            stats["files"] += 1
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stats["failed"] += 1
+                continue
+            entry = known.get(path)
+            if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+                stats["unchanged"] += 1
+                continue
+            stat_of[path] = stat
+            stale.append((path, entry[2] if entry else None))
+
+        removed = [path for path in known if path not in seen] if prune else []
+        if removed:
+            def remove():
+                self._delete(removed)
+                self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+
+            with self._lock:
+                if self._write(remove):
+                    stats["removed"] = len(removed)
+
+        batches = [stale[start:start + BATCH_SIZE] for start in range(0, len(stale), BATCH_SIZE)]
+        if batches:
+            workers = min(self.max_workers, len(batches))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_index_files, batch) for batch in batches]
+                for future in as_completed(futures):
+                    self._store(future.result(), stat_of, stats)
+
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def _store(self, results: List[Dict[str, Any]], stat_of, stats) -> None:
+        counts = {"failed": 0, "unchanged": 0, "indexed": 0}
+
+        def store():
+            for result in results:
+                path = result["path"]
+                if result.get("failed"):
+                    counts["failed"] += 1
+                    continue
+                stat = stat_of[path]
+                if result.get("unchanged"):
+                    counts["unchanged"] += 1
+                else:
+                    counts["indexed"] += 1
+                    self._delete([path])
+                    self._db.executemany(
+                        "INSERT INTO symbols (path, name, qualname, kind, line, col, end_line) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(path, *symbol) for symbol in result["symbols"]]
+                    )
+                    self._db.executemany(
+                        "INSERT INTO refs (path, name, line, col) VALUES (?, ?, ?, ?)",
+                        [(path, *ref) for ref in result["refs"]]
+                    )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO files (path, mtime, size, hash) VALUES (?, ?, ?, ?)",
+                    (path, stat.st_mtime, stat.st_size, result["hash"])
+                )
+
+        with self._lock:
+            if self._write(store):
+                for key, count in counts.items():
+                    stats[key] += count
+            else:
+                stats["failed"] += len(results)
+
+    def _delete(self, paths: List[str]) -> None:
+        for table in ("symbols", "refs"):
+            self._db.executemany(f"DELETE FROM {table} WHERE path = ?", [(path,) for path in paths])
+
+    def find_definitions(self, name: str, prefer_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Definitions of ``name``, those in ``prefer_path`` first."""
+        with self._lock:
+            rows = self._query(
+                "SELECT path, name, qualname, kind, line, col, end_line FROM symbols WHERE name = ?", (name,)
+            )
+        prefer_path = os.path.abspath(prefer_path) if prefer_path else None
+        rows.sort(key=lambda row: (row[0] != prefer_path, row[3] == "variable", row[0], row[4]))
+        return [self._symbol(row) for row in rows]
+
+    def find_references(self, name: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._query(
+                "SELECT path, line, col FROM refs WHERE name = ? ORDER BY path, line, col LIMIT ?", (name, limit)
+            )
+        return [{"path": path, "line": line, "col": col} for path, line, col in rows]
+
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Workspace symbol search: case-insensitive prefix matches first, then substring matches."""
+        pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock:
+            rows = self._query(
+                "SELECT path, name, qualname, kind, line, col, end_line FROM symbols "
+                "WHERE name LIKE ? ESCAPE '\\' ORDER BY length(name), name LIMIT ?",
+                (f"{pattern}%", limit)
+            )
+            if len(rows) < limit:
+                rows += self._query(
+                    "SELECT path, name, qualname, kind, line, col, end_line FROM symbols "
+                    "WHERE name LIKE ? ESCAPE '\\' AND name NOT LIKE ? ESCAPE '\\' ORDER BY length(name), name LIMIT ?",
+                    (f"%{pattern}%", f"{pattern}%", limit - len(rows))
+                )
+        return [self._symbol(row) for row in rows]
+
+    @staticmethod
+    def _symbol(row) -> Dict[str, Any]:
+        path, name, qualname, kind, line, col, end_line = row
+        return {"path": path, "name": name, "qualname": qualname, "kind": kind,
+                "line": line, "col": col, "end_line": end_line}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {table: (self._query(f"SELECT COUNT(*) FROM {table}") or [(0,)])[0][0]
+                      for table in ("files", "symbols", "refs")}
+            last_run = dict(self.last_run)
+        return dict(counts, last_run=last_run)
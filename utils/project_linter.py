@@ -0,0 +1,132 @@
+"""Parallel project-wide linting with an on-disk result cache."""
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from utils.diagnostics_cache import content_hash
+from utils.error_detector import ErrorDetector
+
+_detector: Optional[ErrorDetector] = None
+
+
+def _lint_source(source: str):
+    """Worker entry point; each process keeps its own detector and lexer."""
+    global _detector
+    if _detector is None:
+        _detector = ErrorDetector()
+    return _detector.check_code(source)
+
+
+class ProjectLinter:
+    """Lints many files across worker processes, re-linting only changed files.
+
+    Runs may overlap (one per web request); ``_lock`` guards the shared cache.
+    """
+    def __init__(self, cache_file: Optional[str] = None, max_workers: Optional[int] = None):
+        self.cache_file = cache_file or os.path.expanduser("~/.pyide-lint-cache.json")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self.cache = self.load_cache()
+        self.last_run: Dict[str, int] = {}
+
+    def load_cache(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r') as f:
+                    return json.load(f)
+            return {}
+        except Exception:
+            return {}
+
+    def save_cache(self) -> bool:
+        tmp_path = None
+        try:
+            with self._lock:
+                data = json.dumps(self.cache)
+            # A private temp file per save, swapped in whole: overlapping saves
+            # never interleave, and readers never see a partial file
+            directory = os.path.dirname(self.cache_file) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".lint-cache-")
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_file)
+            return True
+        except Exception as e:
+            print(f"Error saving lint cache: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return False
+
+    def lint(self, files: Iterable[str], stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield ``{"file", "errors", "cached"}`` per file as soon as each is ready.
+
+        Unchanged files (same mtime and size, or same content hash) are
+        answered from the cache first; the rest stream back in completion
+        order from the process pool. The cache is saved even if the caller
+        stops iterating early. Run statistics go into ``stats`` if given,
+        and into ``last_run``.
+        """
+        try:
+            yield from self._lint(files, {} if stats is None else stats)
+        finally:
+            self.save_cache()
+
+    def _lint(self, files: Iterable[str], stats: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+        stats.update(files=0, cached=0, linted=0, failed=0)
+        self.last_run = stats
+        pending = {}
+
+        for path in files:
+            path = os.path.abspath(path)
+            stats["files"] += 1
+            try:
+                stat = os.stat(path)
+                with self._lock:
+                    entry = self.cache.get(path)
+                if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                    stats["cached"] += 1
+                    yield {"file": path, "errors": entry["errors"], "cached": True}
+                    continue
+
+                with open(path, 'r') as f:
+                    source = f.read()
+                digest = content_hash(source)
+                if entry and entry["hash"] == digest:
+                    with self._lock:
+                        self.cache[path] = dict(entry, mtime=stat.st_mtime, size=stat.st_size)
+                    stats["cached"] += 1
+                    yield {"file": path, "errors": entry["errors"], "cached": True}
+                    continue
+                pending[path] = (source, digest, stat)
+            except Exception as e:
+                stats["failed"] += 1
+                yield {"file": path, "error": f"Error reading file: {str(e)}"}
+
+        if pending:
+            workers = min(self.max_workers, len(pending))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_lint_source, source): path
+                    for path, (source, _, _) in pending.items()
+                }
+                for future in as_completed(futures):
+                    path = futures[future]
+                    _, digest, stat = pending[path]
+                    try:
+                        errors = future.result()
+                    except Exception as e:
+                        stats["failed"] += 1
+                        yield {"file": path, "error": f"Error linting file: {str(e)}"}
+                        continue
+                    with self._lock:
+                        self.cache[path] = {
+                            "mtime": stat.st_mtime,
+                            "size": stat.st_size,
+                            "hash": digest,
+                            "errors": errors
+                        }
+                    stats["linted"] += 1
+                    yield {"file": path, "errors": errors, "cached": False}
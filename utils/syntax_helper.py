@@ -1,42 +1,36 @@
-from pygments.lexers import PythonLexer
-from pygments.token import Token
-import ast
+from utils.document_model import DocumentModel
 
 class SyntaxHelper:
-    def __init__(self):
-        self.lexer = PythonLexer()
-
+    """Cursor lookups answered from the shared DocumentModel and its node index"""
     def get_token_at_position(self, code, position):
-        tokens = list(self.lexer.get_tokens(code))
-        current_pos = 0
-        
-        for token_type, token_value in tokens:
-            token_length = len(token_value)
-            if current_pos <= position < current_pos + token_length:
-                return token_type, token_value
-            current_pos += token_length
-        
-        return None, None
+        """Token at a character offset; accepts source text or a DocumentModel"""
+        token = DocumentModel.of(code).token_at(position)
+        if token is None:
+            return None, None
+        return token[1], token[2]
 
     def get_context_info(self, code, position):
         try:
-            tree = ast.parse(code)
-            for node in ast.walk(tree):
-                if hasattr(node, 'lineno'):
-                    if node.lineno == position[0]:
-                        return {
-                            'type': type(node).__name__,
-                            'line': node.lineno,
-                            'col': node.col_offset
-                        }
-        except:
+            index = DocumentModel.of(code).node_index
+            node = index.statement_at(position[0]) if index else None
+            if node is not None:
+                return {
+                    'type': type(node).__name__,
+                    'line': node.lineno,
+                    'col': node.col_offset
+                }
+        except Exception:
             pass
         return None
 
+    def get_enclosing_scope(self, code, line):
+        """Innermost function or class around ``line``, or None"""
+        index = DocumentModel.of(code).node_index
+        return index.scope_at(line) if index else None
+
     def get_completion_context(self, code, position):
         try:
-            lines = code.split('\n')
-            current_line = lines[position[0] - 1][:position[1]]
+            current_line = DocumentModel.of(code).get_line(position[0])[:position[1]]
             
             # Check for method completion
             if '.' in current_line: